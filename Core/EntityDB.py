@@ -1,148 +1,534 @@
 #!/usr/bin/env python3
 
-from shutil import move
-from msgpack import load, dump
-from threading import Lock
+import contextlib
+from datetime import datetime
+from itertools import islice
+from sys import intern
+from threading import Condition, Thread, local
 from pathlib import Path
 from typing import Union
 
 import networkx as nx
 
+from Core.EntityDBEvents import DatabaseEventBus
+from Core.EntityDBIndex import FieldTextIndex
+from Core.EntityDBStorage import DatabaseStorage, STORAGE_BACKENDS, getStorage
+from Core.ResourceHandler import internAttributes, parseDate
+
+
+class ReadWriteLock:
+    """
+    Lock that lets any number of threads read at the same time, while writes are exclusive.
+
+    Writers take precedence over new readers, so a steady stream of reads cannot
+    starve mutations. Threads that already hold a read lock may take it again.
+    """
+
+    def __init__(self) -> None:
+        self.condition = Condition()
+        self.readerCount = 0
+        self.writersWaiting = 0
+        self.writerActive = False
+        self.threadReads = local()
+
+    def acquireRead(self) -> None:
+        heldReads = getattr(self.threadReads, 'count', 0)
+        with self.condition:
+            if heldReads == 0:
+                while self.writerActive or self.writersWaiting:
+                    self.condition.wait()
+            self.readerCount += 1
+        self.threadReads.count = heldReads + 1
+
+    def releaseRead(self) -> None:
+        self.threadReads.count -= 1
+        with self.condition:
+            self.readerCount -= 1
+            if self.readerCount == 0:
+                self.condition.notify_all()
+
+    def acquireWrite(self) -> None:
+        with self.condition:
+            self.writersWaiting += 1
+            while self.writerActive or self.readerCount:
+                self.condition.wait()
+            self.writersWaiting -= 1
+            self.writerActive = True
+
+    def releaseWrite(self) -> None:
+        with self.condition:
+            self.writerActive = False
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def reading(self):
+        self.acquireRead()
+        try:
+            yield
+        finally:
+            self.releaseRead()
+
+    @contextlib.contextmanager
+    def writing(self):
+        self.acquireWrite()
+        try:
+            yield
+        finally:
+            self.releaseWrite()
+
 
 class EntitiesDB:
     """
     This is a class that handles the addition and removal of entities and
     links on a project-wide scale.
+
+    Saving is incremental: every save only writes the entities and links that changed
+    since the previous save. How they are written depends on the storage backend chosen
+    for the project (see EntityDBStorage).
     """
 
     def __init__(self, mainWindow) -> None:
         self.mainWindow = mainWindow
-        self.dbLock = Lock()
+        # Reads of the database can happen concurrently; only mutations are serialized.
+        self.dbLock = ReadWriteLock()
         self.database = None
+        # The uids of the entities and links that were added, changed or removed since the last save.
+        self.dirtyEntities = set()
+        self.dirtyLinks = set()
+        # The storage that the database was last loaded from or saved to.
+        self.storage = None
+        self.compactionThread = None
+        # Incremented on every change to the database, so snapshots know when they are out of date.
+        self.version = 0
+        self.snapshot = None
+        self.snapshotVersion = None
+        # Changes to the database are published here; the views of the database subscribe to it.
+        self.eventBus = DatabaseEventBus()
+        # Primary field value -> Entity Type -> uids of the entities with that type and primary field value.
+        # The uids are dict keys, so that they are kept in the order the entities were added.
+        self.primaryFieldIndex = {}
+        # uid -> (Primary field value, Entity Type) that the entity is indexed under.
+        self.primaryFieldIndexKeys = {}
+        # uids of the entities that could not be indexed by their primary field, i.e. of unknown types.
+        self.unindexedEntities = set()
+        # Field values -> uids, for searching entities by the values of their fields.
+        self.fieldTextIndex = FieldTextIndex()
+        # uid -> ('Date Created' value, the parsed date), so that views of the database do not parse dates again.
+        self.entityCreationDates = {}
 
         self.loadDatabase()
         self.resetTimeline()
 
+    def getDatabaseStorage(self) -> DatabaseStorage:
+        return getStorage(self.mainWindow.SETTINGS.value("Project/Database Backend"),
+                          Path(self.mainWindow.SETTINGS.value("Project/FilesDir")))
+
     def loadDatabase(self) -> None:
         """
-        Load DiGraph from LinkScope Database file - msgpack dumped object.
+        Load DiGraph from the project's database storage.
+        Any changes written since the last full write are applied on top of it.
         """
-        with self.dbLock:
+        with self.dbLock.writing():
             if self.database is not None:
-                self.save()
-            databaseFile = Path(self.mainWindow.SETTINGS.value("Project/FilesDir")).joinpath("LocalEntitiesDB.lsdb")
-            self.mainWindow.MESSAGEHANDLER.debug(f'Opening Database at: {databaseFile}')
+                self.saveNoLock(self.storage)
+            storage = self.getDatabaseStorage()
+            if not storage.exists():
+                # Projects that were saved with a different backend are converted on the next save.
+                for storageClass in STORAGE_BACKENDS.values():
+                    otherStorage = storageClass(storage.databaseFile.parent)
+                    if otherStorage.exists():
+                        storage = otherStorage
+                        break
+            self.mainWindow.MESSAGEHANDLER.debug(f'Opening Database at: {storage.databaseFile}')
             try:
-                with open(databaseFile, "rb") as dbFile:
-                    self.database = self.mainWindow.RESOURCEHANDLER.reconstructGraphFullFromFile(load(dbFile))
-                self.mainWindow.MESSAGEHANDLER.info('Loaded Local Entities Database.')
-            except FileNotFoundError:
-                self.mainWindow.MESSAGEHANDLER.info('Creating new Local Entities Database.')
-                self.database = nx.DiGraph()
+                databaseContents = storage.loadAll()
+                if databaseContents is None:
+                    self.mainWindow.MESSAGEHANDLER.info('Creating new Local Entities Database.')
+                    self.database = nx.DiGraph()
+                else:
+                    self.database = self.mainWindow.RESOURCEHANDLER.reconstructGraphFullFromFile(databaseContents)
+                    self.mainWindow.MESSAGEHANDLER.info('Loaded Local Entities Database.')
             except Exception as exc:
                 self.mainWindow.MESSAGEHANDLER.error(
                     f'Cannot parse Database: {exc}\nCreating new Local Entities Database.',
                     popUp=True)
                 self.database = nx.DiGraph()
 
+            try:
+                for journalEntry in storage.readChanges():
+                    self.applyJournalEntryNoLock(journalEntry)
+            except Exception as exc:
+                self.mainWindow.MESSAGEHANDLER.error(f'Cannot parse Database changes: {exc}', popUp=True)
+            self.storage = storage
+            self.dirtyEntities.clear()
+            self.dirtyLinks.clear()
+            self.rebuildPrimaryFieldIndexNoLock()
+            self.rebuildFieldTextIndexNoLock()
+            self.rebuildEntityCreationDatesNoLock()
+            self.version += 1
+
+    def applyJournalEntryNoLock(self, journalEntry: Union[list, tuple]) -> None:
+        """
+        Journal entries are lists of the form: [nodes, edges, removed node uids, removed edge uids]
+        Nodes and edges are in the same format as the database file.
+        """
+        changedNodes = journalEntry[0]
+        changesGraph = self.mainWindow.RESOURCEHANDLER.reconstructGraphFullFromFile(journalEntry[:2])
+
+        for linkUID in journalEntry[3]:
+            with contextlib.suppress(nx.NetworkXError):
+                self.database.remove_edge(linkUID[0], linkUID[1])
+        for uid in journalEntry[2]:
+            with contextlib.suppress(nx.NetworkXError):
+                self.database.remove_node(uid)
+
+        # Replace the attributes of existing items, so that removed fields do not linger.
+        for uid in changedNodes:
+            nodeAttributes = changesGraph.nodes[uid]
+            if self.isNodeNoLock(uid):
+                self.database.nodes[uid].clear()
+                self.database.nodes[uid].update(nodeAttributes)
+            else:
+                self.database.add_node(uid, **nodeAttributes)
+        for edgeStart, edgeEnd, edgeAttributes in changesGraph.edges(data=True):
+            if self.database.has_edge(edgeStart, edgeEnd):
+                self.database.edges[edgeStart, edgeEnd].clear()
+                self.database.edges[edgeStart, edgeEnd].update(edgeAttributes)
+            else:
+                self.database.add_edge(edgeStart, edgeEnd, **edgeAttributes)
+
+    def getJournalEntryNoLock(self, storage: DatabaseStorage) -> list:
+        """
+        Create a journal entry out of all the entities and links that changed since the last save.
+        """
+        changedEntities = []
+        removedEntities = []
+        for uid in self.dirtyEntities:
+            if self.isNodeNoLock(uid):
+                changedEntities.append(uid)
+            else:
+                removedEntities.append(uid)
+        changedLinks = []
+        removedLinks = []
+        for linkUID in self.dirtyLinks:
+            if self.database.has_edge(*linkUID):
+                changedLinks.append(linkUID)
+            else:
+                removedLinks.append(list(linkUID))
+
+        nodes, edges = self.mainWindow.RESOURCEHANDLER.deconstructGraphForFileDump(
+            self.database, changedEntities, changedLinks, storage.iconStoreDirectory)
+        return [nodes, edges, removedEntities, removedLinks]
+
+    def rebuildPrimaryFieldIndex(self) -> None:
+        """
+        Re-index all entities. Needs to be done whenever the recognised entity types change, since entities
+          whose type was unknown could not be indexed by their primary field.
+        """
+        with self.dbLock.writing():
+            self.rebuildPrimaryFieldIndexNoLock()
+
+    def rebuildPrimaryFieldIndexNoLock(self) -> None:
+        self.primaryFieldIndex = {}
+        self.primaryFieldIndexKeys = {}
+        self.unindexedEntities = set()
+        for node in self.database.nodes:
+            self.indexEntityNoLock(self.database.nodes[node])
+
+    def indexEntityNoLock(self, entity: dict) -> None:
+        """
+        Add the entity to the primary field index, replacing any previous index entry it had.
+        """
+        uid = entity.get('uid')
+        entityType = entity.get('Entity Type')
+        primaryField = self.mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType(entityType)
+        primaryValue = None if primaryField is None else entity.get(primaryField)
+        if primaryField is not None and self.primaryFieldIndexKeys.get(uid) == (primaryValue, entityType):
+            # Already indexed, and kept in place so that the order of the entities does not change.
+            return
+        self.unindexEntityNoLock(uid)
+        if primaryField is None:
+            self.unindexedEntities.add(uid)
+            return
+        try:
+            self.primaryFieldIndex.setdefault(primaryValue, {}).setdefault(entityType, {})[uid] = None
+        except TypeError:
+            # Unhashable primary field value - should not happen with well-formed entities.
+            self.unindexedEntities.add(uid)
+            return
+        self.primaryFieldIndexKeys[uid] = (primaryValue, entityType)
+
+    def unindexEntityNoLock(self, uid: str) -> None:
+        self.unindexedEntities.discard(uid)
+        indexKey = self.primaryFieldIndexKeys.pop(uid, None)
+        if indexKey is None:
+            return
+        primaryValue, entityType = indexKey
+        typesDict = self.primaryFieldIndex[primaryValue]
+        typesDict[entityType].pop(uid, None)
+        if not typesDict[entityType]:
+            del typesDict[entityType]
+            if not typesDict:
+                del self.primaryFieldIndex[primaryValue]
+
+    def rebuildFieldTextIndexNoLock(self) -> None:
+        self.fieldTextIndex.clear()
+        for node, nodeAttributes in self.database.nodes.items():
+            self.fieldTextIndex.addEntity(node, nodeAttributes)
+
+    def rebuildEntityCreationDatesNoLock(self) -> None:
+        self.entityCreationDates = {}
+        for node, nodeAttributes in self.database.nodes.items():
+            self.recordEntityCreationDateNoLock(node, nodeAttributes)
+
+    def recordEntityCreationDateNoLock(self, uid: str, entity: dict) -> None:
+        dateCreated = entity.get('Date Created')
+        try:
+            self.entityCreationDates[uid] = (dateCreated, parseDate(dateCreated))
+        except (TypeError, ValueError, OverflowError):
+            self.entityCreationDates.pop(uid, None)
+
+    def getEntityCreationDate(self, entity: dict) -> Union[datetime, None]:
+        """
+        Returns the parsed 'Date Created' value of the given entity, or None if it is not a valid date.
+        """
+        dateCreated = entity.get('Date Created')
+        with self.dbLock.reading():
+            recordedDate = self.entityCreationDates.get(entity.get('uid'))
+        if recordedDate is not None and recordedDate[0] == dateCreated:
+            return recordedDate[1]
+        try:
+            return parseDate(dateCreated)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    def searchEntities(self, field: str, checkType: str, searchText: str,
+                       snapshot: nx.DiGraph = None) -> Union[set, None]:
+        """
+        Returns the uids of the entities whose value for the given field matches the search text, according
+          to the given check type ("EQ", "CONTAINS", "STARTSWITH", "ENDSWITH" or "RMATCH").
+        Values are compared as strings. Entities that do not have the field are never matched.
+
+        If a snapshot is given, the search only happens if the snapshot is still up to date, since
+          the index always reflects the current state of the database.
+        Returns None if the search could not be done.
+        """
+        with self.dbLock.reading():
+            if snapshot is not None and (snapshot is not self.snapshot or self.snapshotVersion != self.version):
+                return None
+            return self.fieldTextIndex.search(field, checkType, searchText)
+
     def resetTimeline(self) -> None:
         """
         Reset the timeline on dockBarThree to reflect the current state of the database.
+        The reset happens when the pending changes to the database are published.
         """
-        with self.dbLock:
-            if self.database is not None:
-                self.mainWindow.resetTimeline(self.database)
+        self.eventBus.timelineReset()
 
     def updateTimeline(self, node, added: bool, updateGraph: bool = True) -> None:
         """
         Update the timeline on dockBarThree to reflect the newest change of the database.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             self.mainWindow.updateTimeline(node, added, updateGraph)
 
-    def save(self) -> None:
-        """
-        Saves the graph to the specified file.
-        """
+    def save(self, compact: bool = False) -> None:
+        """
+        Saves the graph to the project's database storage.
+
+        Only the changes made since the last save are written, unless compact is True,
+        or the storage changed (i.e. the project was saved somewhere else, or its
+        database backend was changed).
+        """
+
+        # Get the database storage again, in case it changed.
+        storage = self.getDatabaseStorage()
+        with self.dbLock.writing():
+            self.saveNoLock(storage, compact)
+
+    def saveNoLock(self, storage: DatabaseStorage, compact: bool = False) -> None:
+        previousStorage = self.storage
+        if compact or previousStorage is None or storage.databaseFile != previousStorage.databaseFile or \
+                not storage.exists():
+            # The compaction thread could otherwise overwrite the file we are about to write.
+            self.waitForCompaction()
+            self.mainWindow.RESOURCEHANDLER.beginIconStorePrune()
+            nodes, edges = self.mainWindow.RESOURCEHANDLER.deconstructGraphForFileDump(
+                self.database, iconStoreDirectory=storage.iconStoreDirectory)
+            storage.writeAll(nodes, edges)
+            self.mainWindow.RESOURCEHANDLER.pruneIconStore(storage.iconStoreDirectory, nodes)
+            if previousStorage is not None and storage.databaseFile.parent == previousStorage.databaseFile.parent \
+                    and storage.databaseFile != previousStorage.databaseFile:
+                # The backend of the project was changed - the old files would only get stale.
+                previousStorage.delete()
+            self.storage = storage
+            self.dirtyEntities.clear()
+            self.dirtyLinks.clear()
+            self.mainWindow.MESSAGEHANDLER.info('Database Saved.')
+            return
 
-        # Get the database file path again, in case it changed.
-        databaseFile = Path(self.mainWindow.SETTINGS.value("Project/FilesDir")).joinpath("LocalEntitiesDB.lsdb")
-        if databaseFile is None:
-            raise ValueError('Database File is None, cannot save database.')
-        with self.dbLock:
-            tmpSavePath = databaseFile.with_suffix(f'{databaseFile.suffix}.tmp')
-            with open(tmpSavePath, "wb") as dbFile:
-                dump(self.mainWindow.RESOURCEHANDLER.deconstructGraphForFileDump(self.database), dbFile)
-            move(tmpSavePath, databaseFile)
+        if self.dirtyEntities or self.dirtyLinks:
+            storage.writeChanges(*self.getJournalEntryNoLock(storage))
+            self.dirtyEntities.clear()
+            self.dirtyLinks.clear()
             self.mainWindow.MESSAGEHANDLER.info('Database Saved.')
 
-    def addEntity(self, entJson: dict, fromServer: bool = False, updateTimeline: bool = True) -> Union[dict, None]:
+        if storage.needsCompaction():
+            self.startCompactionNoLock(storage)
+
+    def startCompactionNoLock(self, storage: DatabaseStorage) -> None:
         """
-        Adds the entity represented by the json dictionary to the database.
+        Rewrite the database storage on a background thread, so that the changes written since the last
+        full write can be discarded.
         """
-        with self.dbLock:
-            returnValue = None
+        if self.compactionThread is not None and self.compactionThread.is_alive():
+            return
+        storage.beginCompaction()
+        # Icons saved while compacting are not in the copy, but must not be pruned.
+        self.mainWindow.RESOURCEHANDLER.beginIconStorePrune()
 
-            # Check if we're overwriting an existing entity
-            exists = None
-            if entJson.get('uid') is not None:
-                exists = self.getEntityNoLock(entJson.get('uid'))
+        # Copying the graph is far cheaper than serializing it, so the lock is not held for long.
+        databaseCopy = self.database.copy()
+        self.compactionThread = Thread(target=self.compactDatabase, args=(databaseCopy, storage), daemon=True)
+        self.compactionThread.start()
 
-            entity = self.mainWindow.RESOURCEHANDLER.getEntityJson(
-                entJson.get('Entity Type'),
-                entJson)
+    def compactDatabase(self, databaseCopy: nx.DiGraph, storage: DatabaseStorage) -> None:
+        """
+        Runs on the compaction thread. Does not touch the live database.
+        Icons that none of the entities use anymore are deleted from the icon store afterwards.
+        """
+        try:
+            # The icons go with the storage being compacted, even if the project is saved elsewhere meanwhile.
+            nodes, edges = self.mainWindow.RESOURCEHANDLER.deconstructGraphForFileDump(
+                databaseCopy, iconStoreDirectory=storage.iconStoreDirectory)
+            storage.finishCompaction(nodes, edges)
+            self.mainWindow.RESOURCEHANDLER.pruneIconStore(storage.iconStoreDirectory, nodes)
+            self.mainWindow.MESSAGEHANDLER.debug('Database journal compacted.', exc_info=False)
+        except Exception as exc:
+            self.mainWindow.MESSAGEHANDLER.error(f'Could not compact Database journal: {exc}', popUp=False)
 
-            if entity is None:
-                return returnValue
-            # Use uid as key. Code is holdover from the time when primary field == uid.
-            self.database.add_node(entity['uid'], **entity)
-            returnValue = entity
-            if exists:
-                # Update canvases if the node already exists.
-                self.mainWindow.updateEntityNodeLabelsOnCanvases(entity['uid'], entity[list(entity)[1]])
-
-        if not fromServer:
-            self.mainWindow.sendLocalDatabaseUpdateToServer(entity, 1)
-        self.mainWindow.populateEntitiesWidget(returnValue, add=True)
-
-        if updateTimeline:
-            if exists is not None:
-                # Remove existing item before re-adding.
-                self.updateTimeline(exists, False, updateGraph=False)
-            self.updateTimeline(entity, True, updateGraph=True)
+    def waitForCompaction(self) -> None:
+        """
+        Block until the background compaction (if any) is done.
+        """
+        if self.compactionThread is not None:
+            self.compactionThread.join()
+            self.compactionThread = None
 
-        return returnValue
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Holds back change events until the outermost batch exits, so that everything changed in the
+        batch is published together even if the event loop runs in the meantime (i.e. progress dialogs).
+        """
+        self.eventBus.hold()
+        try:
+            yield
+        finally:
+            self.eventBus.release()
+
+    def putNodeNoLock(self, uid: str, attributes: dict) -> None:
+        """
+        Adds the node, or merges the given attributes into the existing node.
+
+        The attribute dict of an existing node is replaced instead of changed, so that
+        snapshots sharing the old dict are unaffected.
+        Field names and repeated values are interned, to keep large databases small in memory.
+        """
+        attributes = internAttributes(attributes)
+        uid = intern(uid)
+        existingAttributes = self.database.nodes.get(uid)
+        if existingAttributes is None:
+            self.database.add_node(uid, **attributes)
+        else:
+            # networkx keeps the attribute dicts of nodes in '_node'.
+            self.database._node[uid] = existingAttributes | attributes
+        self.version += 1
+
+    def putEdgeNoLock(self, startUID: str, endUID: str, attributes: dict) -> None:
+        """
+        Same as putNodeNoLock, but for edges.
+        """
+        attributes = internAttributes(attributes)
+        startUID = intern(startUID)
+        endUID = intern(endUID)
+        existingAttributes = self.database.edges.get((startUID, endUID))
+        if existingAttributes is None:
+            self.database.add_edge(startUID, endUID, **attributes)
+        else:
+            # The successor and predecessor adjacency dicts share the same attribute dict for each edge.
+            mergedAttributes = existingAttributes | attributes
+            self.database._succ[startUID][endUID] = mergedAttributes
+            self.database._pred[endUID][startUID] = mergedAttributes
+        self.version += 1
+
+    def getSnapshot(self) -> nx.DiGraph:
+        return self.getVersionedSnapshot()[0]
+
+    def getVersionedSnapshot(self) -> tuple:
+        """
+        Returns a frozen snapshot of the database, along with the version of the database it was taken at.
+        Versions only ever increase, so the same version always refers to the same database contents.
+
+        The snapshot shares its entity and link dicts with the database instead of copying them.
+        This is safe since the database replaces those dicts when they change, rather than
+        modifying them, and only hands out copies of them. The same snapshot is handed out until
+        the database changes.
+        """
+        with self.dbLock.reading():
+            snapshot = self.snapshot
+            if snapshot is None or self.snapshotVersion != self.version:
+                snapshot = nx.DiGraph()
+                snapshot.graph.update(self.database.graph)
+                snapshot._node.update(self.database._node)
+                for startUID, successors in self.database._succ.items():
+                    snapshot._succ[startUID] = dict(successors)
+                for endUID, predecessors in self.database._pred.items():
+                    snapshot._pred[endUID] = dict(predecessors)
+                nx.freeze(snapshot)
+                self.snapshot = snapshot
+                self.snapshotVersion = self.version
+            snapshotVersion = self.snapshotVersion
+        return snapshot, snapshotVersion
+
+    def addEntity(self, entJson: dict, fromServer: bool = False, updateTimeline: bool = True) -> Union[dict, None]:
+        """
+        Adds the entity represented by the json dictionary to the database.
+        """
+        with self.dbLock.writing():
+            return self.addEntityNoLock(entJson, fromServer, updateTimeline)
 
     def addEntities(self, entitiesJsonList: Union[list, set, tuple], fromServer: bool = False) -> list:
-        with self.dbLock:
+        with self.batch(), self.dbLock.writing():
             returnValue = []
-
             for entJson in entitiesJsonList:
-                # Check if we're overwriting an existing entity
-                exists = None
-                if entJson.get('uid') is not None:
-                    exists = self.getEntityNoLock(entJson.get('uid'))
-
-                entity = self.mainWindow.RESOURCEHANDLER.getEntityJson(
-                    entJson.get('Entity Type'),
-                    entJson)
-
-                if entity is None:
-                    continue
-                # Use uid as key. Code is holdover from the time when primary field == uid.
-                self.database.add_node(entity['uid'], **entity)
-                returnValue.append(entity)
-                if exists:
-                    # Update canvases if the node already exists.
-                    self.mainWindow.updateEntityNodeLabelsOnCanvases(entity['uid'], entity[list(entity)[1]])
-                if not fromServer:
-                    self.mainWindow.sendLocalDatabaseUpdateToServer(entity, 1)
-                self.mainWindow.populateEntitiesWidget(entity, add=True)
-
-        self.resetTimeline()
-
+                entity = self.addEntityNoLock(entJson, fromServer, True)
+                if entity is not None:
+                    returnValue.append(entity)
         return returnValue
 
+    def addEntityNoLock(self, entJson: dict, fromServer: bool, updateTimeline: bool) -> Union[dict, None]:
+        # Check if we're overwriting an existing entity
+        exists = None
+        if entJson.get('uid') is not None:
+            exists = self.getEntityNoLock(entJson.get('uid'))
+
+        entity = self.mainWindow.RESOURCEHANDLER.getEntityJson(
+            entJson.get('Entity Type'),
+            entJson)
+
+        if entity is None:
+            return None
+        # Use uid as key. Code is holdover from the time when primary field == uid.
+        self.putNodeNoLock(entity['uid'], entity)
+        self.dirtyEntities.add(entity['uid'])
+        self.indexEntityNoLock(self.database.nodes[entity['uid']])
+        self.fieldTextIndex.updateEntity(entity['uid'], self.database.nodes[entity['uid']])
+        self.recordEntityCreationDateNoLock(entity['uid'], self.database.nodes[entity['uid']])
+        self.eventBus.entityChanged(entity['uid'], exists, self.database.nodes[entity['uid']], fromServer,
+                                    updateTimeline)
+        return entity
+
     def addLink(self, linkJson: dict, fromServer: bool = False, overwrite: bool = False) -> Union[dict, None]:
         """
         Add a link between two entities in the database.
@@ -152,7 +538,7 @@ class EntitiesDB:
         :param fromServer:
         :return:
         """
-        with self.dbLock:
+        with self.dbLock.writing():
             exists = self.isLinkNoLock(linkJson['uid'])
             link = self.mainWindow.RESOURCEHANDLER.getLinkJson(linkJson)
             if link is None:
@@ -176,30 +562,21 @@ class EntitiesDB:
                             link['Notes'] = str(newNotes)
                         else:
                             link['Notes'] = f"{exists['Notes']}\n\n{str(newNotes)}"
-                    exists.update(link)
-                    link.update(exists)
-                    # Update canvases if the link already exists.
-                    # We can do this before updating the database here because the GUI will be updated only after this
-                    #   function returns. If we ever execute this function outside the main event loop, we will need
-                    #   to alter the execution flow.
-                    self.mainWindow.updateLinkLabelsOnCanvases(f"{linkUID[0]}{linkUID[1]}", link['Resolution'])
-                self.database.add_edge(linkUID[0], linkUID[1], **link)
-
-        if not fromServer:
-            if overwrite:
-                self.mainWindow.sendLocalDatabaseUpdateToServer(link, 3)
-            else:
-                self.mainWindow.sendLocalDatabaseUpdateToServer(link, 1)
+                    link.update(exists | link)
+                self.putEdgeNoLock(linkUID[0], linkUID[1], link)
+                self.dirtyLinks.add((linkUID[0], linkUID[1]))
+                self.eventBus.linkChanged((linkUID[0], linkUID[1]), exists or None,
+                                          self.database.edges[linkUID[0], linkUID[1]], fromServer, overwrite)
         return link
 
     def getEntity(self, uid: str) -> Union[dict, None]:
         """
-        Returns the attributes of the given entity uid as a dict.
+        Returns a copy of the attributes of the given entity uid as a dict.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = None
             try:
-                returnValue = self.database.nodes[uid]
+                returnValue = dict(self.database.nodes[uid])
             except KeyError:
                 self.mainWindow.MESSAGEHANDLER.warning(f"Tried to get entity with nonexistent UID: {uid}")
             finally:
@@ -207,12 +584,12 @@ class EntitiesDB:
 
     def getAllEntities(self) -> Union[None, list]:
         """
-        Returns a list containing the Json representation of every entity in the database.
+        Returns a list containing a copy of the Json representation of every entity in the database.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = None
             try:
-                returnValue = [self.database.nodes[node] for node in self.database.nodes()]
+                returnValue = [dict(self.database.nodes[node]) for node in self.database.nodes()]
             except KeyError as keyError:
                 self.mainWindow.MESSAGEHANDLER.error(f"Tried to get entity with nonexistent UID. Error: {keyError}")
             finally:
@@ -220,13 +597,13 @@ class EntitiesDB:
 
     def getAllLinks(self) -> Union[None, list]:
         """
-        Returns a list containing the Json representation of every link in the database.
+        Returns a list containing a copy of the Json representation of every link in the database.
         :return:
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = None
             try:
-                returnValue = [self.database.edges[edge] for edge in self.database.edges()]
+                returnValue = [dict(self.database.edges[edge]) for edge in self.database.edges()]
             except KeyError:
                 self.mainWindow.MESSAGEHANDLER.error("Tried to get link with nonexistent UID.")
             finally:
@@ -249,12 +626,12 @@ class EntitiesDB:
 
     def getLink(self, uid) -> Union[None, dict]:
         """
-        Returns the attributes of the given link uid as a dict.
+        Returns a copy of the attributes of the given link uid as a dict.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = None
             try:
-                returnValue = self.database.edges[uid]
+                returnValue = dict(self.database.edges[uid])
             except KeyError:
                 self.mainWindow.MESSAGEHANDLER.error(f"Tried to get link with nonexistent UID: {uid}")
             finally:
@@ -264,69 +641,73 @@ class EntitiesDB:
         """
         Removes the entity with the given uid, if it exists.
         """
-        with self.dbLock:
+        with self.dbLock.writing():
             ent = None
             if self.isNodeNoLock(uid):
                 ent = self.getEntityNoLock(uid)
-                self.mainWindow.populateEntitiesWidget(ent, add=False)
                 self.database.remove_node(uid)
+                self.version += 1
+                self.dirtyEntities.add(uid)
+                self.unindexEntityNoLock(uid)
+                self.fieldTextIndex.removeEntity(uid)
+                self.entityCreationDates.pop(uid, None)
+                self.eventBus.entityChanged(uid, ent, None, fromServer, updateTimeLine)
 
         if ent is not None:
             self.mainWindow.handleGroupNodeUpdateAfterEntityDeletion(uid)  # Blocking - locks the db.
-            if not fromServer:
-                self.mainWindow.sendLocalDatabaseUpdateToServer(ent, 2)
-            if updateTimeLine:
-                self.updateTimeline(ent, False)
 
     def removeLink(self, uid, fromServer=False) -> None:
         """
         Removes the link with the given uid (in string or tuple form),
         if it exists.
         """
-        with self.dbLock:
-            if self.isLinkNoLock(uid):
+        with self.dbLock.writing():
+            link = self.isLinkNoLock(uid)
+            if link:
                 self.database.remove_edge(uid[0], uid[1])
-        if not fromServer:
-            self.mainWindow.sendLocalDatabaseUpdateToServer({"uid": uid}, 2)
+                self.version += 1
+                self.dirtyLinks.add((uid[0], uid[1]))
+                self.eventBus.linkChanged((uid[0], uid[1]), link, None, fromServer)
 
     def doesEntityExist(self, primaryAttr: str) -> bool:
         """
         Checks if an entity with the specified primary attribute exists.
+        Entities of unknown types are not indexed, so their first attribute after the uid is checked instead.
         """
-        with self.dbLock:
-            result = False
-            for node in self.database.nodes():
-                details = self.database.nodes[node]
-                if details[list(details)[1]] == primaryAttr:
-                    result = True
-                    break
+        with self.dbLock.reading():
+            try:
+                result = primaryAttr in self.primaryFieldIndex
+            except TypeError:
+                result = False
+            if not result:
+                result = any(next(islice(self.database.nodes[uid].values(), 1, None), None) == primaryAttr
+                             for uid in self.unindexedEntities)
         return result
 
     def getEntityOfType(self, primaryAttr: str, entityType: str) -> Union[dict, None]:
         """
         Checks if an entity with the specified primary attribute exists, and if it does, return it.
+        If there are several, the one that was added first is returned.
         """
         result = None
-        primaryField = self.mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType(entityType)
-        if primaryField is None:
-            return result
-        with self.dbLock:
-            for node in self.database.nodes():
-                details = self.database.nodes[node]
-                if details['Entity Type'] == entityType and details[primaryField] == primaryAttr:
-                    result = dict(details)
-                    break
+        with self.dbLock.reading():
+            try:
+                matchingUIDs = self.primaryFieldIndex.get(primaryAttr, {}).get(entityType)
+            except TypeError:
+                matchingUIDs = None
+            if matchingUIDs:
+                result = dict(self.database.nodes[next(iter(matchingUIDs))])
         return result
 
     def getLinkIfExists(self, uid) -> Union[None, dict]:
         """
-        Returns the attributes of the given link uid as a dict.
+        Returns a copy of the attributes of the given link uid as a dict.
         Does not create an error if the link does not exist.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = None
             try:
-                returnValue = self.database.edges[uid]
+                returnValue = dict(self.database.edges[uid])
             except KeyError:
                 pass
             finally:
@@ -336,7 +717,7 @@ class EntitiesDB:
         """
         Get all incoming edges for the given entity uid (primary attribute).
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = self.database.in_edges(uid) if self.isNodeNoLock(uid) else None
         return returnValue
 
@@ -344,7 +725,7 @@ class EntitiesDB:
         """
         Get all outgoing edges for the given entity uid (primary attribute).
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = self.database.out_edges(uid) if self.isNodeNoLock(uid) else None
         return returnValue
 
@@ -353,7 +734,7 @@ class EntitiesDB:
         Returns True if the uid (primary attribute) given exists as
         an entity, and False otherwise.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = isinstance(uid, str) and self.database.nodes.get(uid) is not None
         return returnValue
 
@@ -370,7 +751,7 @@ class EntitiesDB:
         """
         Returns True if the uid given exists as a link, and False otherwise.
         """
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = isinstance(uid, tuple) and self.database.edges.get(uid) is not None
         return returnValue
 
@@ -385,7 +766,7 @@ class EntitiesDB:
         return False
 
     def getEntityType(self, uid: str) -> Union[None, dict]:
-        with self.dbLock:
+        with self.dbLock.reading():
             returnValue = None
             try:
                 returnValue = self.getEntityNoLock(uid)['Entity Type']
@@ -399,7 +780,7 @@ class EntitiesDB:
         Merges the existing database with the one provided.
         Overwrites older attributes with newer ones based on date last edited.
         """
-        with self.dbLock:
+        with self.dbLock.writing():
             differenceGraph = nx.DiGraph()
             differenceGraph.add_nodes_from([(n, nDict)
                                             for n, nDict in newDB_nodes.items() if (n not in self.database.nodes()) or
@@ -416,10 +797,22 @@ class EntitiesDB:
                                             )
                                             ])
             if differenceGraph.number_of_nodes():
-                self.database = nx.compose(self.database, differenceGraph)
+                # Merge in place rather than composing a whole new graph.
                 # Some nodes given by differenceGraph may be empty dicts, with an existing node's uid as the key.
-                for node in differenceGraph.nodes:
-                    self.mainWindow.populateEntitiesWidget(self.database.nodes[node], add=True)
+                # The server is synced below, if needed, so the changes are published as coming from the server.
+                for node, nodeAttributes in differenceGraph.nodes.items():
+                    previousAttributes = self.database.nodes.get(node)
+                    self.putNodeNoLock(node, nodeAttributes)
+                    self.indexEntityNoLock(self.database.nodes[node])
+                    self.fieldTextIndex.updateEntity(node, self.database.nodes[node])
+                    self.recordEntityCreationDateNoLock(node, self.database.nodes[node])
+                    self.eventBus.entityChanged(node, previousAttributes, self.database.nodes[node], True)
+                for edge, edgeAttributes in differenceGraph.edges.items():
+                    previousAttributes = self.database.edges.get(edge)
+                    self.putEdgeNoLock(edge[0], edge[1], edgeAttributes)
+                    self.eventBus.linkChanged(edge, previousAttributes, self.database.edges[edge], True)
+                self.dirtyEntities.update(differenceGraph.nodes)
+                self.dirtyLinks.update(differenceGraph.edges)
 
                 if not fromServer and self.mainWindow.FCOM.isConnected():
                     # Assume we are already synced with server, so just send the difference.
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+from threading import Lock
+from typing import Union
+
+from PySide6 import QtCore
+
+
+class DatabaseChanges:
+    """
+    The changes made to the entities database since changes were last published.
+
+    Changes are coalesced per item: an entity that was added and then updated is
+    reported as added, with its latest attributes, while an entity that was added
+    and then removed is not reported at all.
+    """
+
+    def __init__(self) -> None:
+        # uid -> [attributes before the first change (None if the item did not exist),
+        #         attributes after the last change (None if the item was removed),
+        #         whether any of the changes were made locally (i.e. not received from the server),
+        #         whether the timeline should be updated to reflect the changes,
+        #         whether a link was overwritten rather than merged with the existing one]
+        self.entities = {}
+        self.links = {}
+        self.resetTimeline = False
+
+    def __bool__(self) -> bool:
+        return bool(self.entities or self.links or self.resetTimeline)
+
+    @staticmethod
+    def recordChange(items: dict, uid, previous: Union[dict, None], current: Union[dict, None],
+                     fromServer: bool, updateTimeline: bool, overwrite: bool = False) -> None:
+        change = items.get(uid)
+        if change is None:
+            items[uid] = [previous, current, not fromServer, updateTimeline, overwrite]
+        else:
+            change[1] = current
+            change[2] = change[2] or not fromServer
+            # Whoever changes an item without updating the timeline resets it afterwards.
+            change[3] = change[3] and updateTimeline
+            change[4] = change[4] or overwrite
+
+    @staticmethod
+    def getChanges(items: dict, existedBefore: bool, existsAfter: bool) -> list:
+        return [(uid, change) for uid, change in items.items()
+                if (change[0] is not None) == existedBefore and (change[1] is not None) == existsAfter]
+
+    def addedEntities(self) -> list:
+        return self.getChanges(self.entities, False, True)
+
+    def updatedEntities(self) -> list:
+        return self.getChanges(self.entities, True, True)
+
+    def removedEntities(self) -> list:
+        return self.getChanges(self.entities, True, False)
+
+    def addedLinks(self) -> list:
+        return self.getChanges(self.links, False, True)
+
+    def updatedLinks(self) -> list:
+        return self.getChanges(self.links, True, True)
+
+    def removedLinks(self) -> list:
+        return self.getChanges(self.links, True, False)
+
+
+class DatabaseEventBus(QtCore.QObject):
+    """
+    Collects the changes made to the entities database, and publishes them once per
+    iteration of the event loop, on the main thread.
+
+    Changes can be recorded from any thread. Subscribers connect to 'changesPublished',
+    which carries a DatabaseChanges object.
+    """
+
+    changesPublished = QtCore.Signal(object)
+    flushRequested = QtCore.Signal()
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.changesLock = Lock()
+        self.pendingChanges = DatabaseChanges()
+        self.flushScheduled = False
+        self.holdCount = 0
+        # Queued, so that the flush happens on the thread this object lives in, once control
+        #   returns to the event loop.
+        self.flushRequested.connect(self.flush, QtCore.Qt.ConnectionType.QueuedConnection)
+
+    def scheduleFlushNoLock(self) -> None:
+        if not self.flushScheduled and not self.holdCount:
+            self.flushScheduled = True
+            self.flushRequested.emit()
+
+    def entityChanged(self, uid: str, previous: Union[dict, None], current: Union[dict, None],
+                      fromServer: bool = False, updateTimeline: bool = True) -> None:
+        with self.changesLock:
+            self.pendingChanges.recordChange(self.pendingChanges.entities, uid, previous, current,
+                                             fromServer, updateTimeline)
+            self.scheduleFlushNoLock()
+
+    def linkChanged(self, uid: tuple, previous: Union[dict, None], current: Union[dict, None],
+                    fromServer: bool = False, overwrite: bool = False) -> None:
+        with self.changesLock:
+            self.pendingChanges.recordChange(self.pendingChanges.links, uid, previous, current,
+                                             fromServer, True, overwrite)
+            self.scheduleFlushNoLock()
+
+    def timelineReset(self) -> None:
+        with self.changesLock:
+            self.pendingChanges.resetTimeline = True
+            self.scheduleFlushNoLock()
+
+    def hold(self) -> None:
+        """
+        Do not publish any changes until release is called.
+        """
+        with self.changesLock:
+            self.holdCount += 1
+
+    def release(self) -> None:
+        with self.changesLock:
+            self.holdCount -= 1
+            if self.pendingChanges:
+                self.scheduleFlushNoLock()
+
+    @QtCore.Slot()
+    def flush(self) -> None:
+        with self.changesLock:
+            self.flushScheduled = False
+            if self.holdCount or not self.pendingChanges:
+                return
+            changes = self.pendingChanges
+            self.pendingChanges = DatabaseChanges()
+        self.changesPublished.emit(changes)
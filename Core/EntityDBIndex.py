@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+import re
+import networkx as nx
+from typing import Callable, Union, Iterator, Optional
+
+from Core.GlobalVariables import non_string_fields
+
+# Fields that are never searched by value. UIDs are unique to each entity, so indexing
+#   them would only make the index bigger.
+unindexed_fields = non_string_fields + ('uid',)
+
+
+class FieldTextIndex:
+    """
+    Inverted index over the values of entity fields, for searching by value without
+    going through every entity.
+
+    Values are indexed the way LQL compares them, i.e. converted to strings.
+    Each distinct value is broken into trigrams, so that substring searches only have
+    to check the values that contain every trigram of the searched text.
+
+    The values indexed for each entity are recorded, so that they can be removed when the
+    entity changes, even if the entity was modified in place.
+    """
+
+    def __init__(self) -> None:
+        # uid -> (Field, Value) pairs indexed for the entity.
+        self.entityValues = {}
+        # Field -> Value -> uids of the entities with that value in that field.
+        self.fieldValues = {}
+        # Trigram -> Values containing the trigram.
+        self.trigramValues = {}
+        # Value -> Number of fields across all entities with that value.
+        self.valueReferences = {}
+
+    def clear(self) -> None:
+        self.entityValues.clear()
+        self.fieldValues.clear()
+        self.trigramValues.clear()
+        self.valueReferences.clear()
+
+    @staticmethod
+    def getTrigrams(value: str) -> set:
+        return {value[index:index + 3] for index in range(len(value) - 2)}
+
+    @staticmethod
+    def getIndexedValues(entity: dict) -> Iterator[tuple]:
+        for field, value in entity.items():
+            if field not in unindexed_fields:
+                yield field, str(value)
+
+    def addEntity(self, uid: str, entity: dict) -> None:
+        """
+        Index the values of the entity, replacing any values indexed for it before.
+        """
+        self.removeEntity(uid)
+        indexedValues = tuple(self.getIndexedValues(entity))
+        self.entityValues[uid] = indexedValues
+        for field, value in indexedValues:
+            valueUIDs = self.fieldValues.setdefault(field, {}).setdefault(value, set())
+            valueUIDs.add(uid)
+            references = self.valueReferences.get(value, 0)
+            if references == 0:
+                for trigram in self.getTrigrams(value):
+                    self.trigramValues.setdefault(trigram, set()).add(value)
+            self.valueReferences[value] = references + 1
+
+    def removeEntity(self, uid: str) -> None:
+        for field, value in self.entityValues.pop(uid, ()):
+            fieldIndex = self.fieldValues[field]
+            valueUIDs = fieldIndex[value]
+            valueUIDs.remove(uid)
+            if not valueUIDs:
+                del fieldIndex[value]
+                if not fieldIndex:
+                    del self.fieldValues[field]
+            references = self.valueReferences[value] - 1
+            if references:
+                self.valueReferences[value] = references
+                continue
+            del self.valueReferences[value]
+            for trigram in self.getTrigrams(value):
+                trigramValues = self.trigramValues[trigram]
+                trigramValues.discard(value)
+                if not trigramValues:
+                    del self.trigramValues[trigram]
+
+    def updateEntity(self, uid: str, entity: Optional[dict]) -> None:
+        if entity is None:
+            self.removeEntity(uid)
+        else:
+            self.addEntity(uid, entity)
+
+    def getCandidateValues(self, fieldIndex: dict, searchText: str) -> Iterator[str]:
+        """
+        Returns the values of the field that could contain the search text.
+        """
+        trigrams = self.getTrigrams(searchText)
+        if not trigrams:
+            # Too short to use trigrams; check every distinct value of the field instead.
+            return iter(list(fieldIndex))
+        valueSets = []
+        for trigram in trigrams:
+            trigramValues = self.trigramValues.get(trigram)
+            if not trigramValues:
+                return iter(())
+            valueSets.append(trigramValues)
+        valueSets.sort(key=len)
+        candidateValues = valueSets[0].intersection(*valueSets[1:])
+        return (value for value in candidateValues if value in fieldIndex)
+
+    @staticmethod
+    def getValueCheck(checkType: str, searchText: str) -> Union[Callable[[str], bool], None]:
+        """
+        Returns a function that checks whether a value matches the search text, according to the given
+          check type ("EQ", "CONTAINS", "STARTSWITH", "ENDSWITH" or "RMATCH"), or None for unknown check types.
+        """
+        if checkType == "EQ":
+            return lambda value: value == searchText
+        if checkType == "CONTAINS":
+            return lambda value: searchText in value
+        if checkType == "STARTSWITH":
+            return lambda value: value.startswith(searchText)
+        if checkType == "ENDSWITH":
+            return lambda value: value.endswith(searchText)
+        if checkType == "RMATCH":
+            try:
+                expression = re.compile(searchText)
+            except re.error:
+                return lambda value: False
+            return lambda value: expression.match(value) is not None
+        return None
+
+    def search(self, field: str, checkType: str, searchText: str) -> Union[set, None]:
+        """
+        Returns the uids of the entities whose value for the given field matches the search text.
+        Returns None if the index cannot answer the search.
+        """
+        valueCheck = self.getValueCheck(checkType, searchText)
+        if valueCheck is None or field in unindexed_fields:
+            return None
+        fieldIndex = self.fieldValues.get(field, {})
+        if checkType == "EQ":
+            return set(fieldIndex.get(searchText, ()))
+
+        if checkType == "RMATCH":
+            candidateValues = list(fieldIndex)
+        else:
+            candidateValues = self.getCandidateValues(fieldIndex, searchText)
+        matchingUIDs = set()
+        for value in candidateValues:
+            if valueCheck(value):
+                matchingUIDs.update(fieldIndex[value])
+        return matchingUIDs
+
+
+class ReachabilityIndex:
+    """
+    Answers ancestor and descendant questions about a snapshot of the database graph,
+    without traversing the graph once for every entity asked about.
+
+    Ancestors and descendants of a single entity are found with one traversal, and kept
+    for as long as the index is. Ancestor and descendant counts are computed for every
+    entity at once, over the condensation of the graph: every strongly connected component
+    is labelled with a bitset of the entities reachable from it, built from the labels of
+    the components it links to.
+
+    The snapshot must not change while the index is in use.
+    """
+
+    # Counting checks whether to stop after this many components.
+    CANCEL_CHECK_INTERVAL = 10000
+
+    def __init__(self, graph: nx.DiGraph) -> None:
+        self.graph = graph
+        self.descendants = {}
+        self.ancestors = {}
+        # Entity -> Component, numbered in topological order.
+        self.componentOfNode = None
+        self.componentSizes = None
+        self.componentSuccessors = None
+        self.componentPredecessors = None
+        self.descendantCounts = None
+        self.ancestorCounts = None
+
+    def getDescendants(self, node: str) -> set:
+        if node not in self.descendants:
+            self.descendants[node] = nx.descendants(self.graph, node) if node in self.graph else set()
+        return self.descendants[node]
+
+    def getAncestors(self, node: str) -> set:
+        if node not in self.ancestors:
+            self.ancestors[node] = nx.ancestors(self.graph, node) if node in self.graph else set()
+        return self.ancestors[node]
+
+    def buildComponents(self) -> None:
+        if self.componentOfNode is not None:
+            return
+        condensation = nx.condensation(self.graph)
+        componentOrder = {component: index
+                          for index, component in enumerate(nx.topological_sort(condensation))}
+        componentSizes = [0] * len(componentOrder)
+        componentSuccessors = [()] * len(componentOrder)
+        componentPredecessors = [()] * len(componentOrder)
+        for component, index in componentOrder.items():
+            componentSizes[index] = len(condensation.nodes[component]['members'])
+            componentSuccessors[index] = [componentOrder[successor]
+                                          for successor in condensation.successors(component)]
+            componentPredecessors[index] = [componentOrder[predecessor]
+                                            for predecessor in condensation.predecessors(component)]
+        # Set last, so that a build that was interrupted part of the way through is started over.
+        self.componentSizes = componentSizes
+        self.componentSuccessors = componentSuccessors
+        self.componentPredecessors = componentPredecessors
+        self.componentOfNode = {node: componentOrder[component]
+                                for node, component in condensation.graph['mapping'].items()}
+
+    def countReachable(self, componentsInOrder: Iterator[int], linkedComponents: list,
+                       checkCancelled: Optional[Callable[[], None]] = None) -> list:
+        """
+        Returns the number of entities reachable from each component, given the components in an order
+        where every component comes after all the components it can reach.
+
+        Each component's bitset is merged into the bitsets of the components that link to it as soon as it
+        is complete, and then dropped, so that only the bitsets of partially labelled components are kept.
+        Every component has one bit per entity in it, so that the number of entities reachable is the number of
+        bits set. Bits are numbered in the order components are labelled, so that early components have small
+        bitsets.
+
+        checkCancelled is called every so often, and is expected to raise an exception to stop counting.
+        """
+        partialBitsets = {}
+        counts = [0] * len(self.componentSizes)
+        firstBit = 0
+        for labelled, component in enumerate(componentsInOrder):
+            if checkCancelled is not None and labelled % self.CANCEL_CHECK_INTERVAL == 0:
+                checkCancelled()
+            componentSize = self.componentSizes[component]
+            bitset = partialBitsets.pop(component, 0) | ((1 << componentSize) - 1) << firstBit
+            firstBit += componentSize
+            # Entities do not count themselves, but do count the rest of their component.
+            counts[component] = bitset.bit_count() - 1
+            for linkedComponent in linkedComponents[component]:
+                partialBitsets[linkedComponent] = partialBitsets.get(linkedComponent, 0) | bitset
+        return counts
+
+    def getDescendantCount(self, node: str, checkCancelled: Optional[Callable[[], None]] = None) -> int:
+        if self.descendantCounts is None:
+            self.buildComponents()
+            self.descendantCounts = self.countReachable(reversed(range(len(self.componentSizes))),
+                                                        self.componentPredecessors, checkCancelled)
+        return self.descendantCounts[self.componentOfNode[node]]
+
+    def getAncestorCount(self, node: str, checkCancelled: Optional[Callable[[], None]] = None) -> int:
+        if self.ancestorCounts is None:
+            self.buildComponents()
+            self.ancestorCounts = self.countReachable(iter(range(len(self.componentSizes))),
+                                                      self.componentSuccessors, checkCancelled)
+        return self.ancestorCounts[self.componentOfNode[node]]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+import sqlite3
+from abc import ABC, abstractmethod
+from os import fsync
+from pathlib import Path
+from shutil import move, copyfileobj
+from typing import Union, Iterator, Optional
+
+from msgpack import load, dump, packb, unpackb, Unpacker
+
+
+class DatabaseStorage(ABC):
+    """
+    Persists the entities database.
+
+    Storage classes work with the output of ResourceHandler.deconstructGraphForFileDump, i.e. a
+    dict of nodes (uid: attributes) and a list of edges ([uid1, uid2, attributes]).
+    The database itself is always kept in memory by EntitiesDB; this only dictates how
+    it is written to and read from disk.
+    """
+
+    name = None
+    fileName = None
+
+    def __init__(self, filesDirectory: Path) -> None:
+        self.databaseFile = filesDirectory / self.fileName
+        # Icons of the entities are stored once each, next to the database.
+        self.iconStoreDirectory = filesDirectory / 'Icons'
+
+    def exists(self) -> bool:
+        return self.databaseFile.exists()
+
+    @abstractmethod
+    def loadAll(self) -> Optional[list]:
+        """
+        Returns the nodes and edges that were last written in full, or None if nothing was written yet.
+        """
+
+    def readChanges(self) -> Iterator[list]:
+        """
+        Returns the changes that were written since the last full write, oldest first.
+        Changes are lists of the form: [nodes, edges, removed node uids, removed edge uids]
+        """
+        return iter(())
+
+    @abstractmethod
+    def writeAll(self, nodes: dict, edges: list) -> None:
+        pass
+
+    @abstractmethod
+    def writeChanges(self, nodes: dict, edges: list, removedNodes: list, removedEdges: list) -> None:
+        pass
+
+    def needsCompaction(self) -> bool:
+        return False
+
+    def beginCompaction(self) -> None:
+        """
+        Called with the database locked, right before its contents are copied for compaction.
+        """
+
+    def finishCompaction(self, nodes: dict, edges: list) -> None:
+        """
+        Called from the compaction thread with the contents copied when compaction began.
+        """
+
+    def delete(self) -> None:
+        self.databaseFile.unlink(missing_ok=True)
+
+
+class MsgpackJournalStorage(DatabaseStorage):
+    """
+    Writes the whole database to one msgpack file, and every save after that to a journal next to it.
+    Once the journal grows large enough, it is compacted back into the database file.
+    """
+
+    name = 'Msgpack'
+    fileName = 'LocalEntitiesDB.lsdb'
+
+    # The journal is compacted once it grows past this many bytes, or past half the
+    #   size of the database file, whichever is bigger.
+    JOURNAL_COMPACTION_MIN_SIZE = 1024 * 1024
+
+    def __init__(self, filesDirectory: Path) -> None:
+        super().__init__(filesDirectory)
+        # The active journal, and the journal that is being compacted.
+        self.journalFile = self.databaseFile.with_suffix('.lsjournal')
+        self.oldJournalFile = self.journalFile.with_suffix(f'{self.journalFile.suffix}.old')
+
+    def loadAll(self) -> Optional[list]:
+        try:
+            with open(self.databaseFile, "rb") as dbFile:
+                return load(dbFile)
+        except FileNotFoundError:
+            return None
+
+    def readChanges(self) -> Iterator[list]:
+        # The journal being compacted (if any) is older than the active one, so it is read first.
+        for journalFile in (self.oldJournalFile, self.journalFile):
+            try:
+                with open(journalFile, "rb") as journal:
+                    # A partially written entry at the end of the journal (i.e. if the application crashed
+                    #   while saving) is ignored by the unpacker.
+                    yield from Unpacker(journal)
+            except FileNotFoundError:
+                continue
+
+    def writeDatabaseFile(self, nodes: dict, edges: list) -> None:
+        tmpSavePath = self.databaseFile.with_suffix(f'{self.databaseFile.suffix}.tmp')
+        with open(tmpSavePath, "wb") as dbFile:
+            dump((nodes, edges), dbFile)
+        move(tmpSavePath, self.databaseFile)
+
+    def writeAll(self, nodes: dict, edges: list) -> None:
+        self.writeDatabaseFile(nodes, edges)
+        self.journalFile.unlink(missing_ok=True)
+        self.oldJournalFile.unlink(missing_ok=True)
+
+    def writeChanges(self, nodes: dict, edges: list, removedNodes: list, removedEdges: list) -> None:
+        with open(self.journalFile, "ab") as journal:
+            dump([nodes, edges, removedNodes, removedEdges], journal)
+            journal.flush()
+            fsync(journal.fileno())
+
+    def needsCompaction(self) -> bool:
+        try:
+            return self.journalFile.stat().st_size > max(self.JOURNAL_COMPACTION_MIN_SIZE,
+                                                         self.databaseFile.stat().st_size // 2)
+        except FileNotFoundError:
+            return False
+
+    def beginCompaction(self) -> None:
+        if self.oldJournalFile.exists():
+            # Left over from a compaction that was interrupted. Its contents are already part of the database.
+            with open(self.oldJournalFile, "ab") as oldJournal, open(self.journalFile, "rb") as journal:
+                copyfileobj(journal, oldJournal)
+            self.journalFile.unlink()
+        else:
+            move(self.journalFile, self.oldJournalFile)
+
+    def finishCompaction(self, nodes: dict, edges: list) -> None:
+        self.writeDatabaseFile(nodes, edges)
+        self.oldJournalFile.unlink(missing_ok=True)
+
+    def delete(self) -> None:
+        super().delete()
+        self.journalFile.unlink(missing_ok=True)
+        self.oldJournalFile.unlink(missing_ok=True)
+
+
+class SQLiteStorage(DatabaseStorage):
+    """
+    Keeps every entity and link in its own row of an SQLite database, so that saves only
+    touch the rows that changed.
+
+    Entities are keyed by uid, and links by both of their ends, so that removing an entity
+    can find its links.
+    """
+
+    name = 'SQLite'
+    fileName = 'LocalEntitiesDB.sqlite'
+
+    def __init__(self, filesDirectory: Path) -> None:
+        super().__init__(filesDirectory)
+        # The tables are only created on the first connection, rather than checked on every save.
+        self.tablesCreated = False
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.databaseFile)
+        if not self.tablesCreated:
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS entities (
+                    uid TEXT PRIMARY KEY,
+                    attributes BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS links (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    attributes BLOB NOT NULL,
+                    PRIMARY KEY (source, target)
+                );
+                CREATE INDEX IF NOT EXISTS links_target ON links (target);
+            ''')
+            self.tablesCreated = True
+        return connection
+
+    @staticmethod
+    def getEntityRows(nodes: dict) -> Iterator[tuple]:
+        for uid, attributes in nodes.items():
+            yield uid, packb(attributes)
+
+    @staticmethod
+    def getLinkRows(edges: list) -> Iterator[tuple]:
+        for source, target, attributes in edges:
+            yield source, target, packb(attributes)
+
+    def loadAll(self) -> Optional[list]:
+        if not self.exists():
+            return None
+        connection = self.connect()
+        try:
+            nodes = {uid: unpackb(attributes)
+                     for uid, attributes in connection.execute('SELECT uid, attributes FROM entities')}
+            edges = [[source, target, unpackb(attributes)]
+                     for source, target, attributes in connection.execute(
+                         'SELECT source, target, attributes FROM links')]
+        finally:
+            connection.close()
+        return [nodes, edges]
+
+    def writeAll(self, nodes: dict, edges: list) -> None:
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('DELETE FROM entities')
+                connection.execute('DELETE FROM links')
+                connection.executemany('INSERT INTO entities (uid, attributes) VALUES (?, ?)',
+                                       self.getEntityRows(nodes))
+                connection.executemany('INSERT INTO links VALUES (?, ?, ?)', self.getLinkRows(edges))
+        finally:
+            connection.close()
+
+    def writeChanges(self, nodes: dict, edges: list, removedNodes: list, removedEdges: list) -> None:
+        connection = self.connect()
+        try:
+            with connection:
+                connection.executemany('DELETE FROM links WHERE source = ? AND target = ?',
+                                       (tuple(edgeUID) for edgeUID in removedEdges))
+                # Removing an entity removes its links as well.
+                connection.executemany('DELETE FROM links WHERE source = ?1 OR target = ?1',
+                                       ((uid,) for uid in removedNodes))
+                connection.executemany('DELETE FROM entities WHERE uid = ?', ((uid,) for uid in removedNodes))
+                connection.executemany('INSERT OR REPLACE INTO entities (uid, attributes) VALUES (?, ?)',
+                                       self.getEntityRows(nodes))
+                connection.executemany('INSERT OR REPLACE INTO links VALUES (?, ?, ?)', self.getLinkRows(edges))
+        finally:
+            connection.close()
+
+    def delete(self) -> None:
+        super().delete()
+        self.tablesCreated = False
+
+
+STORAGE_BACKENDS = {storage.name: storage for storage in (MsgpackJournalStorage, SQLiteStorage)}
+
+
+def getStorage(backendName: Union[str, None], filesDirectory: Path) -> DatabaseStorage:
+    return STORAGE_BACKENDS.get(backendName, MsgpackJournalStorage)(filesDirectory)
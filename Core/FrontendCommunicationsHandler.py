@@ -380,7 +380,8 @@ class CommunicationsHandler(QtCore.QObject):
         else:
             for res_result in resolution_result:
                 if res_icon := res_result[0].get('Icon'):
-                    res_result[0]['Icon'] = QtCore.QByteArray(b64decode(res_icon))
+                    res_result[0]['Icon'] = self.mainWindow.RESOURCEHANDLER.internIcon(
+                        QtCore.QByteArray(b64decode(res_icon)))
             self.receive_completed_resolution_result_signal.emit(resolution_name, resolution_result,
                                                                  resolution_uid)
         self.remove_server_resolution_from_running_signal.emit(resolution_uid)
@@ -501,7 +502,8 @@ class CommunicationsHandler(QtCore.QObject):
     #   network traffic.
     def receiveDatabaseUpdateEvent(self, entity_json: dict, add: int) -> None:
         with contextlib.suppress(KeyError):
-            entity_json['Icon'] = QtCore.QByteArray(b64decode(entity_json['Icon']))
+            entity_json['Icon'] = self.mainWindow.RESOURCEHANDLER.internIcon(
+                QtCore.QByteArray(b64decode(entity_json['Icon'])))
         self.receive_project_database_update.emit(entity_json, add)
 
     def sendDatabaseUpdateEvent(self, project_name: str, entity_json: dict, add: int) -> None:
@@ -7,6 +7,8 @@ hidden_fields = ('uid', 'Date Last Edited', 'Child UIDs', 'Canvas Banner', 'Enti
 hidden_fields_dockbars = ('uid', 'Child UIDs', 'Canvas Banner', 'Icon')
 meta_fields = ('Child UIDs',)
 avoid_parsing_fields = ('uid', 'Date Last Edited', 'Child UIDs', 'Icon', 'Canvas Banner')
+# Fields whose values are shared by many entities or links, and so are worth interning.
+interned_value_fields = ('uid', 'Entity Type', 'Resolution')
 
 # Closer to the top means more recent.
 user_agents = {'Chrome': {'Windows': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
@@ -355,100 +355,91 @@ class TabbedPane(QtWidgets.QTabWidget):
         progress.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
         progress.setMinimumDuration(1500)
 
-        # In case we have no entities in the database when the resolution finishes, i.e. the user deletes the origin
-        #   node for the resolution, or runs something that creates nodes from nothing.
-        if allEntities := [(entity['uid'], (entity[list(entity)[1]], entity['Entity Type']))
-                           for entity in self.entityDB.getAllEntities()]:
-            allEntityUIDs, allEntityPrimaryFieldsAndTypes = map(list, zip(*allEntities))
-        else:
-            allEntityUIDs = []
-            allEntityPrimaryFieldsAndTypes = []
-        allLinks = [linkUID['uid'] for linkUID in self.entityDB.getAllLinks()]
+        allLinks = {linkJson['uid'] for linkJson in self.entityDB.getAllLinks()}
         links = []
         newNodeUIDs = []
         nodesCreatedCount = 0
         nodesUpdatedCount = 0
         linksCreatedCount = 0
         linksUpdatedCount = 0
-        for resultList in resolution_result:
-            newNodeJSON = resultList[0]
-            newNodeEntityType = newNodeJSON.get('Entity Type')
-            # Cannot assume proper order of dicts sent over the net.
-            newNodePrimaryFieldKey = self.mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType(newNodeEntityType)
-            newNodePrimaryField = newNodeJSON.get(newNodePrimaryFieldKey)
-            if not newNodeEntityType or not newNodePrimaryField:
-                continue
+        # The entities widget is updated once all the new entities are in.
+        with self.entityDB.batch():
+            for resultList in resolution_result:
+                newNodeJSON = resultList[0]
+                newNodeEntityType = newNodeJSON.get('Entity Type')
+                # Cannot assume proper order of dicts sent over the net.
+                newNodePrimaryFieldKey = self.mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType(newNodeEntityType)
+                newNodePrimaryField = newNodeJSON.get(newNodePrimaryFieldKey)
+                if not newNodeEntityType or not newNodePrimaryField:
+                    continue
 
-            try:
-                # Attempt to get the index of an existing entity that shares primary field and type with the new
-                #   entity. Those two entities are considered to be referring to the same thing.
-                newNodeExistsIndex = allEntityPrimaryFieldsAndTypes.index((newNodePrimaryField, newNodeEntityType))
-
-                # If entity already exists, update the fields and re-add
-                newNodeExistingUID = allEntityUIDs[newNodeExistsIndex]
-                existingEntityJSON = self.entityDB.getEntity(newNodeExistingUID)
-                # Remove primary field and entity type, since those are duplicates.
-                del newNodeJSON['Entity Type']
-                del newNodeJSON[newNodePrimaryFieldKey]
-                try:
-                    notesField = newNodeJSON.pop('Notes')
-                    if existingEntityJSON.get('Notes'):
-                        existingEntityJSON['Notes'] += f"\n{notesField}"
-                    else:
-                        existingEntityJSON['Notes'] = str(notesField)
-                except KeyError:
-                    # If no new field was actually added to the entity, don't re-add to the database
-                    if len(newNodeJSON) == 0:
-                        newNodeUIDs.append(newNodeExistingUID)
-                        continue
-                # Remove any 'None' values from new nodes - we want to keep all collected info.
-                for potentiallyNoneKey, potentiallyNoneValue in dict(newNodeJSON).items():
-                    if potentiallyNoneValue is None or potentiallyNoneValue == 'None':
-                        del newNodeJSON[potentiallyNoneKey]
-                # Update old values to new ones, and add new ones where applicable.
-                existingEntityJSON.update(newNodeJSON)
-                self.entityDB.addEntity(existingEntityJSON, fromServer=True, updateTimeline=False)
-                newNodeUIDs.append(newNodeExistingUID)
-                nodesUpdatedCount += 1
-            except ValueError:
-                # If there is no index for which the primary field and entity type of the new node match one of the
-                #   existing ones, the node must indeed be new. We add it here.
-                entityJson = self.entityDB.addEntity(newNodeJSON, fromServer=True, updateTimeline=False)
-                newNodeUIDs.append(entityJson['uid'])
-                # Ensure that different entities involved in the resolution can't independently
-                #   create the same new entities.
-                allEntityUIDs.append(entityJson['uid'])
-                allEntityPrimaryFieldsAndTypes.append((newNodePrimaryField, newNodeEntityType))
-                nodesCreatedCount += 1
-
-        progress.setValue(1)
-        for outputEntityUID, resolutionResultElement in zip(newNodeUIDs, resolution_result):
-            parentsDict = resolutionResultElement[1]
-            for parentID in parentsDict:
-                parentUID = parentID
-                if isinstance(parentUID, int):
-                    parentUID = newNodeUIDs[parentUID]
-                # Sanity check: Check that the node that was used for this resolution still exists.
-                #   If not, do not create link.
-                # Note: The new node was still created.
-                if parentUID in allEntityUIDs:
-                    resolutionName = parentsDict[parentID].get('Resolution', 'Link')
-                    newLinkUID = (parentUID, outputEntityUID)
-                    # Avoid creating more links between the same two entities.
-                    if newLinkUID in allLinks:
-                        linkJson = self.entityDB.getLinkIfExists(newLinkUID)
-                        if resolutionName not in linkJson['Notes']:
-                            linkJson['Notes'] += f"\nConnection also produced by Resolution: {resolutionName}"
-                            self.entityDB.addLink(linkJson, fromServer=True)
-                            linksUpdatedCount += 1
-                    else:
-                        newLink = self.entityDB.addLink({'uid': newLinkUID, 'Resolution': resolutionName,
-                                                         'Notes': parentsDict[parentID].get('Notes', '')},
-                                                        fromServer=True)
-                        if newLink is not None:
-                            links.append((parentUID, outputEntityUID, resolutionName))
-                            allLinks.append(newLinkUID)
-                            linksCreatedCount += 1
+                # An existing entity that shares primary field and type with the new entity is considered to be
+                #   referring to the same thing.
+                # Entities created earlier in this loop are also found here, so different entities involved in the
+                #   resolution can't independently create the same new entities.
+                existingEntity = self.entityDB.getEntityOfType(newNodePrimaryField, newNodeEntityType)
+                if existingEntity is not None:
+                    # If entity already exists, update the fields and re-add
+                    newNodeExistingUID = existingEntity['uid']
+                    existingEntityJSON = self.entityDB.getEntity(newNodeExistingUID)
+                    # Remove primary field and entity type, since those are duplicates.
+                    del newNodeJSON['Entity Type']
+                    del newNodeJSON[newNodePrimaryFieldKey]
+                    try:
+                        notesField = newNodeJSON.pop('Notes')
+                        if existingEntityJSON.get('Notes'):
+                            existingEntityJSON['Notes'] += f"\n{notesField}"
+                        else:
+                            existingEntityJSON['Notes'] = str(notesField)
+                    except KeyError:
+                        # If no new field was actually added to the entity, don't re-add to the database
+                        if len(newNodeJSON) == 0:
+                            newNodeUIDs.append(newNodeExistingUID)
+                            continue
+                    # Remove any 'None' values from new nodes - we want to keep all collected info.
+                    for potentiallyNoneKey, potentiallyNoneValue in dict(newNodeJSON).items():
+                        if potentiallyNoneValue is None or potentiallyNoneValue == 'None':
+                            del newNodeJSON[potentiallyNoneKey]
+                    # Update old values to new ones, and add new ones where applicable.
+                    existingEntityJSON.update(newNodeJSON)
+                    self.entityDB.addEntity(existingEntityJSON, fromServer=True, updateTimeline=False)
+                    newNodeUIDs.append(newNodeExistingUID)
+                    nodesUpdatedCount += 1
+                else:
+                    # If there is no existing entity for which the primary field and entity type match the new node,
+                    #   the node must indeed be new. We add it here.
+                    entityJson = self.entityDB.addEntity(newNodeJSON, fromServer=True, updateTimeline=False)
+                    newNodeUIDs.append(entityJson['uid'])
+                    nodesCreatedCount += 1
+
+            progress.setValue(1)
+            for outputEntityUID, resolutionResultElement in zip(newNodeUIDs, resolution_result):
+                parentsDict = resolutionResultElement[1]
+                for parentID in parentsDict:
+                    parentUID = parentID
+                    if isinstance(parentUID, int):
+                        parentUID = newNodeUIDs[parentUID]
+                    # Sanity check: Check that the node that was used for this resolution still exists.
+                    #   If not, do not create link.
+                    # Note: The new node was still created.
+                    if self.entityDB.isNode(parentUID):
+                        resolutionName = parentsDict[parentID].get('Resolution', 'Link')
+                        newLinkUID = (parentUID, outputEntityUID)
+                        # Avoid creating more links between the same two entities.
+                        if newLinkUID in allLinks:
+                            linkJson = self.entityDB.getLinkIfExists(newLinkUID)
+                            if resolutionName not in linkJson['Notes']:
+                                linkJson['Notes'] += f"\nConnection also produced by Resolution: {resolutionName}"
+                                self.entityDB.addLink(linkJson, fromServer=True)
+                                linksUpdatedCount += 1
+                        else:
+                            newLink = self.entityDB.addLink({'uid': newLinkUID, 'Resolution': resolutionName,
+                                                             'Notes': parentsDict[parentID].get('Notes', '')},
+                                                            fromServer=True)
+                            if newLink is not None:
+                                links.append((parentUID, outputEntityUID, resolutionName))
+                                allLinks.add(newLinkUID)
+                                linksCreatedCount += 1
 
         progress.setValue(2)
 
@@ -924,7 +915,9 @@ class CanvasView(QtWidgets.QGraphicsView):
                         if wasGrouped:
                             self.removeGroupNodeLinksForUID(groupNode.uid, entityUID)
                             groupNodeJson = self.tabbedPane.entityDB.getEntity(groupNode.uid)
-                            groupNodeJson['Child UIDs'].remove(entityUID)
+                            # Lists in the entity are shared with the database, so they are replaced, not changed.
+                            groupNodeJson['Child UIDs'] = [childUID for childUID in groupNodeJson['Child UIDs']
+                                                           if childUID != entityUID]
                             self.tabbedPane.entityDB.addEntity(groupNodeJson)
                             self.scene().addNodeDragDrop(entityUID,
                                                          pos.x() - 20,
@@ -988,8 +981,8 @@ class CanvasView(QtWidgets.QGraphicsView):
                 # Should not be needed.
                 groupNodeJson = self.tabbedPane.entityDB.getEntity(groupNode.uid)
                 if groupNodeJson is not None:
-                    if entityUID in groupNodeJson['Child UIDs']:
-                        groupNodeJson['Child UIDs'].remove(entityUID)
+                    groupNodeJson['Child UIDs'] = [childUID for childUID in groupNodeJson['Child UIDs']
+                                                   if childUID != entityUID]
                     self.tabbedPane.entityDB.addEntity(groupNodeJson)
 
                 break
@@ -1275,8 +1268,7 @@ class CanvasScene(QtWidgets.QGraphicsScene):
         if bannerName:
             try:
                 bannerPathStr = self.parent().getAllBanners()[bannerName]
-                with open(bannerPathStr, 'rb') as bannerFile:
-                    bannerByteArray = QtCore.QByteArray(bannerFile.read())
+                bannerByteArray = self.parent().mainWindow.RESOURCEHANDLER.getBannerPicture(bannerPathStr)
                 for entity in entities:
                     entity.updateBanner(False, bannerByteArray)
             except FileNotFoundError:
@@ -1293,8 +1285,7 @@ class CanvasScene(QtWidgets.QGraphicsScene):
                     if bannerPathStr := self.parent().getAllBanners().get(
                         entityJson.get('Canvas Banner', ''), ''
                     ):
-                        with open(bannerPathStr, 'rb') as bannerFile:
-                            bannerByteArray = QtCore.QByteArray(bannerFile.read())
+                        bannerByteArray = self.parent().mainWindow.RESOURCEHANDLER.getBannerPicture(bannerPathStr)
                         entity.updateBanner(False, bannerByteArray)
                     else:
                         entity.updateBanner(True, None)
@@ -1394,6 +1385,8 @@ class CanvasScene(QtWidgets.QGraphicsScene):
                                                        'add the items to. Aborting.')
                 else:
                     newJson = self.parent().entityDB.getEntity(groupEntityMaybe.uid)
+                    # Lists in the entity are shared with the database, so they are replaced, not changed.
+                    newJson['Child UIDs'] = list(newJson['Child UIDs'])
                     for item in self.itemsToAppendToGroup:
                         self.removeNode(item)
                         self.sceneGraph.add_node(item.uid, groupID=groupEntityMaybe.uid)
@@ -1682,11 +1675,12 @@ class CanvasScene(QtWidgets.QGraphicsScene):
 
         nodesOnCanvas = {}
         for node in self.nodesDict:
-            try:
+            entity = self.parent().entityDB.getEntity(node)
+            entityDate = self.parent().entityDB.getEntityCreationDate(entity) if entity is not None else None
+            if entityDate is not None:
                 # Tiny differences in seconds are not considered to be significant.
-                entityDate = datetime.fromisoformat(
-                    self.parent().entityDB.getEntity(node)['Date Created']).replace(microsecond=0, second=0)
-            except (TypeError, ValueError):
+                entityDate = entityDate.replace(microsecond=0, second=0)
+            else:
                 # Should never happen, but we will handle it if it does.
                 self.parent().mainWindow.MESSAGEHANDLER.warning(f'Entity without valid Date Created: {str(node)}')
                 entityDate = datetime.now().replace(microsecond=0, second=0)
@@ -137,24 +137,47 @@ class EntityList(QtWidgets.QTreeWidget):
                 self.entityCategories[category].setHidden(True)
 
     def addEntity(self, entityJson) -> None:
-        primaryAttr = entityJson[list(entityJson)[1]]
-        entityTypeItem = self.entityTypes[entityJson['Entity Type']]
-        for entityNo in range(entityTypeItem.childCount()):
-            child = entityTypeItem.child(entityNo)
-            if child.uid == entityJson['uid']:
-                child.setText(0, primaryAttr)
-                return
-        pixmapIcon = QtGui.QPixmap()
-        resizedIcon = resizePictureFromBuffer(entityJson['Icon'], (40, 40))
-        pixmapIcon.loadFromData(resizedIcon)
-        EntityWidget(entityTypeItem,
-                     entityJson['uid'],
-                     QtGui.QIcon(pixmapIcon),
-                     primaryAttr)
-        # Un-hide parents of item, if they were hidden.
-        if entityTypeItem.isHidden():
-            entityTypeItem.setHidden(False)
-            entityTypeItem.parent().setHidden(False)
+        self.addEntities([entityJson])
+
+    def addEntities(self, entityJsonList: list) -> None:
+        """
+        Adds the entities, or updates the primary field of the ones that are already listed.
+        Only looks through the existing items of each entity type once.
+        """
+        existingItems = {}
+        entityIcons = {}
+        self.setUpdatesEnabled(False)
+        try:
+            for entityJson in entityJsonList:
+                primaryAttr = entityJson[list(entityJson)[1]]
+                entityTypeItem = self.entityTypes[entityJson['Entity Type']]
+                typeItems = existingItems.get(entityJson['Entity Type'])
+                if typeItems is None:
+                    typeItems = {entityTypeItem.child(entityNo).uid: entityTypeItem.child(entityNo)
+                                 for entityNo in range(entityTypeItem.childCount())}
+                    existingItems[entityJson['Entity Type']] = typeItems
+                child = typeItems.get(entityJson['uid'])
+                if child is not None:
+                    child.setText(0, primaryAttr)
+                    continue
+                # Entities that use the same icon share the same QByteArray.
+                entityIcon = entityIcons.get(id(entityJson['Icon']))
+                if entityIcon is None:
+                    pixmapIcon = QtGui.QPixmap()
+                    resizedIcon = resizePictureFromBuffer(entityJson['Icon'], (40, 40))
+                    pixmapIcon.loadFromData(resizedIcon)
+                    entityIcon = QtGui.QIcon(pixmapIcon)
+                    entityIcons[id(entityJson['Icon'])] = entityIcon
+                typeItems[entityJson['uid']] = EntityWidget(entityTypeItem,
+                                                            entityJson['uid'],
+                                                            entityIcon,
+                                                            primaryAttr)
+                # Un-hide parents of item, if they were hidden.
+                if entityTypeItem.isHidden():
+                    entityTypeItem.setHidden(False)
+                    entityTypeItem.parent().setHidden(False)
+        finally:
+            self.setUpdatesEnabled(True)
 
     def removeEntity(self, entityJson) -> None:
         entityType = self.entityTypes[entityJson['Entity Type']]
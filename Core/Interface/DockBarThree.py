@@ -2,7 +2,6 @@
 
 import contextlib
 from PySide6 import QtWidgets, QtCore, QtCharts, QtGui
-from datetime import datetime
 from getpass import getuser
 import networkx as nx
 import queue
@@ -102,7 +101,9 @@ class TimeWidget(QtWidgets.QWidget):
         return picture
 
     def updateTimeline(self, node, added: bool = True, updateGraph: bool = True):
-        nodeTime = datetime.fromisoformat(node['Date Created'])
+        nodeTime = self.mainWindow.LENTDB.getEntityCreationDate(node)
+        if nodeTime is None:
+            return
 
         nodeYear = nodeTime.year
         nodeMonth = nodeTime.month
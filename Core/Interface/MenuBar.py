@@ -558,22 +558,30 @@ class MenuBar(QtWidgets.QMenuBar):
                             selectedEntityType = importTextFileDialog.importTypeDropdown.currentText()
                             primary_field = importTextFileDialog.typePrimaryFieldValueLabel.text()
 
+                            # Primary field value -> Number of the first line of the file it is on.
+                            # Each value is only imported once.
+                            importedValues = {}
                             with open(fileDirectory, 'r') as importFile:
-                                for line in importFile:
-                                    lineValue = line.strip()
-                                    if lineValue:
-                                        primaryAttr = lineValue.strip()
-                                        newEntityJSON = {primary_field: primaryAttr,
-                                                         'Entity Type': selectedEntityType}
-                                        if newEntityJSON not in newNodes:
-                                            existingEntity = self.parent().LENTDB.getEntityOfType(primaryAttr,
-                                                                                                  selectedEntityType)
-                                            if existingEntity is None:
-                                                newNodes.append(newEntityJSON)
-                                            else:
-                                                existingEntity.update(newEntityJSON)
-                                                # We'll refresh the timeline later.
-                                                self.parent().LENTDB.addEntity(existingEntity, updateTimeline=False)
+                                for lineNumber, line in enumerate(importFile, start=1):
+                                    primaryAttr = line.strip()
+                                    if primaryAttr and primaryAttr not in importedValues:
+                                        importedValues[primaryAttr] = lineNumber
+
+                            # Checked before importing, so that entities that already exist are checked as well.
+                            self.warnAboutInvalidImportValues(
+                                selectedEntityType, {primary_field: list(importedValues)},
+                                list(importedValues.values()))
+                            for primaryAttr in importedValues:
+                                newEntityJSON = {primary_field: primaryAttr,
+                                                 'Entity Type': selectedEntityType}
+                                existingEntity = self.parent().LENTDB.getEntityOfType(primaryAttr,
+                                                                                      selectedEntityType)
+                                if existingEntity is None:
+                                    newNodes.append(newEntityJSON)
+                                else:
+                                    existingEntity.update(newEntityJSON)
+                                    # We'll refresh the timeline later.
+                                    self.parent().LENTDB.addEntity(existingEntity, updateTimeline=False)
 
                     elif importDialog.CSVFileChoice.isChecked():
                         try:
@@ -607,11 +615,20 @@ class MenuBar(QtWidgets.QMenuBar):
                                     importEntityCSVDialog.importToCanvasDropdown.currentText())
 
                             entityTypeToImportAs = importEntityCSVDialog.entityTypeChoiceDropdown.currentText()
+                            # Check each column in one go, rather than each value separately.
+                            self.warnAboutInvalidImportValues(
+                                entityTypeToImportAs,
+                                {str(value).strip(): csvDF.iloc[:, index].astype(str).str.strip().tolist()
+                                 for index, value in enumerate(attributeRows)})
+                            # Rows already imported, so that each is only imported once.
+                            importedRows = set()
                             for row in csvDF.itertuples(index=False):
                                 newEntityJSON = {str(value).strip(): str(row[index]).strip()
                                                  for index, value in enumerate(attributeRows)}
                                 newEntityJSON['Entity Type'] = entityTypeToImportAs
-                                if newEntityJSON not in newNodes:
+                                rowKey = frozenset(newEntityJSON.items())
+                                if rowKey not in importedRows:
+                                    importedRows.add(rowKey)
                                     primaryAttr = newEntityJSON[
                                         self.parent().RESOURCEHANDLER.getPrimaryFieldForEntityType(
                                             entityTypeToImportAs)]
@@ -842,6 +859,24 @@ class MenuBar(QtWidgets.QMenuBar):
             else:
                 self.parent().MESSAGEHANDLER.error('Invalid file path provided!', popUp=True, exc_info=False)
 
+    def warnAboutInvalidImportValues(self, entityType: str, columns: dict,
+                                     rowNumbers: Union[list, None] = None) -> None:
+        """
+        Warn the user about imported values that do not pass the checks for the entity type they are imported as.
+        The values are still imported.
+
+        rowNumbers are the numbers that the rows of the columns are reported as. By default, rows are numbered
+          from 1 in the order they are in.
+        """
+        invalidRows = self.parent().RESOURCEHANDLER.validateAttributeColumns(entityType, columns)
+        if invalidRows:
+            firstRowsAffected = [rowIndex + 1 if rowNumbers is None else rowNumbers[rowIndex]
+                                 for rowIndex in invalidRows[:10]]
+            self.parent().MESSAGEHANDLER.warning(
+                f'{len(invalidRows)} of the imported rows have values that are not valid for {entityType} '
+                f'entities. First rows affected: {", ".join(str(rowNumber) for rowNumber in firstRowsAffected)}',
+                popUp=True)
+
     def savePic(self) -> None:
         canvasSaveDialog = CanvasPictureDialog(self)
         canvasSaveDialogAccept = canvasSaveDialog.exec_()
@@ -3,15 +3,16 @@
 import contextlib
 import csv
 import statistics
-import re
-import networkx as nx
-import string
+import threading
+from collections import Counter, OrderedDict
+from shutil import move
+from msgpack import load, dump
 from typing import Union, Optional, Any
 from uuid import uuid4
 from pathlib import Path
 
 from PySide6 import QtWidgets, QtCore, QtCharts, QtGui
-from Core.GlobalVariables import non_string_fields
+from Core.LQLEngine import LQLEngine, QueryCancelledException
 from Core.ResourceHandler import resizePictureFromBuffer
 from Core.PathHelper import is_path_exists_or_creatable_portable
 
@@ -38,16 +39,31 @@ class QueryBuilderWizard(QtWidgets.QDialog):
         buttonsWidget.setLayout(buttonsWidgetLayout)
         exitButton = QtWidgets.QPushButton('Close')
         exitButton.clicked.connect(self.accept)
-        resetWizardButton = QtWidgets.QPushButton('Reset Wizard')
-        resetWizardButton.clicked.connect(self.updateValues)
+        self.resetWizardButton = QtWidgets.QPushButton('Reset Wizard')
+        self.resetWizardButton.clicked.connect(self.updateValues)
+        explainButton = QtWidgets.QPushButton('Explain Last Query')
+        explainButton.setToolTip('Show the order in which the conditions of the last query were run, '
+                                 'and how many entities each of them matched.')
+        explainButton.clicked.connect(self.explainLastQuery)
         self.runButton = QtWidgets.QPushButton('Run Query')
         self.runButton.clicked.connect(self.runQuery)
         buttonsWidgetLayout.addWidget(exitButton)
-        buttonsWidgetLayout.addWidget(resetWizardButton)
+        buttonsWidgetLayout.addWidget(self.resetWizardButton)
+        buttonsWidgetLayout.addWidget(explainButton)
+        saveViewButton = QtWidgets.QPushButton('Save as Live View')
+        saveViewButton.setToolTip('Save the query in the New Query tab as a live view, '
+                                  'whose results are kept up to date as the database changes.')
+        saveViewButton.clicked.connect(self.saveLiveView)
+        buttonsWidgetLayout.addWidget(saveViewButton)
         buttonsWidgetLayout.addWidget(self.runButton)
         dialogLayout.addWidget(buttonsWidget)
         self.runButton.setDefault(True)
 
+        # Queries run on a separate thread, so that the application stays responsive while they do.
+        self.queryThread = None
+        self.resultsViewer = None
+        self.finished.connect(self.cancelQuery)
+
         #### SELECT
         selectPane = QtWidgets.QWidget()
         selectPaneLayout = QtWidgets.QGridLayout()
@@ -190,17 +206,42 @@ class QueryBuilderWizard(QtWidgets.QDialog):
 
         self.entityDropdownTriplets = []
 
-        self.historyTable = QtWidgets.QTableWidget(0, 7, self)
-        self.historyTable.setSelectionBehavior(self.historyTable.SelectionBehavior.SelectRows)
-        self.historyTable.setSelectionMode(self.historyTable.SelectionMode.SingleSelection)
-        self.historyTable.setAcceptDrops(False)
-        self.historyTable.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
-        self.historyTable.verticalHeader().setCascadingSectionResizes(True)
-        self.historyTable.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)
-        self.historyTable.setHorizontalHeaderLabels(['Query UID', 'Select Clause', 'Select Value(s)', 'Source Clause',
-                                                     'Source Value(s)', 'Condition Clause(s)', 'Modification Values'])
+        # Query UID -> Query arguments, as of the last time the history table was updated.
+        self.historyQueries = {}
+        self.historyTable = QueryTablePane(['Query UID', 'Select Clause', 'Select Value(s)', 'Source Clause',
+                                            'Source Value(s)', 'Condition Clause(s)', 'Modification Values'],
+                                           self.getHistoryValue, self)
+        self.historyTable.tableView.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.historyTable.tableView.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.historyTable.tableView.horizontalHeader().setSectionResizeMode(
+            0, QtWidgets.QHeaderView.ResizeMode.Stretch)
         self.queryNewOrHistory.addTab(self.historyTable, 'History')
 
+        liveViewsPane = QtWidgets.QWidget()
+        liveViewsPaneLayout = QtWidgets.QVBoxLayout()
+        liveViewsPane.setLayout(liveViewsPaneLayout)
+        self.liveViewsTable = QtWidgets.QTableWidget(0, 3, self)
+        self.liveViewsTable.setSelectionBehavior(self.liveViewsTable.SelectionBehavior.SelectRows)
+        self.liveViewsTable.setSelectionMode(self.liveViewsTable.SelectionMode.SingleSelection)
+        self.liveViewsTable.setAcceptDrops(False)
+        self.liveViewsTable.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.liveViewsTable.horizontalHeader().setSectionResizeMode(2, QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self.liveViewsTable.setHorizontalHeaderLabels(['View Name', 'Select Value(s)', 'Condition Clause(s)'])
+        liveViewsButtonsWidget = QtWidgets.QWidget()
+        liveViewsButtonsWidgetLayout = QtWidgets.QHBoxLayout()
+        liveViewsButtonsWidget.setLayout(liveViewsButtonsWidgetLayout)
+        deleteLiveViewButton = QtWidgets.QPushButton('Delete View')
+        deleteLiveViewButton.clicked.connect(self.deleteLiveView)
+        openLiveViewButton = QtWidgets.QPushButton('Open View')
+        openLiveViewButton.setToolTip('Close the wizard, and open the results of the view in a window '
+                                      'that stays up to date as the database changes.')
+        openLiveViewButton.clicked.connect(self.openLiveView)
+        liveViewsButtonsWidgetLayout.addWidget(deleteLiveViewButton)
+        liveViewsButtonsWidgetLayout.addWidget(openLiveViewButton)
+        liveViewsPaneLayout.addWidget(self.liveViewsTable)
+        liveViewsPaneLayout.addWidget(liveViewsButtonsWidget)
+        self.queryNewOrHistory.addTab(liveViewsPane, 'Live Views')
+
         self.updateValues()
         self.resize(1000, 600)
 
@@ -371,116 +412,472 @@ class QueryBuilderWizard(QtWidgets.QDialog):
             pixmapIcon.loadFromData(resizedIcon)
             self.entityDropdownTriplets.append((nodeDetails[list(nodeDetails)[1]], entityUID, pixmapIcon))
 
-        for _ in range(self.historyTable.rowCount()):
-            self.historyTable.removeRow(0)
+        self.historyQueries = dict(self.mainWindowObject.LQLWIZARD.QUERIES_HISTORY)
+        # Most recent queries first.
+        self.historyTable.tableModel.setRowKeys(reversed(self.historyQueries))
+
+        self.updateLiveViews()
+
+    def getHistoryValue(self, queryUID: str, columnIndex: int) -> str:
+        if columnIndex == 0:
+            return str(queryUID)
+        return str(self.historyQueries[queryUID][columnIndex - 1])
+
+    def updateLiveViews(self):
+        self.liveViewsTable.setRowCount(0)
+        for viewName, materializedView in self.mainWindowObject.LQLWIZARD.materializedViews.items():
+            rowIndex = self.liveViewsTable.rowCount()
+            self.liveViewsTable.insertRow(rowIndex)
+            self.liveViewsTable.setItem(rowIndex, 0, QtWidgets.QTableWidgetItem(viewName))
+            self.liveViewsTable.setItem(rowIndex, 1, QtWidgets.QTableWidgetItem(
+                str(materializedView.queryArguments[1])))
+            self.liveViewsTable.setItem(rowIndex, 2, QtWidgets.QTableWidgetItem(
+                str(materializedView.queryArguments[4])))
+
+    def getSelectedLiveView(self):
+        try:
+            viewName = self.liveViewsTable.item(self.liveViewsTable.selectedItems()[0].row(), 0).text()
+        except IndexError:
+            self.mainWindowObject.MESSAGEHANDLER.error('No Live View selected.', popUp=True)
+            return None
+        return self.mainWindowObject.LQLWIZARD.materializedViews.get(viewName)
 
-        for oldQueryUID in self.mainWindowObject.LQLWIZARD.QUERIES_HISTORY:
-            self.historyTable.insertRow(0)
-            self.historyTable.setItem(0, 0, QtWidgets.QTableWidgetItem(str(oldQueryUID)))
-            for valueIndex in range(6):
-                self.historyTable.setItem(0, valueIndex + 1, QtWidgets.QTableWidgetItem(
-                    str(self.mainWindowObject.LQLWIZARD.QUERIES_HISTORY[oldQueryUID][valueIndex])))
+    def saveLiveView(self):
+        queryArguments = self.getQueryArguments()
+        if queryArguments[2] != 'FROMDB':
+            self.mainWindowObject.MESSAGEHANDLER.warning('Only queries on the whole database (FROMDB) can be '
+                                                         'saved as live views.', popUp=True)
+            return
+        viewName, confirm = QtWidgets.QInputDialog.getText(self,
+                                                           'Save as Live View',
+                                                           'View Name:',
+                                                           QtWidgets.QLineEdit.EchoMode.Normal)
+        if not confirm:
+            return
+        if viewName == '':
+            self.mainWindowObject.MESSAGEHANDLER.warning('View name cannot be blank.', popUp=True)
+            return
+        self.mainWindowObject.LQLWIZARD.createMaterializedView(viewName, queryArguments)
+        self.updateLiveViews()
+        self.mainWindowObject.setStatus(f'Saved live view: {viewName}')
+
+    def deleteLiveView(self):
+        materializedView = self.getSelectedLiveView()
+        if materializedView is not None:
+            self.mainWindowObject.LQLWIZARD.removeMaterializedView(materializedView.name)
+            self.updateLiveViews()
+
+    def openLiveView(self):
+        materializedView = self.getSelectedLiveView()
+        if materializedView is None:
+            return
+        viewResults = materializedView.getResults()
+        viewEntities = materializedView.getEntities()
+        liveResultsViewer = QueryResultsViewer(self.mainWindowObject, {uid: viewEntities[uid] for uid in viewResults},
+                                               viewResults, materializedView.getSelectedFields(),
+                                               None, materializedView=materializedView)
+        self.accept()
+        liveResultsViewer.show()
 
     def runQuery(self):
-        # Results
+        if self.queryThread is not None:
+            # The run button cancels the query while one is running.
+            self.cancelQuery()
+            return
+
         if self.queryNewOrHistory.currentIndex() == 0:
-            sourceResults = []
-            for sourceValue in self.sourceValues:
-                sourceResult = [
-                    sourceValue.layout().itemAt(0).widget().currentText(),
-                    sourceValue.layout().itemAt(1).widget().currentText(),
-                    sourceValue.layout().itemAt(2).widget().currentText()
-                    != 'MATCHES',
-                ]
-                if sourceValue.layout().itemAt(3).widget().layout().currentIndex() == 0:
-                    try:
-                        sourceResult.append(
-                            sourceValue.layout().itemAt(3).widget().layout().itemAt(0).widget().selectedItems()[
-                                0].text())
-                    except IndexError:
-                        continue
-                else:
-                    sourceResult.append(sourceValue.layout().itemAt(3).widget().layout().itemAt(1).widget().text())
-                sourceResults.append(sourceResult)
-
-            conditionResults = []
-            for conditionValue in self.conditionValues:
-                conditionResult = conditionValue.getValue()
-                if conditionResult is not None:
-                    conditionResults.append(conditionResult)
-            if not conditionResults:
-                conditionResults = None
-
-            modificationResults = []
-            for modificationValue in self.modificationValues:
-                specifierText = modificationValue.layout().itemAt(1).widget().currentText()
-                modificationResult = [specifierText]
-                if specifierText == 'MODIFY':
-                    try:
-                        modificationResult.append(
-                            modificationValue.layout().itemAt(2).widget().layout().itemAt(0).widget().selectedItems()[
-                                0].text())
-                    except IndexError:
-                        continue
-                else:
-                    modificationResult.append(
-                        modificationValue.layout().itemAt(2).widget().layout().itemAt(1).widget().text())
-                modificationResult.append(modificationValue.layout().itemAt(3).widget().currentText())
-                modificationResults.append(modificationResult)
-            if not modificationResults:
-                modificationResults = None
-
-            currentSelectStatement = self.selectStatementPicker.currentText()
-            if currentSelectStatement == 'SELECT':
-                selectedFields = [
-                    item.text()
-                    for item in self.selectStatementList.selectedItems()
-                ]
-            else:
-                selectedFields = self.selectStatementTextbox.text()
-            sourceStatement = self.sourceStatementPicker.currentText()
-            sourceListOrNone = None if sourceStatement == 'FROMDB' else sourceResults
-
-            resultsSet, modificationsSet = self.mainWindowObject.LQLWIZARD.parseQuery(self.mainWindowObject,
-                                                                                      currentSelectStatement,
-                                                                                      selectedFields, sourceStatement,
-                                                                                      sourceListOrNone,
-                                                                                      conditionResults,
-                                                                                      modificationResults)
-        else:
+            queryArguments = self.getQueryArguments()
+        elif self.queryNewOrHistory.currentIndex() == 1:
             try:
-                selectedHistoryUID = self.historyTable.selectedItems()[0].text()
-                resultsSet, modificationsSet = self.mainWindowObject.LQLWIZARD.parseQuery(
-                    self.mainWindowObject,
-                    *self.mainWindowObject.LQLWIZARD.QUERIES_HISTORY[selectedHistoryUID])
+                selectedHistoryUID = self.historyTable.getSelectedRowKeys()[0]
             except IndexError:
                 self.mainWindowObject.MESSAGEHANDLER.error('No Query selected from history.', popUp=True)
                 return
+            queryArguments = self.historyQueries[selectedHistoryUID]
+        else:
+            self.openLiveView()
+            return
 
-        self.showResults(resultsSet, modificationsSet)
+        self.startQuery(queryArguments)
+
+    def getQueryArguments(self) -> tuple:
+        """
+        Returns the query in the New Query tab.
+        """
+        sourceResults = []
+        for sourceValue in self.sourceValues:
+            sourceResult = [
+                sourceValue.layout().itemAt(0).widget().currentText(),
+                sourceValue.layout().itemAt(1).widget().currentText(),
+                sourceValue.layout().itemAt(2).widget().currentText()
+                != 'MATCHES',
+            ]
+            if sourceValue.layout().itemAt(3).widget().layout().currentIndex() == 0:
+                try:
+                    sourceResult.append(
+                        sourceValue.layout().itemAt(3).widget().layout().itemAt(0).widget().selectedItems()[
+                            0].text())
+                except IndexError:
+                    continue
+            else:
+                sourceResult.append(sourceValue.layout().itemAt(3).widget().layout().itemAt(1).widget().text())
+            sourceResults.append(sourceResult)
+
+        conditionResults = []
+        for conditionValue in self.conditionValues:
+            conditionResult = conditionValue.getValue()
+            if conditionResult is not None:
+                conditionResults.append(conditionResult)
+        if not conditionResults:
+            conditionResults = None
+
+        modificationResults = []
+        for modificationValue in self.modificationValues:
+            specifierText = modificationValue.layout().itemAt(1).widget().currentText()
+            modificationResult = [specifierText]
+            if specifierText == 'MODIFY':
+                try:
+                    modificationResult.append(
+                        modificationValue.layout().itemAt(2).widget().layout().itemAt(0).widget().selectedItems()[
+                            0].text())
+                except IndexError:
+                    continue
+            else:
+                modificationResult.append(
+                    modificationValue.layout().itemAt(2).widget().layout().itemAt(1).widget().text())
+            modificationResult.append(modificationValue.layout().itemAt(3).widget().currentText())
+            modificationResults.append(modificationResult)
+        if not modificationResults:
+            modificationResults = None
+
+        currentSelectStatement = self.selectStatementPicker.currentText()
+        if currentSelectStatement == 'SELECT':
+            selectedFields = [
+                item.text()
+                for item in self.selectStatementList.selectedItems()
+            ]
+        else:
+            selectedFields = self.selectStatementTextbox.text()
+        sourceStatement = self.sourceStatementPicker.currentText()
+        sourceListOrNone = None if sourceStatement == 'FROMDB' else sourceResults
+
+        return (currentSelectStatement, selectedFields, sourceStatement, sourceListOrNone,
+                conditionResults, modificationResults)
+
+    def startQuery(self, queryArguments: tuple):
+        if self.mainWindowObject.LQLWIZARD.queryThread is not None:
+            self.mainWindowObject.MESSAGEHANDLER.warning('Another query is still running. Cancel it from its '
+                                                         'results, or wait for it to finish.', popUp=True)
+            return
+        self.resultsViewer = None
+        self.queryThread = LQLQueryThread(self.mainWindowObject, queryArguments)
+        self.queryThread.sigPartialResults.connect(self.showPartialResults)
+        self.queryThread.sigResults.connect(self.showResults)
+        self.queryThread.sigCancelled.connect(self.queryCancelled)
+        self.queryThread.sigError.connect(self.queryFailed)
+        self.queryThread.finished.connect(self.queryThreadFinished)
+        self.runButton.setText('Cancel Query')
+        # Taking a new snapshot while the query runs would change the data under it.
+        self.resetWizardButton.setEnabled(False)
+        self.mainWindowObject.setStatus('Running query...')
+        self.mainWindowObject.LQLWIZARD.startQueryThread(self.queryThread)
+
+    def cancelQuery(self):
+        if self.queryThread is not None:
+            self.queryThread.requestInterruption()
+
+    def queryThreadFinished(self):
+        self.queryThread = None
+        self.runButton.setText('Run Query')
+        self.resetWizardButton.setEnabled(True)
+
+    def queryCancelled(self):
+        if self.resultsViewer is not None:
+            self.resultsViewer.cancelResults()
+            self.resultsViewer = None
+        self.mainWindowObject.setStatus('Query cancelled.')
+
+    def queryFailed(self, errorMessage: str):
+        self.resultsViewer = None
+        self.mainWindowObject.MESSAGEHANDLER.error(errorMessage, popUp=True)
+
+    def showPartialResults(self, resultUIDs: set, selectedFields: set):
+        # Partial results are only sent for queries that do not modify values, so the snapshot is up-to-date.
+        if self.resultsViewer is None:
+            self.resultsViewer = QueryResultsViewer(self.mainWindowObject,
+                                                    self.mainWindowObject.LQLWIZARD.allEntitiesInit,
+                                                    resultUIDs, selectedFields, None, self.queryThread)
+            self.resultsViewer.open()
+        else:
+            self.resultsViewer.addResultRows(self.mainWindowObject.LQLWIZARD.allEntitiesInit, resultUIDs)
 
     def showResults(self, resultsSet, modificationsSet):
+        self.mainWindowObject.setStatus('Query finished.')
+        numified = modificationsSet[1] if modificationsSet else None
+        if self.resultsViewer is not None:
+            self.resultsViewer.finishResults(self.mainWindowObject.LQLWIZARD.allEntities, resultsSet[0], numified)
+            self.resultsViewer = None
+            return
+
         if not resultsSet:
             self.mainWindowObject.MESSAGEHANDLER.warning('Query returned no results.', popUp=True)
             return
 
-        numified = modificationsSet[1] if modificationsSet else None
         qResultsViewer = QueryResultsViewer(self.mainWindowObject, self.mainWindowObject.LQLWIZARD.allEntities,
                                             resultsSet[0], resultsSet[1], numified)
         qResultsViewer.exec()
 
+    def explainLastQuery(self):
+        lastQueryPlan = self.mainWindowObject.LQLWIZARD.lastQueryPlan
+        if lastQueryPlan is None:
+            self.mainWindowObject.MESSAGEHANDLER.info('There is no query plan to show. '
+                                                      'Run a query with conditions first.', popUp=True)
+            return
+        QueryPlanViewer(lastQueryPlan.explain()).exec()
+
+
+class LQLQueryThread(QtCore.QThread):
+    sigPartialResults = QtCore.Signal(object, object)
+    sigResults = QtCore.Signal(object, object)
+    sigCancelled = QtCore.Signal()
+    sigError = QtCore.Signal(str)
+
+    def __init__(self, mainWindowObject, queryArguments: tuple):
+        # Owned by the main window, so that the thread outlives the wizard and the results viewer,
+        #   which only ask it to stop when they are closed.
+        super().__init__(mainWindowObject)
+        self.mainWindow = mainWindowObject
+        self.queryArguments = queryArguments
+        self.finished.connect(self.deleteLater)
+
+    def run(self) -> None:
+        try:
+            queryResults = self.mainWindow.LQLWIZARD.parseQuery(*self.queryArguments,
+                                                                shouldCancel=self.isInterruptionRequested,
+                                                                onPartialResults=self.sigPartialResults.emit)
+        except QueryCancelledException:
+            self.sigCancelled.emit()
+            return
+        except Exception as e:
+            self.sigError.emit(f'Query failed during run: {str(e)}')
+            return
+        if queryResults is None:
+            self.sigResults.emit(None, None)
+        else:
+            self.sigResults.emit(*queryResults)
+
+
+class QueryTableModel(QtCore.QAbstractTableModel):
+    """
+    Table of rows that are only turned into text when the view asks for them.
+
+    Each row is identified by a key, and getValue(rowKey, columnIndex) returns the text of a cell.
+    Sorting and filtering are done here rather than in a QSortFilterProxyModel, so that they take one pass
+      over the rows in Python, instead of calling data() for every comparison.
+    """
+
+    def __init__(self, headerFields: list, getValue, parent=None):
+        super(QueryTableModel, self).__init__(parent)
+        self.headerFields = headerFields
+        self.getValue = getValue
+        # All rows, in the order they were added.
+        self.rowKeys = []
+        self.rowKeysSet = set()
+        # The rows that pass the filter, in the order they are shown in.
+        self.shownRowKeys = []
+        self.sortColumn = -1
+        self.sortOrder = QtCore.Qt.SortOrder.AscendingOrder
+        self.filterText = ''
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.shownRowKeys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headerFields)
+
+    def data(self, index: QtCore.QModelIndex, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role in (QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.ToolTipRole) and index.isValid():
+            return self.getValue(self.shownRowKeys[index.row()], index.column())
+        return None
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation,
+                   role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role != QtCore.Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Orientation.Horizontal:
+            return self.headerFields[section]
+        return str(section + 1)
+
+    def getRowKey(self, row: int):
+        return self.shownRowKeys[row]
+
+    def getRowValues(self, row: int) -> list:
+        rowKey = self.shownRowKeys[row]
+        return [self.getValue(rowKey, column) for column in range(len(self.headerFields))]
+
+    def rowMatchesFilter(self, rowKey) -> bool:
+        return any(self.filterText in self.getValue(rowKey, column).casefold()
+                   for column in range(len(self.headerFields)))
+
+    @staticmethod
+    def getSortKey(value: str) -> tuple:
+        # Numbers are sorted by value, and before any text.
+        try:
+            return 0, float(value), value
+        except ValueError:
+            return 1, 0.0, value
+
+    def updateShownRows(self) -> None:
+        self.beginResetModel()
+        shownRowKeys = [rowKey for rowKey in self.rowKeys if self.rowMatchesFilter(rowKey)] \
+            if self.filterText else list(self.rowKeys)
+        if self.sortColumn >= 0:
+            shownRowKeys.sort(key=lambda rowKey: self.getSortKey(self.getValue(rowKey, self.sortColumn)),
+                              reverse=self.sortOrder == QtCore.Qt.SortOrder.DescendingOrder)
+        self.shownRowKeys = shownRowKeys
+        self.endResetModel()
+
+    def sort(self, column: int, order=QtCore.Qt.SortOrder.AscendingOrder) -> None:
+        """
+        Sorting by a negative column shows the rows in the order they were added.
+        """
+        self.sortColumn = column
+        self.sortOrder = order
+        self.updateShownRows()
+
+    def setFilterText(self, filterText: str) -> None:
+        self.filterText = filterText.casefold()
+        self.updateShownRows()
+
+    def setRowKeys(self, rowKeys: list) -> None:
+        self.rowKeys = list(rowKeys)
+        self.rowKeysSet = set(self.rowKeys)
+        self.updateShownRows()
+
+    def addRowKeys(self, rowKeys) -> None:
+        newRowKeys = [rowKey for rowKey in rowKeys if rowKey not in self.rowKeysSet]
+        if not newRowKeys:
+            return
+        self.rowKeys.extend(newRowKeys)
+        self.rowKeysSet.update(newRowKeys)
+        if self.sortColumn >= 0:
+            # New rows have to be sorted in with the rest.
+            self.updateShownRows()
+            return
+        if self.filterText:
+            newRowKeys = [rowKey for rowKey in newRowKeys if self.rowMatchesFilter(rowKey)]
+            if not newRowKeys:
+                return
+        firstRow = len(self.shownRowKeys)
+        self.beginInsertRows(QtCore.QModelIndex(), firstRow, firstRow + len(newRowKeys) - 1)
+        self.shownRowKeys.extend(newRowKeys)
+        self.endInsertRows()
+
+    def updateRowKeys(self, rowKeys: set) -> None:
+        """
+        Shows the new values of the given rows. The rows stay where they are until the rows are sorted
+          or filtered again.
+        """
+        if not rowKeys:
+            return
+        changedRows = [row for row, rowKey in enumerate(self.shownRowKeys) if rowKey in rowKeys]
+        if changedRows:
+            self.dataChanged.emit(self.index(changedRows[0], 0),
+                                  self.index(changedRows[-1], len(self.headerFields) - 1))
+
+    def removeRowKeys(self, rowKeys: set) -> None:
+        if self.rowKeysSet.isdisjoint(rowKeys):
+            return
+        self.rowKeys = [rowKey for rowKey in self.rowKeys if rowKey not in rowKeys]
+        self.rowKeysSet.difference_update(rowKeys)
+        self.beginResetModel()
+        self.shownRowKeys = [rowKey for rowKey in self.shownRowKeys if rowKey not in rowKeys]
+        self.endResetModel()
+
+
+class QueryTablePane(QtWidgets.QWidget):
+    """
+    A table of query results or queries, with a box to filter the rows by. Clicking on a column header sorts by it.
+    """
+
+    # Wait for the user to stop typing before filtering, since filtering goes through every row.
+    FILTER_DELAY_MS = 300
+
+    def __init__(self, headerFields: list, getValue, parent=None):
+        super(QueryTablePane, self).__init__(parent)
+        paneLayout = QtWidgets.QVBoxLayout()
+        paneLayout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(paneLayout)
+
+        self.tableModel = QueryTableModel(headerFields, getValue, self)
+
+        self.filterInput = QtWidgets.QLineEdit()
+        self.filterInput.setPlaceholderText('Filter rows...')
+        self.filterInput.setClearButtonEnabled(True)
+        self.filterTimer = QtCore.QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(self.FILTER_DELAY_MS)
+        self.filterTimer.timeout.connect(lambda: self.tableModel.setFilterText(self.filterInput.text()))
+        self.filterInput.textChanged.connect(self.filterTimer.start)
+
+        self.tableView = QtWidgets.QTableView()
+        self.tableView.setModel(self.tableModel)
+        self.tableView.setAcceptDrops(False)
+        self.tableView.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tableView.verticalHeader().setCascadingSectionResizes(True)
+        # Show the rows in the order they were added, until a column is clicked on.
+        self.tableView.horizontalHeader().setSortIndicator(-1, QtCore.Qt.SortOrder.AscendingOrder)
+        self.tableView.setSortingEnabled(True)
+
+        paneLayout.addWidget(self.filterInput)
+        paneLayout.addWidget(self.tableView)
+
+    def getSelectedRowKeys(self) -> list:
+        return [self.tableModel.getRowKey(rowIndex.row())
+                for rowIndex in self.tableView.selectionModel().selectedRows()]
+
+
+class QueryPlanViewer(QtWidgets.QDialog):
+
+    def __init__(self, explanation: str):
+        super(QueryPlanViewer, self).__init__()
+        self.setModal(True)
+        self.setWindowTitle('Query Plan')
+        dialogLayout = QtWidgets.QVBoxLayout()
+        self.setLayout(dialogLayout)
+
+        explanationText = QtWidgets.QPlainTextEdit(explanation)
+        explanationText.setReadOnly(True)
+        explanationText.setLineWrapMode(QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+        explanationText.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.SystemFont.FixedFont))
+        explanationText.setMinimumSize(700, 250)
+        dialogLayout.addWidget(explanationText)
+
+        closeButton = QtWidgets.QPushButton('Close')
+        closeButton.clicked.connect(self.accept)
+        dialogLayout.addWidget(closeButton)
+
 
 class QueryResultsViewer(QtWidgets.QDialog):
+    # Charts show this many of the most common values of their field, and the rest of the values as one bar.
+    MAX_CHART_CATEGORIES = 50
 
     def __init__(self, mainWindowObject, entitiesDict: dict, selectedUIDs: set, selectedFields: set,
-                 numifiedFields: set):
+                 numifiedFields: Optional[set], queryThread: Optional[LQLQueryThread] = None,
+                 materializedView=None):
+        """
+        If a query thread is given, the results are partial, and more are added as the query produces them.
+        If a materialized view is given, the results are kept up to date with the view, and the viewer is not modal,
+          so that it can stay open while working on the project.
+        """
         super(QueryResultsViewer, self).__init__()
         self.mainWindowObject = mainWindowObject
-        self.setModal(True)
-        self.setWindowTitle('Query Results')
+        self.setModal(materializedView is None)
         dialogLayout = QtWidgets.QGridLayout()
         self.setLayout(dialogLayout)
-        self.selectedUIDs = selectedUIDs
+        self.selectedUIDs = set()
+        self.queryThread = queryThread
+        self.materializedView = materializedView
 
         self.resultsTabbedPane = QtWidgets.QTabWidget(self)
         dialogLayout.addWidget(self.resultsTabbedPane, 0, 0, 2, 2)
@@ -490,71 +887,115 @@ class QueryResultsViewer(QtWidgets.QDialog):
             self.headerFields.remove('uid')
         self.headerFields.insert(0, 'uid')
 
-        self.resultsTable = QtWidgets.QTableWidget(0, len(self.headerFields), self)
-        self.resultsTable.setHorizontalHeaderLabels(self.headerFields)
-        self.resultsTable.setAcceptDrops(False)
-        self.resultsTable.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
-        self.resultsTable.verticalHeader().setCascadingSectionResizes(True)
+        # uid -> Entity, for every row of the results table.
+        self.resultEntities = {}
+        self.resultsTable = QueryTablePane(self.headerFields, self.getResultValue, self)
         for index in range(1, len(self.headerFields)):
-            self.resultsTable.horizontalHeader().setSectionResizeMode(index, QtWidgets.QHeaderView.ResizeMode.Stretch)
+            self.resultsTable.tableView.horizontalHeader().setSectionResizeMode(
+                index, QtWidgets.QHeaderView.ResizeMode.Stretch)
 
-        for count, uid in enumerate(selectedUIDs):
-            self.resultsTable.insertRow(count)
-            for index, field in enumerate(self.headerFields):
-                self.resultsTable.setItem(count, index, QtWidgets.QTableWidgetItem(
-                    str(entitiesDict[uid].get(field, 'None'))))
+        self.addResultRows(entitiesDict, selectedUIDs)
 
         self.resultsTabbedPane.addTab(self.resultsTable, 'Table')
 
         self.charts = {}
-        for headerField in self.headerFields[1:]:
-            values = {}
-            for entity in entitiesDict:
-                entityValue = str(entitiesDict[entity].get(headerField))
-                if entityValue not in values:
-                    values[entityValue] = 1
-                else:
-                    values[entityValue] += 1
-
-            if not values:
-                # Do not make charts if there are no values to make charts out of.
-                continue
-
-            fieldChart = QtCharts.QChart()
-            chartTitle = f"{headerField} Chart"
-            fieldChart.setTitle(chartTitle)
-            fieldChart.setTheme(QtCharts.QChart.ChartTheme.ChartThemeBlueCerulean)
-            fieldChart.setMargins(QtCore.QMargins(0, 0, 0, 0))
-            chartView = QtCharts.QChartView(fieldChart)
-            chartView.setRubberBand(QtCharts.QChartView.RubberBand.NoRubberBand)
-            chartView.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
-            fieldChart.setAnimationOptions(QtCharts.QChart.AnimationOption.AllAnimations)
-            fieldChart.setAnimationDuration(250)
-            fieldChart.legend().setVisible(True)
-            fieldChart.legend().setAlignment(QtCore.Qt.AlignmentFlag.AlignBottom)
-
-            self.charts[headerField] = (fieldChart, chartView)
-            self.resultsTabbedPane.addTab(chartView, chartTitle)
-
-            barSeries = QtCharts.QBarSeries()
-            barSeries.setName(headerField)
-            for barValue, value in values.items():
-                barSet = QtCharts.QBarSet(barValue)
-                barSet.append(value)
-                barSeries.append(barSet)
-
-            fieldChart.addSeries(barSeries)
-
-            xAxis = QtCharts.QBarCategoryAxis()
-            xAxis.append([headerField])
-            fieldChart.addAxis(xAxis, QtCore.Qt.AlignmentFlag.AlignBottom)
-            barSeries.attachAxis(xAxis)
-
-            yAxis = QtCharts.QValueAxis()
-            yAxis.setRange(0, max(values.values()) + 1)
-            yAxis.applyNiceNumbers()
-            fieldChart.addAxis(yAxis, QtCore.Qt.AlignmentFlag.AlignLeft)
-            barSeries.attachAxis(yAxis)
+        # Field -> Tab of the chart of the field, for the charts that were not made yet.
+        self.pendingCharts = {}
+        self.resultsTabbedPane.currentChanged.connect(self.showPendingChart)
+
+        closeButton = QtWidgets.QPushButton('Close')
+        closeButton.clicked.connect(self.accept)
+        self.exportButton = QtWidgets.QPushButton('Export Table')
+        self.exportButton.clicked.connect(self.exportData)
+        self.selectOnCurrentCanvasButton = QtWidgets.QPushButton('Select Result Entities on Current Canvas')
+        self.selectOnCurrentCanvasButton.clicked.connect(self.selectOnCurrentCanvas)
+        self.cancelButton = QtWidgets.QPushButton('Cancel Query')
+        self.cancelButton.clicked.connect(self.cancelQuery)
+
+        dialogLayout.addWidget(closeButton, 3, 0, 1, 1)
+        dialogLayout.addWidget(self.exportButton, 3, 1, 1, 1)
+        dialogLayout.addWidget(self.selectOnCurrentCanvasButton, 4, 0, 1, 2)
+        dialogLayout.addWidget(self.cancelButton, 5, 0, 1, 2)
+
+        if queryThread is None:
+            self.finishResults(entitiesDict, selectedUIDs, numifiedFields)
+        else:
+            self.setWindowTitle('Query Results (Running...)')
+            self.exportButton.setEnabled(False)
+            self.selectOnCurrentCanvasButton.setEnabled(False)
+            # Closing the results while the query is running cancels the query.
+            self.finished.connect(self.cancelQuery)
+            # The thread deletes itself once it is done, so it must not be used after that.
+            queryThread.finished.connect(self.queryThreadFinished)
+
+        if materializedView is not None:
+            self.setWindowTitle(f'Live View: {materializedView.name}')
+            # Owned by the main window, so that the viewer outlives the wizard that opened it.
+            self.setParent(mainWindowObject, QtCore.Qt.WindowType.Window)
+            self.setAttribute(QtCore.Qt.WidgetAttribute.WA_DeleteOnClose)
+            materializedView.addResultsListener(self.updateLiveResults)
+            self.finished.connect(lambda: materializedView.removeResultsListener(self.updateLiveResults))
+
+    def getResultValue(self, uid: str, columnIndex: int) -> str:
+        return str(self.resultEntities[uid].get(self.headerFields[columnIndex], 'None'))
+
+    def addResultRows(self, entitiesDict: dict, resultUIDs: set):
+        newUIDs = [uid for uid in resultUIDs if uid not in self.selectedUIDs]
+        for uid in newUIDs:
+            self.resultEntities[uid] = entitiesDict[uid]
+        self.selectedUIDs.update(newUIDs)
+        self.resultsTable.tableModel.addRowKeys(newUIDs)
+
+    def removeResultRows(self, resultUIDs: set):
+        removedUIDs = self.selectedUIDs.intersection(resultUIDs)
+        self.resultsTable.tableModel.removeRowKeys(removedUIDs)
+        self.selectedUIDs.difference_update(removedUIDs)
+        for uid in removedUIDs:
+            del self.resultEntities[uid]
+
+    def updateLiveResults(self, addedUIDs: set, removedUIDs: set, changedUIDs: set):
+        self.removeResultRows(removedUIDs)
+        viewEntities = self.materializedView.getEntities()
+        # Changed rows are updated where they are, so that the table keeps its order and selection.
+        shownChangedUIDs = self.selectedUIDs.intersection(changedUIDs)
+        for uid in shownChangedUIDs:
+            self.resultEntities[uid] = viewEntities[uid]
+        self.resultsTable.tableModel.updateRowKeys(shownChangedUIDs)
+        self.addResultRows(viewEntities, addedUIDs.union(changedUIDs.difference(shownChangedUIDs)))
+
+    def cancelQuery(self):
+        if self.queryThread is not None:
+            self.queryThread.requestInterruption()
+
+    def queryThreadFinished(self):
+        self.queryThread = None
+
+    def cancelResults(self):
+        """
+        Keep the partial results of a cancelled query.
+        """
+        self.queryThread = None
+        self.setWindowTitle('Query Results (Cancelled, Partial)')
+        self.cancelButton.setHidden(True)
+        self.exportButton.setEnabled(True)
+        self.selectOnCurrentCanvasButton.setEnabled(True)
+
+    def finishResults(self, entitiesDict: dict, selectedUIDs: set, numifiedFields: Optional[set]):
+        self.addResultRows(entitiesDict, selectedUIDs)
+        self.queryThread = None
+        self.setWindowTitle('Query Results')
+        self.cancelButton.setHidden(True)
+        self.exportButton.setEnabled(True)
+        self.selectOnCurrentCanvasButton.setEnabled(True)
+        if self.resultEntities:
+            for headerField in self.headerFields[1:]:
+                # Charts are made when their tab is first opened, since making them takes a while for many results.
+                chartTab = QtWidgets.QWidget()
+                chartTabLayout = QtWidgets.QVBoxLayout()
+                chartTabLayout.setContentsMargins(0, 0, 0, 0)
+                chartTab.setLayout(chartTabLayout)
+                self.pendingCharts[headerField] = chartTab
+                self.resultsTabbedPane.addTab(chartTab, f"{headerField} Chart")
 
         if numifiedFields:
             for field in numifiedFields:
@@ -605,16 +1046,59 @@ class QueryResultsViewer(QtWidgets.QDialog):
                     numifiedFieldWidget, f'{field} Field Values Information'
                 )
 
-        closeButton = QtWidgets.QPushButton('Close')
-        closeButton.clicked.connect(self.accept)
-        exportButton = QtWidgets.QPushButton('Export Table')
-        exportButton.clicked.connect(self.exportData)
-        selectOnCurrentCanvasButton = QtWidgets.QPushButton('Select Result Entities on Current Canvas')
-        selectOnCurrentCanvasButton.clicked.connect(self.selectOnCurrentCanvas)
+    def showPendingChart(self, tabIndex: int) -> None:
+        tabWidget = self.resultsTabbedPane.widget(tabIndex)
+        for headerField, chartTab in self.pendingCharts.items():
+            if chartTab is tabWidget:
+                del self.pendingCharts[headerField]
+                self.makeChart(headerField, chartTab)
+                return
 
-        dialogLayout.addWidget(closeButton, 3, 0, 1, 1)
-        dialogLayout.addWidget(exportButton, 3, 1, 1, 1)
-        dialogLayout.addWidget(selectOnCurrentCanvasButton, 4, 0, 1, 2)
+    def makeChart(self, headerField: str, chartTab: QtWidgets.QWidget) -> None:
+        values = Counter(str(entity.get(headerField)) for entity in self.resultEntities.values())
+        if not values:
+            # Do not make charts if there are no values to make charts out of.
+            return
+        chartValues = values.most_common(self.MAX_CHART_CATEGORIES)
+        otherValuesCount = sum(values.values()) - sum(count for _, count in chartValues)
+        if otherValuesCount:
+            chartValues.append((f'{len(values) - len(chartValues)} Other Values', otherValuesCount))
+
+        fieldChart = QtCharts.QChart()
+        chartTitle = f"{headerField} Chart"
+        fieldChart.setTitle(chartTitle)
+        fieldChart.setTheme(QtCharts.QChart.ChartTheme.ChartThemeBlueCerulean)
+        fieldChart.setMargins(QtCore.QMargins(0, 0, 0, 0))
+        chartView = QtCharts.QChartView(fieldChart)
+        chartView.setRubberBand(QtCharts.QChartView.RubberBand.NoRubberBand)
+        chartView.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        fieldChart.setAnimationOptions(QtCharts.QChart.AnimationOption.AllAnimations)
+        fieldChart.setAnimationDuration(250)
+        fieldChart.legend().setVisible(True)
+        fieldChart.legend().setAlignment(QtCore.Qt.AlignmentFlag.AlignBottom)
+
+        self.charts[headerField] = (fieldChart, chartView)
+        chartTab.layout().addWidget(chartView)
+
+        barSeries = QtCharts.QBarSeries()
+        barSeries.setName(headerField)
+        for barValue, value in chartValues:
+            barSet = QtCharts.QBarSet(barValue)
+            barSet.append(value)
+            barSeries.append(barSet)
+
+        fieldChart.addSeries(barSeries)
+
+        xAxis = QtCharts.QBarCategoryAxis()
+        xAxis.append([headerField])
+        fieldChart.addAxis(xAxis, QtCore.Qt.AlignmentFlag.AlignBottom)
+        barSeries.attachAxis(xAxis)
+
+        yAxis = QtCharts.QValueAxis()
+        yAxis.setRange(0, max(value for _, value in chartValues) + 1)
+        yAxis.applyNiceNumbers()
+        fieldChart.addAxis(yAxis, QtCore.Qt.AlignmentFlag.AlignLeft)
+        barSeries.attachAxis(yAxis)
 
     def selectOnCurrentCanvas(self):
         self.mainWindowObject.centralWidget().tabbedPane.getCurrentScene().selectNodesFromList(self.selectedUIDs)
@@ -643,12 +1127,10 @@ class QueryResultsViewer(QtWidgets.QDialog):
             with open(exportFilePath, 'w') as fileToWrite:
                 csvWriter = csv.writer(fileToWrite, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
                 csvWriter.writerow(self.headerFields)
-                for rowIndex in range(self.resultsTable.rowCount()):
-                    currColumnValues = [
-                        self.resultsTable.item(rowIndex, columnIndex).text()
-                        for columnIndex in range(self.resultsTable.columnCount())
-                    ]
-                    csvWriter.writerow(currColumnValues)
+                # Rows are written as they are shown, i.e. sorted and filtered.
+                tableModel = self.resultsTable.tableModel
+                for rowIndex in range(tableModel.rowCount()):
+                    csvWriter.writerow(tableModel.getRowValues(rowIndex))
         except FileNotFoundError:
             self.mainWindowObject.MESSAGEHANDLER.error('Cannot write file into a non-existing parent directory. '
                                                        'Please create the required parent directories and try again.',
@@ -801,480 +1283,385 @@ class ConditionClauseWidget(QtWidgets.QFrame):
         return returnValues
 
 
-class LQLQueryBuilder:
-    QUERIES_HISTORY = {}
+class LQLQueryBuilder(LQLEngine):
+    """
+    Runs LQL queries on the application's database and canvases, and keeps the query history and live views.
+    """
+    # Only the most recent queries are kept in the history.
+    QUERY_HISTORY_SIZE = 1000
+    # Results of this many queries are kept, for as long as the database does not change.
+    QUERY_RESULTS_CACHE_SIZE = 16
 
-    databaseSnapshot = None
-    databaseEntities = None
-    allCanvases = None
-    canvasesEntitiesDict = None
-    allEntityFields = None
-    allEntitiesInit = None
-    allEntities = None
+    databaseVersion = None
+    viewsDatabaseVersion = None
+    # The thread running a query on this builder, if any. Only one query runs at a time,
+    #   since the builder keeps the state of the query it is running.
+    queryThread = None
 
     def __init__(self, mainWindow):
+        super().__init__(getPrimaryFieldForEntityType=mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType,
+                         searchEntities=mainWindow.LENTDB.searchEntities)
         self.mainWindow = mainWindow
-
-    def takeSnapshot(self):
-        with self.mainWindow.LENTDB.dbLock:
-            # Create a copy
-            self.databaseSnapshot = self.mainWindow.LENTDB.database.copy()
-
-        self.databaseEntities = set(self.databaseSnapshot.nodes)
-
-        self.allCanvases = self.getAllCanvasNames()
-        self.canvasesEntitiesDict = self.getCanvasesEntitiesDict(self.allCanvases)
-        self.allEntityFields, self.allEntitiesInit = self.getAllEntitiesAndFields()
-
-        # Re-define database entities to remove Group Entities
-        self.databaseEntities = set(self.allEntitiesInit.keys())
-
-    def getAllEntitiesAndFields(self) -> (set, dict):
-        entitiesSnapshot = {entity: self.databaseSnapshot.nodes[entity] for entity in self.databaseSnapshot.nodes
-                            if self.databaseSnapshot.nodes[entity].get('Entity Type') != 'EntityGroup'}
-        entityFields = set()
-        for entityUID in entitiesSnapshot:
-            entityFields.update(entitiesSnapshot[entityUID].keys())
-        for field in non_string_fields:
-            try:
-                entityFields.remove(field)
-            except KeyError:
-                # This typically only happens if there are no entities in the database.
-                continue
-        return entityFields, entitiesSnapshot
-
-    def getAllCanvasNames(self) -> list:
-        canvasNames = list(self.mainWindow.centralWidget().tabbedPane.canvasTabs.keys())
-        canvasNames.append('*')
-        return canvasNames
-
-    def getEntitiesOnCanvas(self, canvasName: str):
+        # Query UID -> (selectClause, selectValue, sourceClause, sourceValues, conditionClauses, modifyQueries)
+        self.QUERIES_HISTORY = {}
+        self.queryHistoryLock = threading.Lock()
+        # (Database version, canvases, normalized query) -> Results of the query.
+        self.queryResultsCache = OrderedDict()
+        # View name -> MaterializedQueryView
+        self.materializedViews = {}
+        # Shared by all live views, and kept separate so that they can be updated while queries are running.
+        self.viewsEngine = LQLEngine(
+            getPrimaryFieldForEntityType=mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType,
+            searchEntities=mainWindow.LENTDB.searchEntities)
+
+    def load(self) -> None:
+        self.loadQueryHistory()
+        self.loadMaterializedViews()
+
+    def getQueryHistoryPath(self) -> Path:
+        return Path(self.mainWindow.SETTINGS.value("Project/FilesDir")) / "QueryHistory.lsqueries"
+
+    def getMaterializedViewsPath(self) -> Path:
+        return Path(self.mainWindow.SETTINGS.value("Project/FilesDir")) / "LiveViews.lsviews"
+
+    def loadQueryHistory(self) -> None:
         try:
-            # Ensure that we don't have nodes here that are not present in our database snapshot
-            canvasNodes = set(
-                self.mainWindow.centralWidget().tabbedPane.canvasTabs[canvasName].scene().sceneGraph.nodes)
-            return canvasNodes.intersection(self.databaseEntities)
-        except KeyError:
-            return None
-
-    def getCanvasesEntitiesDict(self, allCanvasNames: list):
-        returnDict = {}
-        for canvas in allCanvasNames:
-            allEntitiesOnCanvas = self.getEntitiesOnCanvas(canvas)
-            if allEntitiesOnCanvas is not None:
-                returnDict[canvas] = allEntitiesOnCanvas
-            else:
-                returnDict[canvas] = set()
-
-        return returnDict
-
-    def parseSelect(self, selectClause: str, selectValue: Union[str, list]):
-        if selectClause == 'SELECT':
-            return self.allEntityFields if '*' in selectValue else \
-                {entityField for entityField in selectValue if entityField in self.allEntityFields}
+            with open(self.getQueryHistoryPath(), 'rb') as historyFile:
+                savedHistory = load(historyFile)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            self.mainWindow.MESSAGEHANDLER.warning('Query history file is invalid, ignoring it.')
+            return
+        with self.queryHistoryLock:
+            self.QUERIES_HISTORY = {queryUID: tuple(queryArguments)
+                                    for queryUID, queryArguments in savedHistory.items()}
 
+    def loadMaterializedViews(self) -> None:
         try:
-            clauseValue = re.compile(selectValue)
-            return {entityField for entityField in self.allEntityFields if clauseValue.match(entityField)}
-        except re.error:
-            return set()
-
-    def parseSource(self, sourceClause: str, sourceValues: Union[None, list], fieldsToSelect: set) -> set:
+            with open(self.getMaterializedViewsPath(), 'rb') as viewsFile:
+                savedViews = load(viewsFile)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            self.mainWindow.MESSAGEHANDLER.warning('Live views file is invalid, ignoring it.')
+            return
+        # Views are not run until they are needed, since the database may not be loaded yet.
+        for viewName, queryArguments in savedViews.items():
+            self.createMaterializedView(viewName, tuple(queryArguments))
+
+    def save(self) -> None:
+        historyPath = self.getQueryHistoryPath()
+        historyPathTmp = historyPath.with_suffix(f'{historyPath.suffix}.tmp')
+        with self.queryHistoryLock:
+            savedHistory = {queryUID: list(queryArguments)
+                            for queryUID, queryArguments in self.QUERIES_HISTORY.items()}
+        with open(historyPathTmp, 'wb') as historyFile:
+            dump(savedHistory, historyFile)
+        move(historyPathTmp, historyPath)
+
+        viewsPath = self.getMaterializedViewsPath()
+        viewsPathTmp = viewsPath.with_suffix(f'{viewsPath.suffix}.tmp')
+        with open(viewsPathTmp, 'wb') as viewsFile:
+            dump({viewName: list(view.queryArguments) for viewName, view in self.materializedViews.items()},
+                 viewsFile)
+        move(viewsPathTmp, viewsPath)
+
+    def createMaterializedView(self, viewName: str, queryArguments: tuple):
         """
-        sourceValues:
-        [[("AND" | "OR" | None), ("CANVAS" | "RCANVAS"), (True | False), <User Input>], ...]
-        OR
-        None
-            if sourceClause == "FROMDB"
+        Saves the query as a live view, replacing any existing view with the same name.
+        Only queries on the whole database (FROMDB) can be live views.
         """
-        if sourceClause == "FROMDB":
-            resultEntitySet = set(self.databaseEntities)
-        else:
-            resultEntitySet = set()
-            for sourceValue in sourceValues:
-                try:
-                    if sourceValue[1] == "CANVAS":
-                        if sourceValue[3] not in self.allCanvases:
-                            raise ValueError('Reference to nonexistent canvas.')
-                        matchingCanvases = [sourceValue[3]]
-                    else:
-                        canvasRegex = re.compile(sourceValue[3])
-                        matchingCanvases = [canvasMatch for canvasMatch in self.allCanvases
-                                            if canvasRegex.match(canvasMatch)]
-                except (ValueError, re.error):
-                    continue
+        if queryArguments[2] != 'FROMDB':
+            raise ValueError('Only queries on the whole database can be live views.')
+        materializedView = MaterializedQueryView(self, viewName, queryArguments)
+        self.materializedViews[viewName] = materializedView
+        return materializedView
 
-                for matchingCanvas in matchingCanvases:
-                    if sourceValue[0] == 'AND':
-                        resultEntitySet = self.canvasAndNot(resultEntitySet, self.canvasesEntitiesDict[matchingCanvas]) \
-                            if sourceValue[2] is True else \
-                            self.canvasAnd(resultEntitySet, self.canvasesEntitiesDict[matchingCanvas])
-
-                    elif sourceValue[2] is True:
-                        resultEntitySet = self.canvasOrNot(resultEntitySet,
-                                                           self.canvasesEntitiesDict[matchingCanvas],
-                                                           self.databaseEntities)
-                    else:
-                        resultEntitySet = self.canvasOr(resultEntitySet,
-                                                        self.canvasesEntitiesDict[matchingCanvas])
-
-        # Filter out all entities that do not contain at least one of the selected fields.
-        for entity in list(resultEntitySet):
-            validEntity = any(field in self.allEntities[entity].keys() for field in fieldsToSelect)
-
-            if not validEntity:
-                resultEntitySet.remove(entity)
-                self.allEntities.pop(entity)
-        return resultEntitySet
-
-    def parseConditions(self, mainWindow, conditionClauses: Union[None, list], entitiesPool) -> set:
+    def removeMaterializedView(self, viewName: str) -> None:
+        self.materializedViews.pop(viewName, None)
+
+    def getViewsEngine(self) -> LQLEngine:
         """
-        conditionClauses:
-        [[("AND" | "OR" | None), ("Value Condition" | "Graph Condition"), (True | False), conditionValue], ...]
-
-        conditionValue:
-            if Value Condition:
-                [("ATTRIBUTE" | "RATTRIBUTE"), <User Input>,
-                ("EQ" | "CONTAINS" | "STARTSWITH" | "ENDSWITH" | "RMATCH"), <User Input>]
-            if Graph Condition:
-                [("CHILDOF" <ENTITY> | "DESCENDANTOF " <ENTITY> |
-                "PARENTOF" <ENTITY> | "ANCESTOROF " <ENTITY> |
-                "NUMCHILDREN" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
-                "NUMPARENTS" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
-                "NUMANCESTORS" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
-                "NUMDESCENDANTS" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
-                "NUMIFIED_PARENTS_TOTAL" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
-                "NUMIFIED_CHILDREN_TOTAL" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
-                "CONNECTEDTO" <ENTITY> | "ISOLATED" | "ISROOT" | "ISLEAF")]
+        Returns the engine that live views are run on, with a snapshot of the current version of the database.
         """
-        self.mainWindow = mainWindow
-        self.allEntities = {uid: self.allEntities[uid] for uid in self.allEntities if uid in entitiesPool}
-        uidsToSelect = set()
-
-        for conditionClause in conditionClauses:
-            isNot = conditionClause[2]
-            conditionValue = conditionClause[3]
-            try:
-                userInput1 = conditionValue[1]
-                userInput2 = conditionValue[3]
-            except IndexError:
-                # Not used in cases where a Graph Condition is specified
-                userInput1 = None
-                userInput2 = None
-            firstArgument = conditionValue[0]
-            if conditionClause[1] == "Value Condition":
-                matchingFields = []
-                if firstArgument == "ATTRIBUTE":
-                    if userInput1 in self.allEntityFields:
-                        matchingFields.append(userInput1)
-                else:
-                    try:
-                        attributeRegex = re.compile(userInput1)
-                    except re.error:
-                        continue
-                    matchingFields.extend(field for field in self.allEntityFields if attributeRegex.match(field))
-
-                for matchingField in matchingFields:
-                    entitiesToRemove = []
-                    for entity in self.allEntities:
-                        attributeKeyValue = str(self.allEntities[entity].get(matchingField))
-                        if self.checkVCHelper(conditionValue[2], isNot, attributeKeyValue, userInput2):
-                            uidsToSelect.add(entity)
-                        elif conditionClause[0] == "AND":
-                            entitiesToRemove.append(entity)
-                    for entityToRemove in entitiesToRemove:
-                        uidsToSelect.remove(entityToRemove)
-
-            elif conditionClause[1] == "Graph Condition":
-                entitiesToRemove = []
-                for entity in self.allEntities:
-                    if self.checkGCHelper(firstArgument, isNot, [entity] + conditionValue[1:]):
-                        uidsToSelect.add(entity)
-                    elif conditionClause[0] == "AND":
-                        entitiesToRemove.append(entity)
-                for entityToRemove in entitiesToRemove:
-                    uidsToSelect.remove(entityToRemove)
-
-        uidsToRemove = set(self.allEntities).difference(uidsToSelect)
-        for entity in uidsToRemove:
-            self.allEntities.pop(entity, None)
-
-        return uidsToSelect
-
-    def canvasOr(self, canvasSetA: set, canvasSetB: set):
-        return canvasSetA.union(canvasSetB)
-
-    def canvasAnd(self, canvasSetA: set, canvasSetB: set):
-        return canvasSetA.intersection(canvasSetB)
-
-    def canvasAndNot(self, canvasSetA: set, canvasSetB: set):
-        return canvasSetA.difference(canvasSetB)
-
-    def canvasOrNot(self, canvasSetA: set, canvasSetB: set, allEntitiesSet: set):
-        return canvasSetA.union(allEntitiesSet.difference(canvasSetB))
-
-    def checkEQ(self, valueA: str, valueB: str):
-        return valueA == valueB
-
-    def checkContains(self, valueA: str, valueB: str):
-        return valueB in valueA
-
-    def checkStartsWith(self, valueA: str, valueB: str):
-        return valueA.startswith(valueB)
-
-    def checkEndsWith(self, valueA: str, valueB: str):
-        return valueA.endswith(valueB)
-
-    def checkRMatch(self, valueA: str, valueB: str):
-        with contextlib.suppress(re.error):
-            valueMatch = re.compile(valueB)
-            if valueMatch.match(valueA):
-                return True
-        return False
-
-    def checkVCHelper(self, checkType: str, isNot: bool, valueA: str, valueB: str):
-        returnVal = False
-        if checkType == "CONTAINS":
-            returnVal = self.checkContains(valueA, valueB)
-        elif checkType == "ENDSWITH":
-            returnVal = self.checkEndsWith(valueA, valueB)
-        elif checkType == "EQ":
-            returnVal = self.checkEQ(valueA, valueB)
-        elif checkType == "RMATCH":
-            returnVal = self.checkRMatch(valueA, valueB)
-        elif checkType == "STARTSWITH":
-            returnVal = self.checkStartsWith(valueA, valueB)
-        return not returnVal if isNot else returnVal
-
-    def checkParentOf(self, valueA: str, valueB: str):
-        return self.databaseSnapshot.has_successor(valueA, valueB)
-
-    def checkAncestorOf(self, valueA: str, valueB: str):
-        with contextlib.suppress(nx.NetworkXError):
-            if valueB in nx.descendants(self.databaseSnapshot, valueA):
-                return True
-        return False
-
-    def checkChildOf(self, valueA: str, valueB: str):
-        return self.databaseSnapshot.has_predecessor(valueA, valueB)
-
-    def checkDescendantOf(self, valueA: str, valueB: str):
-        with contextlib.suppress(nx.NetworkXError):
-            if valueB in nx.ancestors(self.databaseSnapshot, valueA):
-                return True
-        return False
-
-    def checkNumChildren(self, valueA: str, valueB: str, valueC: float):
-        numChildren = len(list(self.databaseSnapshot.successors(valueA)))
-        return (valueB == "<" and numChildren < valueC) or \
-            (valueB == "<=" and numChildren <= valueC) or \
-            (valueB == ">" and numChildren > valueC) or \
-            (valueB == ">=" and numChildren >= valueC) or \
-            (valueB == "==" and numChildren == valueC)
-
-    def checkNumParents(self, valueA: str, valueB: str, valueC: float):
-        numParents = len(list(self.databaseSnapshot.predecessors(valueA)))
-        return (valueB == "<" and numParents < valueC) or \
-            (valueB == "<=" and numParents <= valueC) or \
-            (valueB == ">" and numParents > valueC) or \
-            (valueB == ">=" and numParents >= valueC) or \
-            (valueB == "==" and numParents == valueC)
-
-    def checkNumAncestors(self, valueA: str, valueB: str, valueC: float):
-        numAncestors = len(list(nx.ancestors(self.databaseSnapshot, valueA)))
-        return (valueB == "<" and numAncestors < valueC) or \
-            (valueB == "<=" and numAncestors <= valueC) or \
-            (valueB == ">" and numAncestors > valueC) or \
-            (valueB == ">=" and numAncestors >= valueC) or \
-            (valueB == "==" and numAncestors == valueC)
-
-    def checkNumDescendants(self, valueA: str, valueB: str, valueC: float):
-        numDescendants = len(list(nx.descendants(self.databaseSnapshot, valueA)))
-        return (valueB == "<" and numDescendants < valueC) or \
-            (valueB == "<=" and numDescendants <= valueC) or \
-            (valueB == ">" and numDescendants > valueC) or \
-            (valueB == ">=" and numDescendants >= valueC) or \
-            (valueB == "==" and numDescendants == valueC)
-
-    def checkNumifiedParentsTotal(self, valueA: str, valueB: str, valueC: float):
-        parents = self.databaseSnapshot.predecessors(valueA)
-        total = 0.0
-        for item in parents:
-            primaryField = self.mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType(
-                self.databaseSnapshot.nodes[item]['Entity Type'])
-            with contextlib.suppress(Exception):
-                total += self.modifyNumify(self.databaseSnapshot.nodes[item][primaryField])
-
-        return (valueB == "<" and total < valueC) or \
-            (valueB == "<=" and total <= valueC) or \
-            (valueB == ">" and total > valueC) or \
-            (valueB == ">=" and total >= valueC) or \
-            (valueB == "==" and total == valueC)
-
-    def checkNumifiedChildrenTotal(self, valueA: str, valueB: str, valueC: float):
-        children = self.databaseSnapshot.successors(valueA)
-        total = 0.0
-        for item in children:
-            primaryField = self.mainWindow.RESOURCEHANDLER.getPrimaryFieldForEntityType(
-                self.databaseSnapshot.nodes[item]['Entity Type'])
-            with contextlib.suppress(Exception):
-                total += self.modifyNumify(self.databaseSnapshot.nodes[item][primaryField])
-        return (valueB == "<" and total < valueC) or \
-            (valueB == "<=" and total <= valueC) or \
-            (valueB == ">" and total > valueC) or \
-            (valueB == ">=" and total >= valueC) or \
-            (valueB == "==" and total == valueC)
-
-    def checkConnectedTo(self, valueA: str, valueB: str):
-        with contextlib.suppress(nx.NetworkXError):
-            if nx.has_path(self.databaseSnapshot, valueA, valueB):
-                return True
-        return False
-
-    def checkIsolated(self, valueA: str):
-        with contextlib.suppress(nx.NetworkXError):
-            if valueA in self.databaseSnapshot.nodes and nx.is_isolate(self.databaseSnapshot, valueA):
-                return True
-        return False
-
-    def checkIsRoot(self, valueA: str):
-        with contextlib.suppress(nx.NetworkXError):
-            if len(self.databaseSnapshot.in_edges(valueA)) == 0:
-                return True
-        return False
-
-    def checkIsLeaf(self, valueA: str):
-        with contextlib.suppress(nx.NetworkXError):
-            if len(self.databaseSnapshot.out_edges(valueA)) == 0:
-                return True
-        return False
-
-    def checkGCHelper(self, checkType: str, isNot: bool, args: list):
-        returnVal = False
-        if checkType == "ANCESTOROF":
-            returnVal = self.checkAncestorOf(*args)
-        elif checkType == "CHILDOF":
-            returnVal = self.checkChildOf(*args)
-        elif checkType == "CONNECTEDTO":
-            returnVal = self.checkConnectedTo(*args)
-        elif checkType == "DESCENDANTOF":
-            returnVal = self.checkDescendantOf(*args)
-        elif checkType == "ISLEAF":
-            returnVal = self.checkIsLeaf(*args)
-        elif checkType == "ISOLATED":
-            returnVal = self.checkIsolated(*args)
-        elif checkType == "ISROOT":
-            returnVal = self.checkIsRoot(*args)
-        elif checkType == "NUMCHILDREN":
-            returnVal = self.checkNumChildren(*args)
-        elif checkType == "NUMPARENTS":
-            returnVal = self.checkNumParents(*args)
-        elif checkType == "NUMANCESTORS":
-            returnVal = self.checkNumAncestors(*args)
-        elif checkType == "NUMDESCENDANTS":
-            returnVal = self.checkNumDescendants(*args)
-        elif checkType == "NUMIFIED_PARENTS_TOTAL":
-            returnVal = self.checkNumifiedParentsTotal(*args)
-        elif checkType == "NUMIFIED_CHILDREN_TOTAL":
-            returnVal = self.checkNumifiedChildrenTotal(*args)
-        elif checkType == "PARENTOF":
-            returnVal = self.checkParentOf(*args)
-        return not returnVal if isNot else returnVal
-
-    def modifyNumify(self, valueA: str) -> float:
-        # Get the first number that shows up.
-        tempString = valueA.replace(',', '.')  # Making sure that floats are expressed the right way.
-        count = 0
-        for c in tempString:
-            if c not in string.digits:
-                count += 1
-            else:
-                break
-
-        count2 = 0
-        for c in tempString[count:]:
-            if c in string.digits or c == '.':
-                count2 += 1
-            else:
-                break
-
-        # If there are no numbers in the string, its numeric value is 0.
-        try:
-            floatValue = float(tempString[count:count + count2])
-        except ValueError:
-            floatValue = 0.0
-        return floatValue
-
-    def modifyUpperCase(self, valueA: str):
-        return valueA.upper()
-
-    def modifyLowerCase(self, valueA: str):
-        return valueA.lower()
+        databaseSnapshot, databaseVersion = self.mainWindow.LENTDB.getVersionedSnapshot()
+        if databaseVersion != self.viewsDatabaseVersion:
+            self.viewsEngine.setSnapshot(databaseSnapshot)
+            self.viewsDatabaseVersion = databaseVersion
+        return self.viewsEngine
 
-    def parseModify(self, resultsToModify: (set, set), modifyQueries: list) -> (set, set):
+    def updateMaterializedViews(self, changes) -> None:
         """
-        modifyQueries:
-        [[("MODIFY" | "RMODIFY"), <User Input>, ("NUMIFY" | "UPPERCASE" | "LOWERCASE")], ...]
+        Takes one snapshot of the database for the changes, and updates every live view that is being shown with it.
         """
+        materializedViews = [materializedView for materializedView in self.materializedViews.values()
+                             if materializedView.resultUIDs is not None and materializedView.resultsListeners]
+        if not materializedViews:
+            # The views engine catches up on its own the next time a view is run.
+            return
+        previousSnapshot = self.viewsEngine.databaseSnapshot
+        databaseSnapshot, databaseVersion = self.mainWindow.LENTDB.getVersionedSnapshot()
+        if databaseVersion != self.viewsDatabaseVersion:
+            self.viewsEngine.updateSnapshot(databaseSnapshot, changes.entities, bool(changes.links))
+            self.viewsDatabaseVersion = databaseVersion
+        for materializedView in materializedViews:
+            materializedView.applyChanges(changes, previousSnapshot)
+
+    @staticmethod
+    def normalizeQueryValue(queryValue):
+        if isinstance(queryValue, (list, tuple)):
+            return tuple(LQLQueryBuilder.normalizeQueryValue(value) for value in queryValue)
+        return queryValue
+
+    def normalizeQuery(self, queryArguments: tuple) -> tuple:
+        """
+        Returns a hashable version of the query, which is the same for queries that are the same.
+        """
+        selectClause, selectValue, *otherArguments = queryArguments
+        if isinstance(selectValue, (list, tuple)):
+            # The order that fields are selected in does not matter.
+            selectValue = sorted(selectValue)
+        return self.normalizeQueryValue((selectClause, selectValue, *otherArguments))
 
-        matchingFields = resultsToModify[1]
-
-        modifiedUIDs = set()
-        numifiedFields = set()
-
-        for modification in modifyQueries:
-            userInput1 = modification[1]
-            modificationType = modification[2]
-            modifyFields = []
-            if modification[0] == "MODIFY":
-                if userInput1 in resultsToModify[1]:
-                    modifyFields.append(userInput1)
+    def recordQuery(self, queryArguments: tuple) -> None:
+        """
+        Adds the query to the history. Queries that were run before are moved to the end, rather than repeated.
+        """
+        normalizedQuery = self.normalizeQuery(queryArguments)
+        with self.queryHistoryLock:
+            queryUID = next((historyUID for historyUID, historyQuery in self.QUERIES_HISTORY.items()
+                             if self.normalizeQuery(historyQuery) == normalizedQuery), None)
+            if queryUID is None:
+                queryUID = str(uuid4())
             else:
-                try:
-                    userInputRegex = re.compile(userInput1)
-                    modifyFields = [fieldMatch for fieldMatch in matchingFields if userInputRegex.match(fieldMatch)]
-                except (ValueError, re.error):
-                    continue
-            for entity in self.allEntities:
-                for modifyField in modifyFields:
-                    entityFieldValue = self.allEntities[entity].get(modifyField)
-                    if entityFieldValue is None or modificationType not in ["UPPERCASE", "LOWERCASE", "NUMIFY"]:
-                        newFieldValue = None
-                    elif modificationType == "UPPERCASE":
-                        newFieldValue = self.modifyUpperCase(entityFieldValue)
-                    elif modificationType == "LOWERCASE":
-                        newFieldValue = self.modifyLowerCase(entityFieldValue)
-                    else:
-                        newFieldValue = str(self.modifyNumify(entityFieldValue))
-                        numifiedFields.add(modifyField)
-                    if newFieldValue is not None:
-                        modifiedUIDs.add(entity)
-                        self.allEntities[entity][modifyField] = newFieldValue
-
-        return modifiedUIDs, numifiedFields
-
-    def parseQuery(self, mainWindow, selectClause: str, selectValue: Union[str, list], sourceClause: str,
+                del self.QUERIES_HISTORY[queryUID]
+            self.QUERIES_HISTORY[queryUID] = queryArguments
+            while len(self.QUERIES_HISTORY) > self.QUERY_HISTORY_SIZE:
+                del self.QUERIES_HISTORY[next(iter(self.QUERIES_HISTORY))]
+
+    def getQueryCacheKey(self, queryArguments: tuple) -> tuple:
+        # Queries on canvases also depend on which entities are on each canvas, which the database version ignores.
+        canvasesKey = None
+        if queryArguments[2] == 'FROM':
+            canvasesKey = tuple((canvasName, frozenset(canvasEntities))
+                                for canvasName, canvasEntities in sorted(self.canvasesEntitiesDict.items()))
+        return self.databaseVersion, canvasesKey, self.normalizeQuery(queryArguments)
+
+    def startQueryThread(self, queryThread) -> None:
+        self.queryThread = queryThread
+        queryThread.finished.connect(self.queryThreadFinished)
+        queryThread.start()
+
+    def queryThreadFinished(self) -> None:
+        self.queryThread = None
+
+    def stopQueryThread(self) -> None:
+        """
+        Cancels the running query, if there is one, and waits for its thread to finish.
+        """
+        queryThread = self.queryThread
+        if queryThread is not None:
+            queryThread.requestInterruption()
+            queryThread.wait()
+
+    def takeSnapshot(self) -> None:
+        if self.queryThread is not None:
+            # The running query is using the current snapshot.
+            return
+        # The snapshot shares entity dicts with the database, so it must not be modified.
+        databaseSnapshot, databaseVersion = self.mainWindow.LENTDB.getVersionedSnapshot()
+        if databaseVersion != self.databaseVersion:
+            # Results for older versions of the database can never be used again.
+            self.queryResultsCache.clear()
+            self.databaseVersion = databaseVersion
+        self.setSnapshot(databaseSnapshot, self.getCanvasesEntities())
+
+    def getCanvasesEntities(self) -> dict:
+        return {canvasName: canvas.scene().sceneGraph.nodes
+                for canvasName, canvas in self.mainWindow.centralWidget().tabbedPane.canvasTabs.items()}
+
+    def parseQuery(self, selectClause: str, selectValue: Union[str, list], sourceClause: str,
                    sourceValues: Union[None, list], conditionClauses: Union[None, list],
-                   modifyQueries: Union[list, None] = None) -> Optional[
+                   modifyQueries: Union[list, None] = None, shouldCancel=None, onPartialResults=None) -> Optional[
         tuple[Optional[tuple[set, Union[set[Any], set[Union[str, Any]]]]],
         Optional[tuple[set[Any], set[Any]]]]]:
+        """
+        Runs the query and records it in the history. Results of queries that were already run on the
+          current version of the database are reused.
+        """
 
         if self.databaseSnapshot is None:
             return None
-        self.allEntities = dict(self.allEntitiesInit)
-
-        returnValue = None
-        modifications = None
-        if fieldsToSelect := self.parseSelect(selectClause, selectValue):
-            if entitiesToConsider := self.parseSource(sourceClause, sourceValues, fieldsToSelect):
-                if conditionClauses:
-                    entitiesToConsider = self.parseConditions(mainWindow, conditionClauses, entitiesToConsider)
-                returnValue = (entitiesToConsider, fieldsToSelect)
-                if modifyQueries:
-                    modifications = self.parseModify(returnValue, modifyQueries)
-
-        queryUID = str(uuid4())
-        self.QUERIES_HISTORY[queryUID] = (selectClause, selectValue, sourceClause, sourceValues, conditionClauses,
-                                          modifyQueries)
+        queryArguments = (selectClause, selectValue, sourceClause, sourceValues, conditionClauses, modifyQueries)
+        self.recordQuery(queryArguments)
+
+        queryCacheKey = self.getQueryCacheKey(queryArguments)
+        cachedResults = self.queryResultsCache.get(queryCacheKey)
+        if cachedResults is not None:
+            self.queryResultsCache.move_to_end(queryCacheKey)
+            self.allEntities, self.lastQueryPlan, returnValue, modifications = cachedResults
+            return returnValue, modifications
+
+        returnValue, modifications = self.runQuery(queryArguments, shouldCancel, onPartialResults)
+
+        # The results are not modified after this point, so they can be handed out again as they are.
+        self.queryResultsCache[queryCacheKey] = (self.allEntities, self.lastQueryPlan, returnValue, modifications)
+        while len(self.queryResultsCache) > self.QUERY_RESULTS_CACHE_SIZE:
+            self.queryResultsCache.popitem(last=False)
 
         return returnValue, modifications
+
+
+class MaterializedQueryView:
+    """
+    An LQL query whose results are kept up-to-date as the database changes, instead of being re-run from scratch.
+
+    When the database changes, only the entities that the change could affect are checked again:
+      the changed entities themselves for value conditions, the entities at either end of changed links
+      for conditions about neighbours, and the ancestors and descendants of changed links for conditions
+      about reachability. If the set of fields in the database changes, the query is re-run, since
+      RSELECT, SELECT * and RATTRIBUTE depend on it.
+
+    Views only track which entities match the query; modifications are not applied to the results.
+    """
+
+    # If more than this fraction of the entities could be affected by a change, re-run the query instead.
+    FULL_REFRESH_FRACTION = 0.5
+    NEIGHBOUR_CONDITIONS = {'CHILDOF', 'PARENTOF', 'NUMCHILDREN', 'NUMPARENTS', 'ISOLATED', 'ISROOT', 'ISLEAF',
+                            'NUMIFIED_PARENTS_TOTAL', 'NUMIFIED_CHILDREN_TOTAL'}
+    # Conditions that also depend on the values of neighbouring entities.
+    NEIGHBOUR_VALUE_CONDITIONS = {'NUMIFIED_PARENTS_TOTAL', 'NUMIFIED_CHILDREN_TOTAL'}
+    REACHABILITY_CONDITIONS = {'ANCESTOROF', 'DESCENDANTOF', 'CONNECTEDTO', 'NUMANCESTORS', 'NUMDESCENDANTS'}
+
+    def __init__(self, queryBuilder: LQLQueryBuilder, name: str, queryArguments: tuple) -> None:
+        self.name = name
+        self.queryArguments = queryArguments
+        # The views of a builder share its views engine, so that one snapshot is taken per change to the database.
+        self.queryBuilder = queryBuilder
+        # None while nothing shows the results of the view.
+        self.resultUIDs = None
+        self.entityFields = None
+        # Called with the uids of the entities added to the results, removed from them,
+        #   and the uids of the results that were changed.
+        self.resultsListeners = []
+
+        graphConditions = {conditionClause[3][0] for conditionClause in queryArguments[4] or []
+                           if conditionClause[1] == "Graph Condition"}
+        self.checkNeighbours = bool(graphConditions & self.NEIGHBOUR_CONDITIONS)
+        self.checkNeighbourValues = bool(graphConditions & self.NEIGHBOUR_VALUE_CONDITIONS)
+        self.checkReachability = bool(graphConditions & self.REACHABILITY_CONDITIONS)
+
+    def addResultsListener(self, listener) -> None:
+        self.resultsListeners.append(listener)
+
+    def removeResultsListener(self, listener) -> None:
+        with contextlib.suppress(ValueError):
+            self.resultsListeners.remove(listener)
+        if not self.resultsListeners:
+            # Nothing is showing the results, so they are not kept up to date until they are needed again.
+            self.resultUIDs = None
+            self.entityFields = None
+
+    def notifyResultsListeners(self, addedUIDs: set, removedUIDs: set, changedUIDs: set) -> None:
+        if addedUIDs or removedUIDs or changedUIDs:
+            for listener in list(self.resultsListeners):
+                listener(addedUIDs, removedUIDs, changedUIDs)
+
+    def getSelectedFields(self) -> set:
+        return self.queryBuilder.viewsEngine.parseSelect(self.queryArguments[0], self.queryArguments[1])
+
+    def getEntities(self) -> dict:
+        return self.queryBuilder.viewsEngine.allEntitiesInit
+
+    def getResults(self) -> set:
+        if self.resultUIDs is None:
+            # Other views may not have kept the views engine up to date.
+            self.queryBuilder.getViewsEngine()
+            self.refresh()
+        return self.resultUIDs
+
+    def evaluateEntities(self, entitiesPool: set) -> set:
+        """
+        Returns the entities in the pool that match the query.
+        """
+        queryEngine = self.queryBuilder.viewsEngine
+        fieldsToSelect = self.getSelectedFields()
+        allEntities = queryEngine.allEntitiesInit
+        entitiesPool = {entity for entity in entitiesPool
+                        if any(field in allEntities[entity] for field in fieldsToSelect)}
+        conditionClauses = self.queryArguments[4]
+        if not conditionClauses or not entitiesPool:
+            return entitiesPool
+        # The conditions only read the entities, so there is no need to copy them.
+        queryEngine.allEntities = allEntities
+        return queryEngine.planConditions(conditionClauses).run(entitiesPool)
+
+    def refresh(self, changedUIDs=()) -> None:
+        queryEngine = self.queryBuilder.viewsEngine
+        self.entityFields = set(queryEngine.allEntityFields)
+        previousResults = self.resultUIDs
+        self.resultUIDs = self.evaluateEntities(set(queryEngine.allEntitiesInit))
+        if previousResults is not None:
+            self.notifyResultsListeners(self.resultUIDs.difference(previousResults),
+                                        previousResults.difference(self.resultUIDs),
+                                        self.resultUIDs.intersection(changedUIDs))
+
+    def getAffectedEntities(self, changes, previousSnapshot) -> set:
+        """
+        Returns the entities whose results the changes could affect.
+        previousSnapshot is the snapshot before the changes, where removed entities can still be found.
+        """
+        queryEngine = self.queryBuilder.viewsEngine
+        databaseSnapshot = queryEngine.databaseSnapshot
+        snapshots = [databaseSnapshot] if previousSnapshot is None else [previousSnapshot, databaseSnapshot]
+        affectedEntities = set(changes.entities)
+        if self.checkNeighbourValues:
+            for entity in changes.entities:
+                for snapshot in snapshots:
+                    if entity in snapshot:
+                        affectedEntities.update(snapshot.predecessors(entity))
+                        affectedEntities.update(snapshot.successors(entity))
+        if self.checkNeighbours or self.checkReachability:
+            changedLinks = set(changes.links)
+            if previousSnapshot is not None:
+                # Removing an entity also removes its links, which are not published as changes.
+                for entity in changes.entities:
+                    if entity in previousSnapshot and entity not in databaseSnapshot:
+                        changedLinks.update(previousSnapshot.in_edges(entity))
+                        changedLinks.update(previousSnapshot.out_edges(entity))
+            for sourceEntity, targetEntity in changedLinks:
+                affectedEntities.add(sourceEntity)
+                affectedEntities.add(targetEntity)
+                if self.checkReachability:
+                    # Removing a link does not change the ancestors of its source, or the descendants of its target.
+                    affectedEntities.update(queryEngine.reachabilityIndex.getAncestors(sourceEntity))
+                    affectedEntities.update(queryEngine.reachabilityIndex.getDescendants(targetEntity))
+        return affectedEntities.intersection(queryEngine.allEntitiesInit)
+
+    def applyChanges(self, changes, previousSnapshot=None) -> None:
+        """
+        Updates the results with the changes made to the database.
+        The views engine must already be on the snapshot with the changes.
+        """
+        if self.resultUIDs is None:
+            # Never run, so there is nothing to update.
+            return
+        queryEngine = self.queryBuilder.viewsEngine
+        allEntities = queryEngine.allEntitiesInit
+        if queryEngine.allEntityFields != self.entityFields:
+            self.refresh(changes.entities)
+            return
+        affectedEntities = self.getAffectedEntities(changes, previousSnapshot)
+        if len(affectedEntities) > self.FULL_REFRESH_FRACTION * len(allEntities):
+            self.refresh(changes.entities)
+            return
+
+        matchingEntities = self.evaluateEntities(affectedEntities)
+        removedUIDs = {uid for uid in changes.entities if uid in self.resultUIDs and uid not in allEntities}
+        removedUIDs.update(self.resultUIDs.intersection(affectedEntities.difference(matchingEntities)))
+        addedUIDs = matchingEntities.difference(self.resultUIDs)
+        changedUIDs = matchingEntities.intersection(self.resultUIDs).intersection(changes.entities)
+        self.resultUIDs.difference_update(removedUIDs)
+        self.resultUIDs.update(addedUIDs)
+        self.notifyResultsListeners(addedUIDs, removedUIDs, changedUIDs)
@@ -0,0 +1,809 @@
+#!/usr/bin/env python3
+
+"""
+The LQL query engine, separate from the query builder UI.
+
+Nothing in here depends on Qt, so queries can be run on a database snapshot without starting
+the application, e.g. from batch scripts or when profiling queries:
+
+    databaseSnapshot = loadProjectSnapshot(Path('MyProject/MyProject Files'))
+    queryEngine = LQLEngine()
+    queryEngine.setSnapshot(databaseSnapshot)
+    resultsSet, modificationsSet = queryEngine.runQuery(LQLQuery('SELECT', ['*'], 'FROMDB', None, [
+        [None, 'Value Condition', False, ['ATTRIBUTE', 'Entity Type', 'EQ', 'Domain']]]))
+"""
+
+import contextlib
+import re
+import string
+import time
+import networkx as nx
+import pandas as pd
+from ast import literal_eval
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Union, Optional, NamedTuple
+
+from Core.GlobalVariables import non_string_fields
+from Core.EntityDBIndex import FieldTextIndex, ReachabilityIndex
+from Core.EntityDBStorage import STORAGE_BACKENDS, getStorage
+
+
+class QueryCancelledException(Exception):
+    pass
+
+
+class QueryPlanStep:
+    """
+    A single condition of a query plan.
+
+    evaluate takes the set of candidate entities and returns the ones that satisfy the condition.
+    If chunkSize is set, the candidates are evaluated that many at a time, so that the query can be
+      cancelled part of the way through the step.
+    """
+
+    def __init__(self, setOperation: str, description: str, estimatedCost: int, evaluate,
+                 chunkSize: Optional[int] = None) -> None:
+        self.setOperation = setOperation
+        self.description = description
+        self.estimatedCost = estimatedCost
+        self.evaluate = evaluate
+        self.chunkSize = chunkSize
+        self.candidateCount = None
+        self.matchCount = None
+        self.selectedCount = None
+        self.seconds = None
+
+
+class QueryPlan:
+    """
+    The conditions of a query, in the order that they are run.
+
+    Conditions are applied left to right: OR adds the entities that match the condition to the
+      selection, and AND keeps only the selected entities that match it. Each condition is only
+      evaluated on the entities that can still change the result; AND conditions on the current
+      selection, and OR conditions on the entities that are not selected yet.
+    """
+
+    def __init__(self, steps: list) -> None:
+        self.steps = steps
+        self.poolCount = None
+        self.seconds = None
+
+    @staticmethod
+    def getChunks(candidates: set, chunkSize: Optional[int]):
+        if chunkSize is None or len(candidates) <= chunkSize:
+            yield candidates
+            return
+        candidatesIterator = iter(candidates)
+        while chunk := set(islice(candidatesIterator, chunkSize)):
+            yield chunk
+
+    def run(self, entitiesPool: set, shouldCancel=None, onFinalMatches=None) -> set:
+        """
+        Runs the plan on the given entities, and returns the ones selected.
+
+        shouldCancel is checked between steps and chunks, and QueryCancelledException is raised if it returns True.
+        onFinalMatches is given entities as soon as it is certain that they are part of the result, which is
+          while the last step runs.
+        """
+        self.poolCount = len(entitiesPool)
+        planStartTime = time.perf_counter()
+        selectedEntities = set()
+        for stepIndex, step in enumerate(self.steps):
+            stepStartTime = time.perf_counter()
+            finalStep = onFinalMatches is not None and stepIndex == len(self.steps) - 1
+            if step.setOperation == 'AND':
+                candidates = selectedEntities
+            else:
+                candidates = entitiesPool.difference(selectedEntities)
+                if finalStep and selectedEntities:
+                    # Entities that are already selected stay selected after an OR step.
+                    onFinalMatches(set(selectedEntities))
+            matches = set()
+            if candidates:
+                for chunk in self.getChunks(candidates, step.chunkSize):
+                    if shouldCancel is not None and shouldCancel():
+                        raise QueryCancelledException()
+                    chunkMatches = step.evaluate(chunk)
+                    matches.update(chunkMatches)
+                    if finalStep and chunkMatches:
+                        onFinalMatches(set(chunkMatches))
+            if step.setOperation == 'AND':
+                selectedEntities = matches
+            else:
+                selectedEntities.update(matches)
+            step.candidateCount = len(candidates)
+            step.matchCount = len(matches)
+            step.selectedCount = len(selectedEntities)
+            step.seconds = time.perf_counter() - stepStartTime
+        self.seconds = time.perf_counter() - planStartTime
+        return selectedEntities
+
+    def explain(self) -> str:
+        explanation = [f'Entities considered: {self.poolCount}']
+        for stepNumber, step in enumerate(self.steps, start=1):
+            explanation.append(f'{stepNumber}. {step.setOperation:<3} {step.description}')
+            if step.seconds is None:
+                explanation.append(f'     Estimated cost: {step.estimatedCost} | Not run')
+                continue
+            explanation.append(f'     Estimated cost: {step.estimatedCost} | Candidates: {step.candidateCount} | '
+                               f'Matched: {step.matchCount} | Selected: {step.selectedCount} | '
+                               f'Time: {step.seconds * 1000:.2f} ms')
+        if self.seconds is not None:
+            explanation.append(f'Total time: {self.seconds * 1000:.2f} ms')
+        return '\n'.join(explanation)
+
+
+class LQLQuery(NamedTuple):
+    """
+    The arguments of an LQL query, in the order that the query builder stores them in.
+    Any tuple of query arguments can be run, so saved queries do not have to be converted to this first.
+    """
+    selectClause: str
+    selectValue: Union[str, list]
+    sourceClause: str = 'FROMDB'
+    sourceValues: Union[None, list] = None
+    conditionClauses: Union[None, list] = None
+    modifyQueries: Union[None, list] = None
+
+
+class LQLEngine:
+    """
+    Runs LQL queries on a snapshot of the database.
+
+    getPrimaryFieldForEntityType is used to find the values that numified totals add up. If it is not given,
+      the primary field of each entity is assumed to be its first field after the uid.
+    searchEntities is used to answer value conditions from the database's field index, and has the same
+      signature as EntitiesDB.searchEntities. If it is not given, value conditions are checked without an index.
+    """
+
+    # Rough relative cost of checking a single entity against each kind of condition.
+    VALUE_CONDITION_COSTS = {'EQ': 1, 'STARTSWITH': 2, 'ENDSWITH': 3, 'CONTAINS': 3, 'RMATCH': 4}
+    # Reachability conditions are answered from the reachability index, after it is built once per snapshot.
+    GRAPH_CONDITION_COSTS = {'ISOLATED': 10, 'ISROOT': 10, 'ISLEAF': 10, 'CHILDOF': 10, 'PARENTOF': 10,
+                             'NUMCHILDREN': 10, 'NUMPARENTS': 10,
+                             'ANCESTOROF': 15, 'DESCENDANTOF': 15, 'CONNECTEDTO': 15,
+                             'NUMIFIED_PARENTS_TOTAL': 20, 'NUMIFIED_CHILDREN_TOTAL': 20,
+                             'NUMANCESTORS': 30, 'NUMDESCENDANTS': 30}
+    # Below this many candidates, checking the candidates one by one is cheaper than searching the field index
+    #   or checking a whole attribute column.
+    BULK_SEARCH_MIN_CANDIDATES = 256
+    # Graph conditions are checked entity by entity, so they are run in chunks that can be cancelled in between.
+    GRAPH_CONDITION_CHUNK_SIZE = 5000
+    # Building attribute columns and reachability counts checks for cancellation after this many entities.
+    CANCEL_CHECK_INTERVAL = 10000
+
+    databaseSnapshot = None
+    databaseEntities = None
+    allCanvases = None
+    canvasesEntitiesDict = None
+    allEntityFields = None
+    entityFieldCounts = None
+    allEntitiesInit = None
+    allEntities = None
+    reachabilityIndex = None
+    attributeColumns = None
+    lastQueryPlan = None
+    # Checked while the query is running, and while building the data used to run it.
+    shouldCancel = None
+
+    def __init__(self, getPrimaryFieldForEntityType=None, searchEntities=None) -> None:
+        self.getPrimaryFieldForEntityType = getPrimaryFieldForEntityType
+        self.searchEntities = searchEntities
+
+    def setSnapshot(self, databaseSnapshot: nx.DiGraph, canvasesEntities: Optional[dict] = None) -> None:
+        """
+        Sets the snapshot that queries are run on. The snapshot must not be modified while it is in use.
+
+        canvasesEntities maps the name of each canvas to the entities on it, for queries on canvases.
+        """
+        snapshotChanged = databaseSnapshot is not self.databaseSnapshot
+        self.databaseSnapshot = databaseSnapshot
+        self.databaseEntities = set(self.databaseSnapshot.nodes)
+
+        canvasesEntities = canvasesEntities or {}
+        self.allCanvases = list(canvasesEntities)
+        self.allCanvases.append('*')
+        # Ensure that we don't have nodes here that are not present in our database snapshot
+        self.canvasesEntitiesDict = {canvas: set(canvasesEntities.get(canvas, ())).intersection(self.databaseEntities)
+                                     for canvas in self.allCanvases}
+        if snapshotChanged:
+            self.reachabilityIndex = ReachabilityIndex(self.databaseSnapshot)
+            self.entityFieldCounts, self.allEntitiesInit = self.getAllEntitiesAndFields()
+            self.allEntityFields = self.getEntityFields()
+            # Field -> Values of the field for all entities, as strings. Built when first needed.
+            self.attributeColumns = {}
+
+        # Re-define database entities to remove Group Entities
+        self.databaseEntities = set(self.allEntitiesInit.keys())
+
+    def updateSnapshot(self, databaseSnapshot: nx.DiGraph, changedEntities, linksChanged: bool) -> None:
+        """
+        Moves on to a newer snapshot of the database, given the entities and whether any links changed since the
+          current one. Only the data kept about the changed entities is updated, instead of all of it.
+        """
+        if self.databaseSnapshot is None:
+            self.setSnapshot(databaseSnapshot)
+            return
+        previousSnapshot = self.databaseSnapshot
+        self.databaseSnapshot = databaseSnapshot
+        entitiesAddedOrRemoved = False
+        # Group entities are not queried, but they are still part of the graph.
+        nodesAddedOrRemoved = False
+        updatedEntities = []
+        for entityUID in changedEntities:
+            if (entityUID in previousSnapshot) != (entityUID in databaseSnapshot):
+                nodesAddedOrRemoved = True
+            previousEntity = self.allEntitiesInit.pop(entityUID, None)
+            if previousEntity is not None:
+                self.entityFieldCounts.subtract(previousEntity.keys())
+            entity = databaseSnapshot.nodes.get(entityUID)
+            if entity is not None and entity.get('Entity Type') != 'EntityGroup':
+                self.allEntitiesInit[entityUID] = entity
+                self.entityFieldCounts.update(entity.keys())
+                self.databaseEntities.add(entityUID)
+                if previousEntity is None:
+                    entitiesAddedOrRemoved = True
+                else:
+                    updatedEntities.append(entityUID)
+            elif previousEntity is not None:
+                self.databaseEntities.discard(entityUID)
+                entitiesAddedOrRemoved = True
+        # Drop the fields that no entity has anymore.
+        self.entityFieldCounts = +self.entityFieldCounts
+        self.allEntityFields = self.getEntityFields()
+
+        if entitiesAddedOrRemoved:
+            # Rebuilt when next needed, rather than resized.
+            self.attributeColumns = {}
+        else:
+            for field, attributeColumn in self.attributeColumns.items():
+                attributeColumn.loc[updatedEntities] = [str(self.allEntitiesInit[entityUID].get(field))
+                                                        for entityUID in updatedEntities]
+
+        if linksChanged or nodesAddedOrRemoved:
+            self.reachabilityIndex = ReachabilityIndex(databaseSnapshot)
+        else:
+            # The graph has the same structure as before, so everything the index knows still holds.
+            self.reachabilityIndex.graph = databaseSnapshot
+
+    def getAllEntitiesAndFields(self) -> (Counter, dict):
+        entitiesSnapshot = {entity: self.databaseSnapshot.nodes[entity] for entity in self.databaseSnapshot.nodes
+                            if self.databaseSnapshot.nodes[entity].get('Entity Type') != 'EntityGroup'}
+        # Field -> Number of entities that have the field.
+        entityFieldCounts = Counter()
+        for entityUID in entitiesSnapshot:
+            entityFieldCounts.update(entitiesSnapshot[entityUID].keys())
+        return entityFieldCounts, entitiesSnapshot
+
+    def getEntityFields(self) -> set:
+        return set(self.entityFieldCounts).difference(non_string_fields)
+
+    def checkCancelled(self) -> None:
+        if self.shouldCancel is not None and self.shouldCancel():
+            raise QueryCancelledException()
+
+    def getPrimaryField(self, entity: dict) -> Optional[str]:
+        if self.getPrimaryFieldForEntityType is not None:
+            return self.getPrimaryFieldForEntityType(entity['Entity Type'])
+        return next(islice(entity, 1, None), None)
+
+    def parseSelect(self, selectClause: str, selectValue: Union[str, list]):
+        if selectClause == 'SELECT':
+            return self.allEntityFields if '*' in selectValue else \
+                {entityField for entityField in selectValue if entityField in self.allEntityFields}
+
+        try:
+            clauseValue = re.compile(selectValue)
+            return {entityField for entityField in self.allEntityFields if clauseValue.match(entityField)}
+        except re.error:
+            return set()
+
+    def parseSource(self, sourceClause: str, sourceValues: Union[None, list], fieldsToSelect: set) -> set:
+        """
+        sourceValues:
+        [[("AND" | "OR" | None), ("CANVAS" | "RCANVAS"), (True | False), <User Input>], ...]
+        OR
+        None
+            if sourceClause == "FROMDB"
+        """
+        if sourceClause == "FROMDB":
+            resultEntitySet = set(self.databaseEntities)
+        else:
+            resultEntitySet = set()
+            for sourceValue in sourceValues:
+                try:
+                    if sourceValue[1] == "CANVAS":
+                        if sourceValue[3] not in self.allCanvases:
+                            raise ValueError('Reference to nonexistent canvas.')
+                        matchingCanvases = [sourceValue[3]]
+                    else:
+                        canvasRegex = re.compile(sourceValue[3])
+                        matchingCanvases = [canvasMatch for canvasMatch in self.allCanvases
+                                            if canvasRegex.match(canvasMatch)]
+                except (ValueError, re.error):
+                    continue
+
+                for matchingCanvas in matchingCanvases:
+                    if sourceValue[0] == 'AND':
+                        resultEntitySet = self.canvasAndNot(resultEntitySet, self.canvasesEntitiesDict[matchingCanvas]) \
+                            if sourceValue[2] is True else \
+                            self.canvasAnd(resultEntitySet, self.canvasesEntitiesDict[matchingCanvas])
+
+                    elif sourceValue[2] is True:
+                        resultEntitySet = self.canvasOrNot(resultEntitySet,
+                                                           self.canvasesEntitiesDict[matchingCanvas],
+                                                           self.databaseEntities)
+                    else:
+                        resultEntitySet = self.canvasOr(resultEntitySet,
+                                                        self.canvasesEntitiesDict[matchingCanvas])
+
+        # Filter out all entities that do not contain at least one of the selected fields.
+        for entity in list(resultEntitySet):
+            validEntity = any(field in self.allEntities[entity].keys() for field in fieldsToSelect)
+
+            if not validEntity:
+                resultEntitySet.remove(entity)
+                self.allEntities.pop(entity)
+        return resultEntitySet
+
+    def parseConditions(self, conditionClauses: Union[None, list], entitiesPool, shouldCancel=None,
+                        onFinalMatches=None) -> set:
+        """
+        conditionClauses:
+        [[("AND" | "OR" | None), ("Value Condition" | "Graph Condition"), (True | False), conditionValue], ...]
+
+        conditionValue:
+            if Value Condition:
+                [("ATTRIBUTE" | "RATTRIBUTE"), <User Input>,
+                ("EQ" | "CONTAINS" | "STARTSWITH" | "ENDSWITH" | "RMATCH"), <User Input>]
+            if Graph Condition:
+                [("CHILDOF" <ENTITY> | "DESCENDANTOF " <ENTITY> |
+                "PARENTOF" <ENTITY> | "ANCESTOROF " <ENTITY> |
+                "NUMCHILDREN" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
+                "NUMPARENTS" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
+                "NUMANCESTORS" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
+                "NUMDESCENDANTS" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
+                "NUMIFIED_PARENTS_TOTAL" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
+                "NUMIFIED_CHILDREN_TOTAL" (" < " | " <= " | " > " | " >= " | " == ") <DIGITS> |
+                "CONNECTEDTO" <ENTITY> | "ISOLATED" | "ISROOT" | "ISLEAF")]
+        """
+        self.allEntities = {uid: self.allEntities[uid] for uid in self.allEntities if uid in entitiesPool}
+
+        queryPlan = self.planConditions(conditionClauses)
+        uidsToSelect = queryPlan.run(set(self.allEntities), shouldCancel, onFinalMatches)
+        self.lastQueryPlan = queryPlan
+
+        uidsToRemove = set(self.allEntities).difference(uidsToSelect)
+        for entity in uidsToRemove:
+            self.allEntities.pop(entity, None)
+
+        return uidsToSelect
+
+    def planConditions(self, conditionClauses: list) -> QueryPlan:
+        """
+        Compiles the condition clauses into a query plan.
+
+        Consecutive conditions joined by the same set operation can be run in any order without
+          changing the result, so each such run of conditions is ordered from cheapest to most expensive.
+        That way, cheap value conditions narrow down the entities that expensive graph conditions check.
+        """
+        steps = []
+        for clauseIndex, conditionClause in enumerate(conditionClauses):
+            # The set operation of the first clause cannot be changed, and it is applied to an empty selection.
+            setOperation = 'OR' if clauseIndex == 0 else conditionClause[0]
+            step = self.compileCondition(setOperation, conditionClause)
+            if step is not None:
+                steps.append(step)
+
+        orderedSteps = []
+        stepsRun = []
+        for step in steps:
+            if stepsRun and stepsRun[0].setOperation != step.setOperation:
+                orderedSteps.extend(sorted(stepsRun, key=lambda runStep: runStep.estimatedCost))
+                stepsRun = []
+            stepsRun.append(step)
+        orderedSteps.extend(sorted(stepsRun, key=lambda runStep: runStep.estimatedCost))
+        return QueryPlan(orderedSteps)
+
+    def compileCondition(self, setOperation: str, conditionClause: list) -> Optional[QueryPlanStep]:
+        """
+        Returns the plan step for the condition clause, or None if the clause cannot match anything.
+        """
+        isNot = conditionClause[2]
+        conditionValue = conditionClause[3]
+        negation = 'NOT ' if isNot else ''
+        if conditionClause[1] == "Value Condition":
+            attributeMode, attributeInput, checkType, checkValue = conditionValue
+            if attributeMode == "ATTRIBUTE":
+                matchingFields = [attributeInput] if attributeInput in self.allEntityFields else []
+            else:
+                try:
+                    attributeRegex = re.compile(attributeInput)
+                except re.error:
+                    return None
+                matchingFields = [field for field in self.allEntityFields if attributeRegex.match(field)]
+
+            # Compiled once per query, rather than once per value checked.
+            valueCheck = FieldTextIndex.getValueCheck(checkType, checkValue) or (lambda value: False)
+            return QueryPlanStep(
+                setOperation, f'{negation}{attributeMode} {attributeInput!r} {checkType} {checkValue!r}',
+                self.VALUE_CONDITION_COSTS.get(checkType, 4) * max(len(matchingFields), 1),
+                lambda candidates: self.evaluateValueCondition(candidates, matchingFields, checkType, checkValue,
+                                                               valueCheck, isNot))
+
+        if conditionClause[1] == "Graph Condition":
+            checkType = conditionValue[0]
+            checkArguments = conditionValue[1:]
+            return QueryPlanStep(
+                setOperation, ' '.join([f'{negation}{checkType}'] + [str(argument) for argument in checkArguments]),
+                self.GRAPH_CONDITION_COSTS.get(checkType, 100),
+                lambda candidates: self.evaluateGraphCondition(candidates, checkType, isNot, checkArguments),
+                self.GRAPH_CONDITION_CHUNK_SIZE)
+        return None
+
+    def evaluateGraphCondition(self, candidates: set, checkType: str, isNot: bool, checkArguments: list) -> set:
+        """
+        Returns the candidates that satisfy the graph condition.
+        Conditions about what is reachable from what are answered from the reachability index,
+          instead of traversing the graph once for every candidate.
+        """
+        if checkType in ("ANCESTOROF", "DESCENDANTOF", "CONNECTEDTO"):
+            targetEntity = checkArguments[0]
+            if checkType == "DESCENDANTOF":
+                matches = candidates.intersection(self.reachabilityIndex.getDescendants(targetEntity))
+            else:
+                matches = candidates.intersection(self.reachabilityIndex.getAncestors(targetEntity))
+                if checkType == "CONNECTEDTO" and targetEntity in candidates:
+                    # Every entity has a path to itself.
+                    matches.add(targetEntity)
+        elif checkType in ("NUMANCESTORS", "NUMDESCENDANTS"):
+            getCount = self.reachabilityIndex.getAncestorCount if checkType == "NUMANCESTORS" else \
+                self.reachabilityIndex.getDescendantCount
+            matches = {entity for entity in candidates
+                       if self.checkComparison(getCount(entity, self.checkCancelled), *checkArguments)}
+        else:
+            return {entity for entity in candidates if self.checkGCHelper(checkType, isNot, [entity] + checkArguments)}
+        return candidates.difference(matches) if isNot else matches
+
+    def evaluateValueCondition(self, candidates: set, matchingFields: list, checkType: str, checkValue: str,
+                               valueCheck, isNot: bool) -> set:
+        """
+        Returns the candidates for which the value check passes on at least one of the matching fields.
+        Uses the database's field index when possible, and otherwise checks the whole attribute column at once,
+          instead of checking every candidate.
+        """
+        bulkSearch = len(candidates) >= self.BULK_SEARCH_MIN_CANDIDATES
+        # Entities without the field are compared as 'None', which the index does not account for.
+        useIndex = bulkSearch and not valueCheck('None')
+        matches = set()
+        for matchingField in matchingFields:
+            fieldMatches = None
+            if useIndex and self.searchEntities is not None:
+                fieldMatches = self.searchEntities(matchingField, checkType, checkValue, self.databaseSnapshot)
+            if fieldMatches is None and bulkSearch:
+                attributeColumn = self.getAttributeColumn(matchingField)
+                fieldMatches = attributeColumn.index[self.getColumnValueCheck(attributeColumn, checkType, checkValue)]
+            if fieldMatches is None:
+                fieldMatches = {entity for entity in candidates
+                                if valueCheck(str(self.allEntities[entity].get(matchingField)))}
+            else:
+                fieldMatches = candidates.intersection(fieldMatches)
+            matches.update(candidates.difference(fieldMatches) if isNot else fieldMatches)
+        return matches
+
+    def getAttributeColumn(self, field: str) -> pd.Series:
+        """
+        Returns the values of the field for every entity in the snapshot, as strings, indexed by entity uid.
+        Entities without the field have the value 'None', same as when checking entities one by one.
+        """
+        attributeColumn = self.attributeColumns.get(field)
+        if attributeColumn is None:
+            fieldValues = []
+            entities = iter(self.allEntitiesInit.values())
+            while entitiesChunk := list(islice(entities, self.CANCEL_CHECK_INTERVAL)):
+                self.checkCancelled()
+                fieldValues.extend(str(entity.get(field)) for entity in entitiesChunk)
+            attributeColumn = pd.Series(fieldValues, index=list(self.allEntitiesInit), dtype=object)
+            self.attributeColumns[field] = attributeColumn
+        return attributeColumn
+
+    @staticmethod
+    def getColumnValueCheck(attributeColumn: pd.Series, checkType: str, checkValue: str) -> pd.Series:
+        """
+        Returns a boolean mask of the values in the column that pass the value check.
+        """
+        if checkType == "EQ":
+            return attributeColumn == checkValue
+        if checkType == "CONTAINS":
+            return attributeColumn.str.contains(checkValue, regex=False)
+        if checkType == "STARTSWITH":
+            return attributeColumn.str.startswith(checkValue)
+        if checkType == "ENDSWITH":
+            return attributeColumn.str.endswith(checkValue)
+        if checkType == "RMATCH":
+            with contextlib.suppress(re.error):
+                return attributeColumn.str.match(checkValue)
+        return pd.Series(False, index=attributeColumn.index)
+
+    def canvasOr(self, canvasSetA: set, canvasSetB: set):
+        return canvasSetA.union(canvasSetB)
+
+    def canvasAnd(self, canvasSetA: set, canvasSetB: set):
+        return canvasSetA.intersection(canvasSetB)
+
+    def canvasAndNot(self, canvasSetA: set, canvasSetB: set):
+        return canvasSetA.difference(canvasSetB)
+
+    def canvasOrNot(self, canvasSetA: set, canvasSetB: set, allEntitiesSet: set):
+        return canvasSetA.union(allEntitiesSet.difference(canvasSetB))
+
+    def checkParentOf(self, valueA: str, valueB: str):
+        return self.databaseSnapshot.has_successor(valueA, valueB)
+
+    def checkChildOf(self, valueA: str, valueB: str):
+        return self.databaseSnapshot.has_predecessor(valueA, valueB)
+
+    def checkComparison(self, valueA: float, valueB: str, valueC: float):
+        return (valueB == "<" and valueA < valueC) or \
+            (valueB == "<=" and valueA <= valueC) or \
+            (valueB == ">" and valueA > valueC) or \
+            (valueB == ">=" and valueA >= valueC) or \
+            (valueB == "==" and valueA == valueC)
+
+    def checkNumChildren(self, valueA: str, valueB: str, valueC: float):
+        numChildren = len(list(self.databaseSnapshot.successors(valueA)))
+        return (valueB == "<" and numChildren < valueC) or \
+            (valueB == "<=" and numChildren <= valueC) or \
+            (valueB == ">" and numChildren > valueC) or \
+            (valueB == ">=" and numChildren >= valueC) or \
+            (valueB == "==" and numChildren == valueC)
+
+    def checkNumParents(self, valueA: str, valueB: str, valueC: float):
+        numParents = len(list(self.databaseSnapshot.predecessors(valueA)))
+        return (valueB == "<" and numParents < valueC) or \
+            (valueB == "<=" and numParents <= valueC) or \
+            (valueB == ">" and numParents > valueC) or \
+            (valueB == ">=" and numParents >= valueC) or \
+            (valueB == "==" and numParents == valueC)
+
+    def checkNumifiedParentsTotal(self, valueA: str, valueB: str, valueC: float):
+        parents = self.databaseSnapshot.predecessors(valueA)
+        total = 0.0
+        for item in parents:
+            with contextlib.suppress(Exception):
+                primaryField = self.getPrimaryField(self.databaseSnapshot.nodes[item])
+                total += self.modifyNumify(self.databaseSnapshot.nodes[item][primaryField])
+
+        return (valueB == "<" and total < valueC) or \
+            (valueB == "<=" and total <= valueC) or \
+            (valueB == ">" and total > valueC) or \
+            (valueB == ">=" and total >= valueC) or \
+            (valueB == "==" and total == valueC)
+
+    def checkNumifiedChildrenTotal(self, valueA: str, valueB: str, valueC: float):
+        children = self.databaseSnapshot.successors(valueA)
+        total = 0.0
+        for item in children:
+            with contextlib.suppress(Exception):
+                primaryField = self.getPrimaryField(self.databaseSnapshot.nodes[item])
+                total += self.modifyNumify(self.databaseSnapshot.nodes[item][primaryField])
+        return (valueB == "<" and total < valueC) or \
+            (valueB == "<=" and total <= valueC) or \
+            (valueB == ">" and total > valueC) or \
+            (valueB == ">=" and total >= valueC) or \
+            (valueB == "==" and total == valueC)
+
+    def checkIsolated(self, valueA: str):
+        with contextlib.suppress(nx.NetworkXError):
+            if valueA in self.databaseSnapshot.nodes and nx.is_isolate(self.databaseSnapshot, valueA):
+                return True
+        return False
+
+    def checkIsRoot(self, valueA: str):
+        with contextlib.suppress(nx.NetworkXError):
+            if len(self.databaseSnapshot.in_edges(valueA)) == 0:
+                return True
+        return False
+
+    def checkIsLeaf(self, valueA: str):
+        with contextlib.suppress(nx.NetworkXError):
+            if len(self.databaseSnapshot.out_edges(valueA)) == 0:
+                return True
+        return False
+
+    def checkGCHelper(self, checkType: str, isNot: bool, args: list):
+        returnVal = False
+        if checkType == "CHILDOF":
+            returnVal = self.checkChildOf(*args)
+        elif checkType == "ISLEAF":
+            returnVal = self.checkIsLeaf(*args)
+        elif checkType == "ISOLATED":
+            returnVal = self.checkIsolated(*args)
+        elif checkType == "ISROOT":
+            returnVal = self.checkIsRoot(*args)
+        elif checkType == "NUMCHILDREN":
+            returnVal = self.checkNumChildren(*args)
+        elif checkType == "NUMPARENTS":
+            returnVal = self.checkNumParents(*args)
+        elif checkType == "NUMIFIED_PARENTS_TOTAL":
+            returnVal = self.checkNumifiedParentsTotal(*args)
+        elif checkType == "NUMIFIED_CHILDREN_TOTAL":
+            returnVal = self.checkNumifiedChildrenTotal(*args)
+        elif checkType == "PARENTOF":
+            returnVal = self.checkParentOf(*args)
+        return not returnVal if isNot else returnVal
+
+    def modifyNumify(self, valueA: str) -> float:
+        # Get the first number that shows up.
+        tempString = valueA.replace(',', '.')  # Making sure that floats are expressed the right way.
+        count = 0
+        for c in tempString:
+            if c not in string.digits:
+                count += 1
+            else:
+                break
+
+        count2 = 0
+        for c in tempString[count:]:
+            if c in string.digits or c == '.':
+                count2 += 1
+            else:
+                break
+
+        # If there are no numbers in the string, its numeric value is 0.
+        try:
+            floatValue = float(tempString[count:count + count2])
+        except ValueError:
+            floatValue = 0.0
+        return floatValue
+
+    @staticmethod
+    def modifyNumifyColumn(values: pd.Series) -> pd.Series:
+        """
+        Numifies every value in the column at once; equivalent to modifyNumify.
+        """
+        numbers = values.astype(str).str.replace(',', '.', regex=False).str.extract('([0-9][0-9.]*)', expand=False)
+        return pd.to_numeric(numbers, errors='coerce').fillna(0.0).astype(float)
+
+    def parseModify(self, resultsToModify: (set, set), modifyQueries: list) -> (set, set):
+        """
+        modifyQueries:
+        [[("MODIFY" | "RMODIFY"), <User Input>, ("NUMIFY" | "UPPERCASE" | "LOWERCASE")], ...]
+        """
+
+        matchingFields = resultsToModify[1]
+
+        modifiedUIDs = set()
+        numifiedFields = set()
+
+        for modification in modifyQueries:
+            userInput1 = modification[1]
+            modificationType = modification[2]
+            modifyFields = []
+            if modification[0] == "MODIFY":
+                if userInput1 in resultsToModify[1]:
+                    modifyFields.append(userInput1)
+            else:
+                try:
+                    userInputRegex = re.compile(userInput1)
+                    modifyFields = [fieldMatch for fieldMatch in matchingFields if userInputRegex.match(fieldMatch)]
+                except (ValueError, re.error):
+                    continue
+            if modificationType not in ["UPPERCASE", "LOWERCASE", "NUMIFY"]:
+                continue
+            for modifyField in modifyFields:
+                self.checkCancelled()
+                fieldValues = pd.Series({entity: self.allEntities[entity].get(modifyField)
+                                         for entity in self.allEntities}, dtype=object).dropna()
+                if fieldValues.empty:
+                    continue
+                if modificationType == "UPPERCASE":
+                    newFieldValues = fieldValues.str.upper().dropna()
+                elif modificationType == "LOWERCASE":
+                    newFieldValues = fieldValues.str.lower().dropna()
+                else:
+                    newFieldValues = self.modifyNumifyColumn(fieldValues).map(str)
+                    numifiedFields.add(modifyField)
+                for entity, newFieldValue in newFieldValues.items():
+                    if entity not in modifiedUIDs:
+                        # Copy before modifying, since the entity dicts are shared with the database.
+                        self.allEntities[entity] = dict(self.allEntities[entity])
+                    modifiedUIDs.add(entity)
+                    self.allEntities[entity][modifyField] = newFieldValue
+
+        return modifiedUIDs, numifiedFields
+
+    def runQuery(self, query: tuple, shouldCancel=None, onPartialResults=None) -> Optional[
+        tuple[Optional[tuple[set, set]], Optional[tuple[set, set]]]]:
+        """
+        Runs the query on the current snapshot. The query can be an LQLQuery, or any tuple of query arguments.
+
+        Returns the uids of the matching entities and the selected fields, and the uids of the entities
+          modified by the query along with the fields that were numified. The matching entities, with any
+          modifications applied, are in allEntities afterwards.
+
+        shouldCancel is checked while the query runs, and QueryCancelledException is raised if it returns True.
+        onPartialResults is given the entities that are certain to be in the results, along with the selected
+          fields, while the conditions are running. Partial results are not given for queries that modify values.
+        """
+        if self.databaseSnapshot is None:
+            return None
+        query = LQLQuery(*query)
+        self.allEntities = dict(self.allEntitiesInit)
+        self.lastQueryPlan = None
+        self.shouldCancel = shouldCancel
+        try:
+            return self.runQueryParts(query, onPartialResults)
+        finally:
+            self.shouldCancel = None
+
+    def runQueryParts(self, query: LQLQuery, onPartialResults) -> tuple:
+        returnValue = None
+        modifications = None
+        if fieldsToSelect := self.parseSelect(query.selectClause, query.selectValue):
+            if entitiesToConsider := self.parseSource(query.sourceClause, query.sourceValues, fieldsToSelect):
+                if query.conditionClauses:
+                    onFinalMatches = None
+                    if onPartialResults is not None and not query.modifyQueries:
+                        onFinalMatches = lambda resultUIDs: onPartialResults(resultUIDs, fieldsToSelect)
+                    entitiesToConsider = self.parseConditions(query.conditionClauses, entitiesToConsider,
+                                                              self.shouldCancel, onFinalMatches)
+                returnValue = (entitiesToConsider, fieldsToSelect)
+                if query.modifyQueries:
+                    self.checkCancelled()
+                    modifications = self.parseModify(returnValue, query.modifyQueries)
+
+        return returnValue, modifications
+
+
+def loadProjectSnapshot(filesDirectory: Path, backendName: Optional[str] = None) -> nx.DiGraph:
+    """
+    Loads the entities database of a saved project, without starting the application.
+
+    filesDirectory is the project's files directory, i.e. the 'Project/FilesDir' setting of the project.
+    If the project was not saved with the given storage backend, any other backend that the project has
+      a database for is used instead. Icons are left as they are stored in the database.
+    """
+    storage = getStorage(backendName, filesDirectory)
+    if not storage.exists():
+        for storageClass in STORAGE_BACKENDS.values():
+            otherStorage = storageClass(filesDirectory)
+            if otherStorage.exists():
+                storage = otherStorage
+                break
+
+    databaseSnapshot = nx.DiGraph()
+    databaseContents = storage.loadAll()
+    if databaseContents is not None:
+        addStoredItems(databaseSnapshot, databaseContents[0], databaseContents[1])
+    # Journal entries are lists of the form: [nodes, edges, removed node uids, removed edge uids]
+    for journalEntry in storage.readChanges():
+        for linkUID in journalEntry[3]:
+            with contextlib.suppress(nx.NetworkXError):
+                databaseSnapshot.remove_edge(linkUID[0], linkUID[1])
+        for uid in journalEntry[2]:
+            with contextlib.suppress(nx.NetworkXError):
+                databaseSnapshot.remove_node(uid)
+        addStoredItems(databaseSnapshot, journalEntry[0], journalEntry[1])
+    return databaseSnapshot
+
+
+def addStoredItems(databaseSnapshot: nx.DiGraph, nodes: dict, edges: Union[list, dict]) -> None:
+    """
+    Adds entities and links in the format they are stored in, replacing the attributes of existing ones.
+    """
+    for uid, nodeAttributes in nodes.items():
+        if uid in databaseSnapshot:
+            databaseSnapshot.nodes[uid].clear()
+        databaseSnapshot.add_node(uid, **nodeAttributes)
+    if isinstance(edges, dict):
+        # Files saved before edges were stored as lists have the string form of each edge's uid as its key.
+        edges = [(*literal_eval(edgeKey), edgeAttributes) for edgeKey, edgeAttributes in edges.items()]
+    for edgeStart, edgeEnd, edgeAttributes in edges:
+        edgeAttributes['uid'] = (edgeStart, edgeEnd)
+        if databaseSnapshot.has_edge(edgeStart, edgeEnd):
+            databaseSnapshot.edges[edgeStart, edgeEnd].clear()
+        databaseSnapshot.add_edge(edgeStart, edgeEnd, **edgeAttributes)
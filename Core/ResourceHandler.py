@@ -3,31 +3,103 @@
 
 import contextlib
 import re
-from typing import Union, Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Hashable, Union, Optional
 from glob import glob
 
 import networkx as nx
 from datetime import timezone
 from defusedxml.ElementTree import parse
 from datetime import datetime
-from os import listdir
+from os import cpu_count, listdir
 from pathlib import Path
 from uuid import uuid4
 from ast import literal_eval
 from base64 import b64decode
+from hashlib import blake2b
+from sys import intern
+from threading import Lock
+from weakref import WeakValueDictionary, finalize
 from dateutil import parser
+from msgpack import load, dump
 
 from PIL import Image
 from PIL.ImageQt import ImageQt
-from PySide6.QtCore import QByteArray, QBuffer, QIODevice, QSize, QUrl, Qt
+from PySide6.QtCore import QByteArray, QBuffer, QIODevice, QSize, QStandardPaths, QUrl, Qt
 from PySide6 import QtWidgets, QtGui
 
+from Core.GlobalVariables import interned_value_fields
+
+# Increment whenever the format of parsed entity definitions changes, so that old caches are discarded.
+ENTITY_DEFINITIONS_CACHE_VERSION = 1
+# Columns of values with at least this many rows are checked by worker processes, unless told otherwise.
+PARALLEL_CHECK_MIN_ROWS = 200000
+PARALLEL_CHECK_CHUNK_SIZE = 50000
+
+
+class AssetCache:
+    """
+    Least recently used cache for assets that are expensive to load or render, i.e. icons,
+    banners and resized pictures.
+
+    Counts hits and misses, so that its effectiveness can be checked.
+    """
+
+    def __init__(self, maxEntries: int = 2048) -> None:
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.cacheLock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, loadAsset: Callable):
+        """
+        Returns the cached asset for the given key, or loads it with loadAsset and caches it.
+        Exceptions raised while loading the asset are passed on, and nothing is cached.
+        """
+        with self.cacheLock:
+            asset = self.entries.get(key)
+            if asset is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return asset
+            self.misses += 1
+        # Loaded outside the lock, so that slow loads do not hold up other threads.
+        asset = loadAsset()
+        with self.cacheLock:
+            self.entries[key] = asset
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+        return asset
+
+    def clear(self) -> None:
+        with self.cacheLock:
+            self.entries.clear()
+
+    def getStatistics(self) -> dict:
+        with self.cacheLock:
+            return {'Entries': len(self.entries), 'Hits': self.hits, 'Misses': self.misses}
+
+
+# Shared by everything that loads or resizes assets.
+assetCache = AssetCache()
+
 
 def resizePictureFromBuffer(picBuffer: QByteArray, newSize: tuple) -> QByteArray:
     """
     newSize: First is width, second is height.
+
+    Resized pictures are cached, so resizing the same picture to the same size again is cheap.
     """
     picBufferData = picBuffer.data()
+    return assetCache.get(('Resized Picture', blake2b(picBufferData, digest_size=16).digest(), tuple(newSize)),
+                          lambda: resizePictureData(picBuffer, picBufferData, newSize))
+
+
+def resizePictureData(picBuffer: QByteArray, picBufferData: bytes, newSize: tuple) -> QByteArray:
     if picBufferData.startswith(b'<svg ') or picBufferData.startswith(b'<?xml '):
         return QByteArray(resizeSVG(picBufferData, newSize))
     originalImage = QtGui.QImage()
@@ -43,6 +115,47 @@ def resizePictureFromBuffer(picBuffer: QByteArray, newSize: tuple) -> QByteArray
     return pictureByteArray
 
 
+def internAttributes(attributes: dict) -> dict:
+    """
+    Returns a copy of the attributes of an entity or link, with the field names and the values
+    that tend to repeat (i.e. entity types and uids) interned, so that they are shared rather
+    than stored once per item.
+    """
+    compactAttributes = {}
+    for field, value in attributes.items():
+        if field in interned_value_fields:
+            if isinstance(value, str):
+                value = intern(value)
+            elif isinstance(value, tuple):
+                value = tuple(intern(part) if isinstance(part, str) else part for part in value)
+        compactAttributes[intern(field)] = value
+    return compactAttributes
+
+
+def runCheckOnValues(attrCheck: re.Pattern, values: list) -> list:
+    """
+    Check each value against the compiled check, the same way as ResourceHandler.runCheckOnAttribute.
+    Module level, so that worker processes can run it.
+    """
+    findAll = attrCheck.findall
+    return [len(findAll(value)) == 1 for value in values]
+
+
+def parseDate(dateValue) -> datetime:
+    """
+    Parses the given date. ISO 8601 dates, which is what entities and links store, are parsed with
+    the (much faster) dedicated parser; anything else is left to dateutil.
+    Raises ValueError or TypeError if the date cannot be parsed.
+    """
+    if isinstance(dateValue, datetime):
+        return dateValue
+    dateString = str(dateValue)
+    try:
+        return datetime.fromisoformat(dateString)
+    except ValueError:
+        return parser.parse(dateString)
+
+
 def resizeSVG(byteString: bytes, resize: tuple):
     bytesWidth = str(resize[0]).encode('UTF-8')
     bytesHeight = str(resize[1]).encode('UTF-8')
@@ -65,7 +178,25 @@ class ResourceHandler:
         self.mainWindow = mainWindow
         self.programBaseDirPath = Path(self.mainWindow.SETTINGS.value("Program/BaseDir"))
         self.entityCategoryList = {}
+        # Entity Type -> Everything needed to create and check entities of that type, so that
+        #   looking an entity type up does not involve going through every category.
+        self.entityTypeRegistry = {}
         self.moduleAssetPaths = []
+        # Parsed entity definition files, so that unchanged files are not parsed again on every launch.
+        self.entityDefinitionsCachePath = self.getEntityDefinitionsCachePath()
+        self.entityDefinitionsCache = self.loadEntityDefinitionsCache()
+        self.entityDefinitionsCacheChanged = False
+
+        # Content-addressed icon store: every distinct icon is kept once, keyed by the hash of its contents.
+        # Entities with the same icon all reference the same QByteArray, and files on disk only store the hash.
+        # Icons are dropped from the store once nothing else references them.
+        self.iconStore = WeakValueDictionary()
+        self.iconHashes = {}
+        self.storedIconPaths = set()
+        self.iconStoreLock = Lock()
+        # Hashes of the icons stored while the icon store directory is being pruned, which must be kept.
+        self.iconsStoredDuringPrune = None
+        self.assetCache = assetCache
 
         self.icons = {"uploading": str(self.programBaseDirPath / "Resources" / "Icons" / "Uploading.png"),
                       "uploaded": str(self.programBaseDirPath / "Resources" / "Icons" / "Uploaded.png"),
@@ -163,17 +294,8 @@ class ResourceHandler:
         return eList
 
     def getEntityAttributes(self, entityType) -> Union[None, list]:
-        aList = []
-        try:
-            for category in self.entityCategoryList:
-                if entityType in self.entityCategoryList[category]:
-                    aList.extend(iter(self.entityCategoryList[category][entityType]['Attributes']))
-                    break
-        except KeyError:
-            self.mainWindow.MESSAGEHANDLER.error(
-                f"Attempted to get attributes for nonexistent entity type: {entityType}", True)
-            return None
-        return aList
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        return [] if entityTypeDetails is None else list(entityTypeDetails['Attribute Template'])
 
     def getAllEntitiesInCategory(self, category) -> list:
         """
@@ -182,9 +304,8 @@ class ResourceHandler:
         return list(self.entityCategoryList[category])
 
     def getCategoryOfEntityType(self, entityType: Union[str, None]):
-        return next((category for category in self.entityCategoryList
-                     if entityType in self.entityCategoryList[category]),
-                    None)
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        return None if entityTypeDetails is None else entityTypeDetails['Category']
 
     def getAllEntities(self) -> list:
         """
@@ -197,19 +318,14 @@ class ResourceHandler:
 
     def validateAttributesOfEntity(self, entityJSON: dict) -> (bool, str):
         try:
-            entityType = entityJSON['Entity Type']
-            entityCategory = self.getCategoryOfEntityType(entityType)
+            entityTypeDetails = self.entityTypeRegistry.get(entityJSON['Entity Type'])
             # Attributes that become part of the entity after merging are not checked.
             # This is fine, because resolutions (by default) don't assume that any extra fields will be present.
-            entityBaseAttributes = self.getEntityAttributes(entityType)
-            if entityCategory is not None:
-                for attribute in self.entityCategoryList[entityCategory][entityType]['Attributes']:
-                    if attribute in entityBaseAttributes:
-                        attrValue = entityJSON.get(attribute)
-                        if attrValue is None or not self.runCheckOnAttribute(
-                                attrValue,
-                                self.entityCategoryList[entityCategory][entityType]['Attributes'][attribute][1]):
-                            return f'Bad value: {str(attrValue)}'
+            if entityTypeDetails is not None:
+                for attribute, attributeCheck in entityTypeDetails['Checks'].items():
+                    attrValue = entityJSON.get(attribute)
+                    if attrValue is None or not self.runCheckOnAttribute(attrValue, attributeCheck):
+                        return f'Bad value: {str(attrValue)}'
         except Exception:
             return False
         return True
@@ -227,6 +343,57 @@ class ResourceHandler:
         result = attrCheck.findall(attribute)
         return len(result) == 1
 
+    def runCheckOnAttributes(self, attributes: list, check: str, processes: Optional[int] = None) -> list:
+        """
+        Check a whole column of attribute values against the regex of the category 'check'.
+        Returns whether each value passed, in the same order as the values given.
+
+        processes: The number of worker processes to spread the checks across. By default, worker processes
+          are only used for large columns.
+        """
+        if check == 'None':
+            return [True] * len(attributes)
+        attrCheck = self.checks.get(check)
+        if attrCheck is None:
+            return [False] * len(attributes)
+        attributes = [str(attribute) for attribute in attributes]
+
+        if processes is None:
+            processes = (cpu_count() or 1) if len(attributes) >= PARALLEL_CHECK_MIN_ROWS else 1
+        if processes <= 1 or len(attributes) <= PARALLEL_CHECK_CHUNK_SIZE:
+            return runCheckOnValues(attrCheck, attributes)
+
+        chunks = [attributes[chunkStart:chunkStart + PARALLEL_CHECK_CHUNK_SIZE]
+                  for chunkStart in range(0, len(attributes), PARALLEL_CHECK_CHUNK_SIZE)]
+        results = []
+        try:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                for chunkResults in executor.map(runCheckOnValues, repeat(attrCheck), chunks):
+                    results.extend(chunkResults)
+        except (OSError, RuntimeError) as exc:
+            # I.e. if processes cannot be created in this environment.
+            self.mainWindow.MESSAGEHANDLER.debug(f'Could not check values in worker processes: {exc}')
+            return runCheckOnValues(attrCheck, attributes)
+        return results
+
+    def validateAttributeColumns(self, entityType: str, columns: dict, processes: Optional[int] = None) -> list:
+        """
+        Check columns of values ({field: [values]}) meant for entities of the given type, one column at a time.
+        Only the fields that entities of that type have by default are checked, like validateAttributesOfEntity.
+        Returns the indexes of the rows with at least one value that did not pass its check.
+        """
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        if entityTypeDetails is None:
+            return []
+        invalidRows = set()
+        for field, values in columns.items():
+            fieldCheck = entityTypeDetails['Checks'].get(field)
+            if fieldCheck is None:
+                continue
+            invalidRows.update(rowIndex for rowIndex, passed in
+                               enumerate(self.runCheckOnAttributes(values, fieldCheck, processes)) if not passed)
+        return sorted(invalidRows)
+
     def getIconPathForIconFile(self, iconFile: str) -> Union[None, Path]:
         iconPath = self.programBaseDirPath / "Resources" / "Icons" / iconFile
         if iconPath.exists():
@@ -238,17 +405,65 @@ class ResourceHandler:
         return self.programBaseDirPath / "Resources" / "Icons" / "Default.svg"
 
     def addRecognisedEntityTypes(self, entityFile: Path) -> list:
+        entityDefinitions = self.getEntityDefinitions(entityFile)
+        if entityDefinitions is None:
+            return []
+
+        category, entities, malformedEntityErrors = entityDefinitions
+        for malformedEntityError in malformedEntityErrors:
+            # Ignore malformed entities
+            self.mainWindow.MESSAGEHANDLER.error(f'Error: {malformedEntityError}', popUp=False)
+
         entityTypesAdded = []
+        for entityName, attributesDict, icon in entities:
+            if self.entityCategoryList.get(category) is None:
+                self.entityCategoryList[category] = {}
+            self.entityCategoryList[category][entityName] = {
+                'Attributes': attributesDict,
+                'Icon': str(self.getIconPathForIconFile(icon))}
+            self.registerEntityType(category, entityName)
+            entityTypesAdded.append(f'{category}/{entityName}')
+        return entityTypesAdded
+
+    def getEntityDefinitions(self, entityFile: Path) -> Optional[list]:
+        """
+        Returns the entity definitions in the given file, as returned by parseEntityFile.
+        Files that have not changed since they were last parsed are not parsed again.
+        """
+        try:
+            entityFileStat = entityFile.stat()
+        except OSError:
+            entityFileStat = None
+        cacheKey = str(entityFile)
+        cachedDefinitions = self.entityDefinitionsCache.get(cacheKey)
+        if entityFileStat is not None and cachedDefinitions is not None and \
+                cachedDefinitions[0] == entityFileStat.st_mtime_ns and cachedDefinitions[1] == entityFileStat.st_size:
+            return cachedDefinitions[2]
+
+        entityDefinitions = self.parseEntityFile(entityFile)
+        if entityDefinitions is not None and entityFileStat is not None:
+            self.entityDefinitionsCache[cacheKey] = [entityFileStat.st_mtime_ns, entityFileStat.st_size,
+                                                     entityDefinitions]
+            self.entityDefinitionsCacheChanged = True
+        return entityDefinitions
+
+    def parseEntityFile(self, entityFile: Path) -> Optional[list]:
+        """
+        Returns [category, [[entity name, attributes, icon file name], ...], [malformed entity errors]],
+          or None if the file could not be parsed.
+        """
         try:
             tree = parse(entityFile, forbid_dtd=True, forbid_entities=True, forbid_external=True)
         except Exception as exc:
             self.mainWindow.MESSAGEHANDLER.warning(
                 f'Error occurred when loading entities from {entityFile}: {exc}, skipping.')
-            return []
+            return None
 
         root = tree.getroot()
 
         category = root.tag.replace('_', ' ')
+        entities = []
+        malformedEntityErrors = []
         for entity in list(root):
             try:
                 entityName = entity.tag.replace('_', ' ')
@@ -275,17 +490,67 @@ class ResourceHandler:
 
                 icon = entity.find('Icon')
                 icon = icon.text.strip() if icon is not None else 'Default.svg'
-                if self.entityCategoryList.get(category) is None:
-                    self.entityCategoryList[category] = {}
-                self.entityCategoryList[category][entityName] = {
-                    'Attributes': attributesDict,
-                    'Icon': str(self.getIconPathForIconFile(icon))}
-                entityTypesAdded.append(f'{category}/{entityName}')
+                entities.append([entityName, attributesDict, icon])
             except (KeyError, AttributeError) as err:
-                # Ignore malformed entities
-                self.mainWindow.MESSAGEHANDLER.error(f'Error: {str(err)}', popUp=False)
-                continue
-        return entityTypesAdded
+                malformedEntityErrors.append(str(err))
+        return [category, entities, malformedEntityErrors]
+
+    def getEntityDefinitionsCachePath(self) -> Optional[Path]:
+        cacheDirectory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+        return Path(cacheDirectory) / 'EntityDefinitions.cache' if cacheDirectory else None
+
+    def loadEntityDefinitionsCache(self) -> dict:
+        """
+        Entity definitions cache: str(entity file path) -> [mtime in ns, size, parsed entity definitions]
+        """
+        if self.entityDefinitionsCachePath is None:
+            return {}
+        try:
+            with open(self.entityDefinitionsCachePath, 'rb') as cacheFile:
+                cacheContents = load(cacheFile)
+            if cacheContents.get('Version') == ENTITY_DEFINITIONS_CACHE_VERSION:
+                return cacheContents['Files']
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            self.mainWindow.MESSAGEHANDLER.debug(f'Discarding unreadable entity definitions cache: {exc}')
+        return {}
+
+    def saveEntityDefinitionsCache(self) -> None:
+        if not self.entityDefinitionsCacheChanged or self.entityDefinitionsCachePath is None:
+            return
+        # Forget files that no longer exist, i.e. from modules that were uninstalled.
+        self.entityDefinitionsCache = {entityFile: cachedDefinitions
+                                       for entityFile, cachedDefinitions in self.entityDefinitionsCache.items()
+                                       if Path(entityFile).exists()}
+        try:
+            self.entityDefinitionsCachePath.parent.mkdir(parents=True, exist_ok=True)
+            tempCachePath = self.entityDefinitionsCachePath.with_suffix('.tmp')
+            with open(tempCachePath, 'wb') as cacheFile:
+                dump({'Version': ENTITY_DEFINITIONS_CACHE_VERSION, 'Files': self.entityDefinitionsCache}, cacheFile)
+            tempCachePath.replace(self.entityDefinitionsCachePath)
+            self.entityDefinitionsCacheChanged = False
+        except OSError as exc:
+            self.mainWindow.MESSAGEHANDLER.warning(f'Could not save entity definitions cache: {exc}')
+
+    def registerEntityType(self, category: str, entityType: str) -> None:
+        """
+        Add the entity type to the entity type registry.
+        If the same entity type is defined in more than one category, the category it was first defined in is used.
+        """
+        registeredDetails = self.entityTypeRegistry.get(entityType)
+        if registeredDetails is not None and registeredDetails['Category'] != category:
+            return
+        entityTypeDetails = self.entityCategoryList[category][entityType]
+        attributes = entityTypeDetails['Attributes']
+        self.entityTypeRegistry[entityType] = {
+            'Category': category,
+            'Primary Field': next(attribute for attribute in attributes if attributes[attribute][2]),
+            'Attribute Template': {attribute: attributes[attribute][0] for attribute in attributes},
+            'Checks': {attribute: attributes[attribute][1] for attribute in attributes},
+            'Icon Path': entityTypeDetails['Icon'],
+            # Read when first needed, so that starting up does not involve reading every icon.
+            'Default Icon': None}
 
     def loadModuleEntities(self, modulePath: Path) -> list:
         entitiesPath = modulePath / 'Entities'
@@ -294,6 +559,7 @@ class ResourceHandler:
             for entFile in listdir(entitiesPath):
                 if entFile.endswith('.xml'):
                     allModuleEntitiesAdded += self.addRecognisedEntityTypes(entitiesPath / entFile)
+            self.saveEntityDefinitionsCache()
         return allModuleEntitiesAdded
 
     def loadModuleAssets(self, modulePath: Path):
@@ -304,18 +570,11 @@ class ResourceHandler:
 
     def getEntityJson(self, entityType: str, jsonData=None) -> Union[dict, None]:
         eJson = {'uid': str(uuid4())}
-        if entityType in self.getAllEntitiesInCategory('Meta'):
-            eJson['uid'] += '@'
-        try:
-            for category in self.entityCategoryList:
-                if entityType in self.entityCategoryList[category]:
-                    for attribute in self.entityCategoryList[category][entityType]['Attributes']:
-                        eJson[attribute] = self.entityCategoryList[category][entityType]['Attributes'][attribute][0]
-                    break
-        except KeyError:
-            self.mainWindow.MESSAGEHANDLER.error(
-                f"Attempted to get attributes for malformed entity type: {entityType}", True)
-            return None
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        if entityTypeDetails is not None:
+            if entityTypeDetails['Category'] == 'Meta':
+                eJson['uid'] += '@'
+            eJson.update(entityTypeDetails['Attribute Template'])
         eJson['Entity Type'] = entityType
         eJson['Date Created'] = None
         eJson['Date Last Edited'] = None
@@ -335,7 +594,7 @@ class ResourceHandler:
         else:
             # Always make sure dates are in ISO format.
             try:
-                eJson['Date Created'] = parser.parse(str(eJson['Date Created'])).isoformat()
+                eJson['Date Created'] = parseDate(eJson['Date Created']).isoformat()
             except (TypeError, ValueError):
                 eJson['Date Created'] = utcNow
 
@@ -344,29 +603,12 @@ class ResourceHandler:
         return eJson
 
     def getPrimaryFieldForEntityType(self, entityType: str) -> Union[str, None]:
-        try:
-            for category in self.entityCategoryList:
-                if entityType in self.entityCategoryList[category]:
-                    for attribute in self.entityCategoryList[category][entityType]['Attributes']:
-                        if self.entityCategoryList[category][entityType]['Attributes'][attribute][2]:
-                            return attribute
-        except KeyError:
-            self.mainWindow.MESSAGEHANDLER.error(
-                f"Attempted to get primary attribute for malformed entity type: {entityType}", True)
-        return None
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        return None if entityTypeDetails is None else entityTypeDetails['Primary Field']
 
     def getBareBonesEntityJson(self, entityType: str) -> Union[dict, None]:
-        eJson = {}
-        try:
-            for category in self.entityCategoryList:
-                if entityType in self.entityCategoryList[category]:
-                    for attribute in self.entityCategoryList[category][entityType]['Attributes']:
-                        eJson[attribute] = self.entityCategoryList[category][entityType]['Attributes'][attribute][0]
-                    break
-        except KeyError:
-            self.mainWindow.MESSAGEHANDLER.error(
-                f"Attempted to get attributes for malformed entity type: {entityType}", True)
-            return None
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        eJson = {} if entityTypeDetails is None else dict(entityTypeDetails['Attribute Template'])
         eJson['Entity Type'] = entityType
 
         return eJson
@@ -386,7 +628,7 @@ class ResourceHandler:
             linkJson['Date Created'] = utcNow
         else:
             try:
-                linkJson['Date Created'] = parser.parse(str(linkJson['Date Created'])).isoformat()
+                linkJson['Date Created'] = parseDate(linkJson['Date Created']).isoformat()
             except (TypeError, ValueError):
                 linkJson['Date Created'] = utcNow
         linkJson['Date Last Edited'] = utcNow
@@ -399,22 +641,118 @@ class ResourceHandler:
 
         return linkJson
 
+    def getIconHash(self, icon: QByteArray) -> str:
+        """
+        Returns the hash of the icon's contents, adding the icon to the icon store if it is not already there.
+        """
+        # Icons forget their hash when they are deleted, so the hash of a reused id is never mistaken for theirs.
+        iconHash = self.iconHashes.get(id(icon))
+        if iconHash is not None and self.iconStore.get(iconHash) is icon:
+            return iconHash
+        iconHash = blake2b(icon.data(), digest_size=16).hexdigest()
+        storedIcon = self.iconStore.setdefault(iconHash, icon)
+        if storedIcon is icon:
+            finalize(icon, self.iconHashes.pop, id(icon), None)
+        self.iconHashes[id(storedIcon)] = iconHash
+        return iconHash
+
+    def internIcon(self, icon: QByteArray) -> QByteArray:
+        """
+        Returns the shared copy of the given icon.
+        """
+        return self.iconStore[self.getIconHash(icon)]
+
+    def getIconStoreDirectory(self) -> Path:
+        return Path(self.mainWindow.SETTINGS.value("Project/FilesDir")) / "Icons"
+
+    def storeIcon(self, icon: QByteArray, iconStoreDirectory: Path) -> str:
+        """
+        Writes the icon to the icon store directory, if it is not in there already.
+        Returns the hash of the icon, which is what gets saved in place of the icon itself.
+        """
+        iconHash = self.getIconHash(icon)
+        iconPath = iconStoreDirectory / iconHash
+        if self.iconsStoredDuringPrune is not None:
+            with self.iconStoreLock:
+                # Checked again, in case the prune finished in the meantime.
+                if self.iconsStoredDuringPrune is not None:
+                    self.iconsStoredDuringPrune.add(iconHash)
+        if iconPath not in self.storedIconPaths:
+            # Databases may be compacted in the background while the main thread saves.
+            with self.iconStoreLock:
+                if not iconPath.exists():
+                    iconStoreDirectory.mkdir(0o700, exist_ok=True)
+                    tempIconPath = iconPath.with_suffix('.tmp')
+                    with open(tempIconPath, 'wb') as iconFile:
+                        iconFile.write(icon.data())
+                    tempIconPath.replace(iconPath)
+                self.storedIconPaths.add(iconPath)
+        return iconHash
+
+    def beginIconStorePrune(self) -> None:
+        """
+        Starts keeping track of the icons that are stored, so that pruning does not delete them.
+        Must be called before the contents that pruneIconStore is given are copied from the database.
+        """
+        self.iconsStoredDuringPrune = set()
+
+    def pruneIconStore(self, iconStoreDirectory: Path, nodes: dict) -> None:
+        """
+        Deletes the icons in the icon store directory that are not used by any of the given nodes,
+          nor stored since beginIconStorePrune was called.
+        """
+        with self.iconStoreLock:
+            iconsToKeep = {node['Icon'] for node in nodes.values() if isinstance(node.get('Icon'), str)}
+            iconsToKeep.update(self.iconsStoredDuringPrune or ())
+            self.iconsStoredDuringPrune = None
+            with contextlib.suppress(FileNotFoundError):
+                for iconPath in iconStoreDirectory.iterdir():
+                    if iconPath.name not in iconsToKeep and not iconPath.suffix:
+                        iconPath.unlink(missing_ok=True)
+                        self.storedIconPaths.discard(iconPath)
+
+    def loadStoredIcon(self, iconHash: str, iconStoreDirectory: Path) -> Optional[QByteArray]:
+        icon = self.iconStore.get(iconHash)
+        if icon is None:
+            try:
+                with open(iconStoreDirectory / iconHash, 'rb') as iconFile:
+                    icon = self.internIcon(QByteArray(iconFile.read()))
+            except OSError:
+                self.mainWindow.MESSAGEHANDLER.warning(f'Icon missing from the project icon store: {iconHash}')
+                return None
+        return icon
+
     def getEntityDefaultPicture(self, entityType: str) -> QByteArray:
-        picture = self.programBaseDirPath / "Resources" / "Icons" / "Default.svg"
-        try:
-            for category in self.entityCategoryList:
-                if entityType in self.entityCategoryList[category]:
-                    entityPicture = self.entityCategoryList[category][entityType]['Icon']
-                    if Path(entityPicture).exists():
-                        picture = entityPicture
-                    break
-        except KeyError:
-            self.mainWindow.MESSAGEHANDLER.warning(
-                f"Attempted to get icon for nonexistent entity type: {entityType}", popUp=False)
-        finally:
-            with open(picture, 'rb') as pictureFile:
-                pictureContents = pictureFile.read()
-            return QByteArray(pictureContents)
+        entityTypeDetails = self.entityTypeRegistry.get(entityType)
+        if entityTypeDetails is None:
+            return self.getDefaultPicture(None)
+        defaultIcon = entityTypeDetails['Default Icon']
+        if defaultIcon is None:
+            defaultIcon = self.getDefaultPicture(entityTypeDetails['Icon Path'])
+            entityTypeDetails['Default Icon'] = defaultIcon
+        return defaultIcon
+
+    def getDefaultPicture(self, picturePath: Union[str, None]) -> QByteArray:
+        """
+        Returns the contents of the given picture file, falling back to the default entity icon
+          if no file is given or if it does not exist.
+        """
+        if picturePath is None or not Path(picturePath).exists():
+            picturePath = str(self.programBaseDirPath / "Resources" / "Icons" / "Default.svg")
+        return self.assetCache.get(('Picture', picturePath),
+                                   lambda: self.internIcon(QByteArray(self.readAssetFile(picturePath))))
+
+    @staticmethod
+    def readAssetFile(assetPath: str) -> bytes:
+        with open(assetPath, 'rb') as assetFile:
+            return assetFile.read()
+
+    def getBannerPicture(self, bannerPath: str) -> QByteArray:
+        """
+        Returns the contents of the banner at the given path.
+        Raises FileNotFoundError if the banner does not exist.
+        """
+        return self.assetCache.get(('Banner', bannerPath), lambda: QByteArray(self.readAssetFile(bannerPath)))
 
     def getLinkPicture(self):
         picture = self.programBaseDirPath / "Resources" / "Icons" / "Resolution.png"
@@ -434,36 +772,62 @@ class ResourceHandler:
         edges = {edgeKey: graph.edges.get(edgeKey) for edgeKey in graph.edges}
         return nodes, edges
 
-    def deconstructGraphForFileDump(self, graph: nx.DiGraph) -> tuple:
+    def deconstructGraphForFileDump(self, graph: nx.DiGraph, nodeKeys=None, edgeKeys=None,
+                                    iconStoreDirectory: Optional[Path] = None) -> tuple:
+        """
+        nodeKeys and edgeKeys can be specified to only deconstruct part of the graph.
+        Icons are written to the given icon store directory, or the current project's if none is given,
+          and only their hashes are kept in the returned nodes.
+
+        Returns the nodes as a dict of uid: attributes, and the edges as a list of
+          [source uid, target uid, attributes], so that nothing needs to be decoded when loading them.
+        """
+        if iconStoreDirectory is None:
+            iconStoreDirectory = self.getIconStoreDirectory()
         nodes = {}
-        for nodeKey in graph.nodes:
-            # Dereference the original dict, so we don't actually convert its icon to data.
+        for nodeKey in graph.nodes if nodeKeys is None else nodeKeys:
+            # Dereference the original dict, so we don't actually replace its icon.
             nodes[nodeKey] = dict(graph.nodes.get(nodeKey))
             with contextlib.suppress(KeyError):
-                nodes[nodeKey]['Icon'] = nodes[nodeKey]['Icon'].toBase64().data()
-        edges = {str(edgeKey): graph.edges.get(edgeKey) for edgeKey in graph.edges}
+                nodes[nodeKey]['Icon'] = self.storeIcon(nodes[nodeKey]['Icon'], iconStoreDirectory)
+        edges = [[edgeKey[0], edgeKey[1], graph.edges.get(edgeKey)]
+                 for edgeKey in (graph.edges if edgeKeys is None else edgeKeys)]
         return nodes, edges
 
     def reconstructGraphFromString(self, graphString: str) -> tuple:
         nodes, edges = literal_eval(graphString)
         for node in nodes:
             with contextlib.suppress(KeyError):
-                nodes[node]['Icon'] = QByteArray(b64decode(nodes[node]['Icon']))
+                nodes[node]['Icon'] = self.internIcon(QByteArray(b64decode(nodes[node]['Icon'])))
         return nodes, edges
 
     def reconstructGraphFullFromFile(self, graphNodesAndEdges: Union[tuple, list]) -> nx.DiGraph:
         returnGraph = nx.DiGraph()
         graphNodes = graphNodesAndEdges[0]
         graphEdges = graphNodesAndEdges[1]
+        iconStoreDirectory = self.getIconStoreDirectory()
         for node in graphNodes:
             with contextlib.suppress(KeyError):
-                graphNodes[node]['Icon'] = QByteArray(b64decode(graphNodes[node]['Icon']))
-            returnGraph.add_node(node, **graphNodes[node])
-
-        for edge in graphEdges:
-            edgeUID = tuple(literal_eval(edge))
-            graphEdges[edge]['uid'] = edgeUID
-            returnGraph.add_edge(*edgeUID, **graphEdges[edge])
+                nodeIcon = graphNodes[node]['Icon']
+                if isinstance(nodeIcon, str):
+                    nodeIcon = self.loadStoredIcon(nodeIcon, iconStoreDirectory)
+                    if nodeIcon is None:
+                        nodeIcon = self.getEntityDefaultPicture(graphNodes[node].get('Entity Type'))
+                else:
+                    # Files saved before the icon store existed hold base64 encoded icons.
+                    nodeIcon = self.internIcon(QByteArray(b64decode(nodeIcon)))
+                graphNodes[node]['Icon'] = nodeIcon
+            # Interned, so the node, its 'uid' field and the links that refer to it all share one string.
+            returnGraph.add_node(intern(node) if isinstance(node, str) else node,
+                                 **internAttributes(graphNodes[node]))
+
+        if isinstance(graphEdges, dict):
+            # Files saved before edges were stored as lists have the string form of each edge's uid as its key.
+            graphEdges = [(*literal_eval(edgeKey), edgeAttributes) for edgeKey, edgeAttributes in graphEdges.items()]
+        for edgeStart, edgeEnd, edgeAttributes in graphEdges:
+            edgeAttributes['uid'] = (edgeStart, edgeEnd)
+            edgeAttributes = internAttributes(edgeAttributes)
+            returnGraph.add_edge(*edgeAttributes['uid'], **edgeAttributes)
 
         return returnGraph
 
@@ -85,6 +85,8 @@ class SettingsObject(dict):
         #   symlink is created. Symlinks however require special permissions or developer mode in Windows.
         # To ensure that the software works out-of-the-box on all platforms, the default is set to 'Copy'.
         self.setValue("Project/Symlink or Copy Materials", "Copy")  # Values are 'Copy' or 'Symlink'.
+        # How the entities database is stored on disk. Values are 'Msgpack' or 'SQLite'.
+        self.setValue("Project/Database Backend", "Msgpack")
         self.setValue("Project/Resolution Result Grouping Threshold", "15")
         self.setValue("Project/Number of Answers Returned", "3")
         self.setValue("Project/Question Answering Retriever Value", "10")
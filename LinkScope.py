@@ -18,7 +18,6 @@ from os import access, R_OK, W_OK, getpid, kill
 from os.path import abspath, dirname
 from msgpack import load
 from pathlib import Path
-from datetime import datetime
 from typing import Union
 from PySide6 import QtWidgets, QtGui, QtCore
 
@@ -97,6 +96,10 @@ class MainWindow(QtWidgets.QMainWindow):
             self.FCOM.close()
         self.SETTINGS.setValue("Project/Server/Project", "")
         self.saveProject()
+        # Let the database finish compacting its journal, if it is in the middle of doing so.
+        self.LENTDB.waitForCompaction()
+        # Query threads are owned by this window, so they must be done before it is destroyed.
+        self.LQLWIZARD.stopQueryThread()
         # Wait just a little for the logging thread to close.
         # We don't _have_ to do this, but it stops errors from popping up due to threads being rudely interrupted.
         while not self.dockbarThree.logViewerUpdateThread.isFinished():
@@ -121,6 +124,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.RESOLUTIONMANAGER.save()
         self.MODULEMANAGER.save()
         self.SETTINGS.save()
+        self.LQLWIZARD.save()
         self.centralWidget().tabbedPane.save()
 
     def resetMainWindowTitle(self):
@@ -278,8 +282,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def exportDatabaseToGraphML(self):
         # Need to create a new database to remove the icons
-        with self.LENTDB.dbLock:
-            currentDatabase = self.LENTDB.database.copy()
+        currentDatabase = self.LENTDB.getSnapshot().copy()
 
         for node in currentDatabase.nodes:
             # Remove icons. Will reset custom icons to default, but saves space.
@@ -612,6 +615,9 @@ class MainWindow(QtWidgets.QMainWindow):
         currentScene = self.centralWidget().tabbedPane.getCurrentScene()
         currentUIDs = [item.uid for item in currentScene.items() if isinstance(item, (BaseNode, BaseConnector))]
         entityPrimaryFields = {}
+        # Entity uid -> Name of its primary field, for the entities on the canvas.
+        entityPrimaryFieldNames = {}
+        linkResolutions = {}
         for uid in currentUIDs:
             if isinstance(uid, str):
                 item = self.LENTDB.getEntity(uid)
@@ -619,6 +625,7 @@ class MainWindow(QtWidgets.QMainWindow):
                     if not entityPrimaryFields.get(item[list(item)[1]]):
                         entityPrimaryFields[item[list(item)[1]]] = set()
                     entityPrimaryFields[item[list(item)[1]]].add(uid)
+                    entityPrimaryFieldNames[uid] = list(item)[1]
 
             elif isinstance(uid, set):
                 for potentialLinkItem in uid:
@@ -627,6 +634,7 @@ class MainWindow(QtWidgets.QMainWindow):
                         if not entityPrimaryFields.get(item['Resolution']):
                             entityPrimaryFields[item['Resolution']] = set()
                         entityPrimaryFields[item['Resolution']].add(str(uid))
+                        linkResolutions.setdefault(item['Resolution'], set()).add(str(uid))
         findPrompt = FindEntityOnCanvasDialog(list(entityPrimaryFields), regex)
 
         if findPrompt.exec():
@@ -636,16 +644,23 @@ class MainWindow(QtWidgets.QMainWindow):
                 try:
                     if regex:
                         expression = re.compile(findText)
-                        for item in entityPrimaryFields:
+                        for item in linkResolutions:
                             if expression.match(item):
                                 # Add the elements in each index to uidsToSelect instead of the sets themselves.
-                                uidsToSelect.extend(entityPrimaryFields[item])
+                                uidsToSelect.extend(linkResolutions[item])
 
                     else:
-                        for item in entityPrimaryFields:
+                        for item in linkResolutions:
                             if item.startswith(findText):
                                 # Add the elements in each index to uidsToSelect instead of the sets themselves.
-                                uidsToSelect.extend(entityPrimaryFields[item])
+                                uidsToSelect.extend(linkResolutions[item])
+
+                    # Look the entities up in the database's field index rather than checking each one.
+                    for primaryFieldName in set(entityPrimaryFieldNames.values()):
+                        matchingUIDs = self.LENTDB.searchEntities(primaryFieldName, 'RMATCH' if regex else 'STARTSWITH',
+                                                                  findText) or ()
+                        uidsToSelect.extend(matchingUID for matchingUID in matchingUIDs
+                                            if entityPrimaryFieldNames.get(matchingUID) == primaryFieldName)
 
                     currentScene.clearSelection()
                     for item in [linkOrEntity for linkOrEntity in currentScene.items()
@@ -834,6 +849,10 @@ class MainWindow(QtWidgets.QMainWindow):
                         with contextlib.suppress(ValueError):
                             int(newSettingValue[1])
                             self.SETTINGS.setValue(key, newSettingValue[0])
+                    elif key == 'Project/Database Backend':
+                        # The database is converted to the new backend when the project is saved below.
+                        if newSettingValue[0] in ['Msgpack', 'SQLite']:
+                            self.SETTINGS.setValue(key, newSettingValue[0])
                     elif newSettingValue[0] in ['Copy', 'Symlink']:
                         self.SETTINGS.setValue(key, newSettingValue[0])
 
@@ -927,6 +946,8 @@ class MainWindow(QtWidgets.QMainWindow):
         :return:
         """
         self.MODULEMANAGER.loadAllModules()
+        # Primary fields of module entities are only known once the modules are loaded.
+        self.LENTDB.rebuildPrimaryFieldIndex()
         self.setStatus('Loaded Modules.')
 
     def reloadModules(self, onlyUpdateDockbar: bool = False) -> None:
@@ -938,6 +959,7 @@ class MainWindow(QtWidgets.QMainWindow):
         """
         if not onlyUpdateDockbar:
             self.MODULEMANAGER.loadAllModules()
+        self.LENTDB.rebuildPrimaryFieldIndex()
         self.dockbarOne.existingEntitiesPalette.loadEntities()
         self.dockbarOne.resolutionsPalette.loadAllResolutions()
         self.dockbarOne.nodesPalette.loadEntities()
@@ -980,41 +1002,18 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         scene = self.centralWidget().tabbedPane.getCurrentScene()
         scene.clearSelection()
+        # Year, month, day, hour, minute - only as many as the timescale specifies.
+        timescaleFields = ('year', 'month', 'day', 'hour', 'minute')[:len(timescale)]
         for uid in scene.nodesDict:
-            if self.LENTDB.isNode(uid):
-                createdDate = datetime.fromisoformat(self.LENTDB.getEntity(uid)['Date Created'])
-                try:
-                    year = timescale[0]
-                except IndexError:
-                    year = None
-                try:
-                    month = timescale[1]
-                except IndexError:
-                    month = None
-                try:
-                    day = timescale[2]
-                except IndexError:
-                    day = None
-                try:
-                    hour = timescale[3]
-                except IndexError:
-                    hour = None
-                try:
-                    minute = timescale[4]
-                except IndexError:
-                    minute = None
-
-                if minute is not None and createdDate.minute != minute:
-                    continue
-                if hour is not None and createdDate.hour != hour:
-                    continue
-                if day is not None and createdDate.day != day:
-                    continue
-                if month is not None and createdDate.month != month:
-                    continue
-                if year is not None and createdDate.year != year:
-                    continue
-
+            if not self.LENTDB.isNode(uid):
+                continue
+            entity = self.LENTDB.getEntity(uid)
+            # Uses the dates parsed by the database, rather than parsing the date of every entity on each click.
+            createdDate = self.LENTDB.getEntityCreationDate(entity)
+            if createdDate is None:
+                continue
+            if all(getattr(createdDate, timescaleField) == timescaleValue
+                   for timescaleField, timescaleValue in zip(timescaleFields, timescale)):
                 scene.nodesDict[uid].setSelected(True)
 
     def setCurrentCanvasSelection(self, uidList: list) -> None:
@@ -1098,6 +1097,65 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             self.dockbarOne.existingEntitiesPalette.removeEntity(eJson)
 
+    def populateEntitiesWidgetBulk(self, eJsonList: list) -> None:
+        self.dockbarOne.existingEntitiesPalette.addEntities(eJsonList)
+
+    def handleDatabaseChanges(self, changes) -> None:
+        """
+        Called once per event loop iteration with the changes made to the database since the previous call.
+        Updates the entities list, the canvases and the timeline, and propagates local changes to the server.
+        """
+        addedEntities = changes.addedEntities()
+        updatedEntities = changes.updatedEntities()
+        removedEntities = changes.removedEntities()
+        updatedLinks = changes.updatedLinks()
+
+        for _, (previousEntity, _, _, _, _) in removedEntities:
+            self.populateEntitiesWidget(previousEntity, add=False)
+        if addedEntities or updatedEntities:
+            self.populateEntitiesWidgetBulk([entity for _, (_, entity, _, _, _) in addedEntities + updatedEntities])
+
+        for uid, (_, entity, _, _, _) in updatedEntities:
+            self.updateEntityNodeLabelsOnCanvases(uid, entity[list(entity)[1]])
+        for uid, (_, link, _, _, _) in updatedLinks:
+            self.updateLinkLabelsOnCanvases(f"{uid[0]}{uid[1]}", link['Resolution'])
+
+        if changes.resetTimeline:
+            with self.LENTDB.dbLock.reading():
+                self.resetTimeline(self.LENTDB.database)
+        else:
+            timelineUpdated = False
+            for _, (previousEntity, entity, _, updateTimeline, _) in addedEntities + updatedEntities + removedEntities:
+                if not updateTimeline:
+                    continue
+                if previousEntity is not None:
+                    # Remove existing item before re-adding.
+                    self.updateTimeline(previousEntity, False, updateGraph=False)
+                if entity is not None:
+                    self.updateTimeline(entity, True, updateGraph=False)
+                timelineUpdated = True
+            if timelineUpdated:
+                self.dockbarThree.timeWidget.drawChart([])
+
+        if not self.FCOM.isConnected():
+            return
+        # The dicts are copied, since sending them to the server encodes their icons in place.
+        for _, (previousEntity, _, isLocal, _, _) in removedEntities:
+            if isLocal:
+                self.sendLocalDatabaseUpdateToServer(dict(previousEntity), 2)
+        for uid, (_, _, isLocal, _, _) in changes.removedLinks():
+            if isLocal:
+                self.sendLocalDatabaseUpdateToServer({"uid": uid}, 2)
+        for _, (_, link, isLocal, _, overwrite) in updatedLinks:
+            if isLocal and overwrite:
+                self.sendLocalDatabaseUpdateToServer(dict(link), 3)
+        for _, (_, entity, isLocal, _, _) in addedEntities + updatedEntities:
+            if isLocal:
+                self.sendLocalDatabaseUpdateToServer(dict(entity), 1)
+        for _, (_, link, isLocal, _, overwrite) in changes.addedLinks() + updatedLinks:
+            if isLocal and not overwrite:
+                self.sendLocalDatabaseUpdateToServer(dict(link), 1)
+
     def populateResolutionsWidget(self, selected) -> None:
         self.dockbarOne.resolutionsPalette.loadResolutionsForSelected(selected)
 
@@ -1538,7 +1596,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.FCOM.isConnected():
             project_name = self.SETTINGS.value("Project/Server/Project")
             if project_name != "":
-                with self.LENTDB.dbLock:
+                with self.LENTDB.dbLock.reading():
                     self.FCOM.syncDatabase(project_name, self.LENTDB.database)
                 self.MESSAGEHANDLER.info(f'Database Synced for project: {project_name}')
 
@@ -1978,6 +2036,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.MODULEMANAGER = ModuleManager.ModulesManager(self)
         self.FCOM = FrontendCommunicationsHandler.CommunicationsHandler(self)
         self.LQLWIZARD = LQLQueryBuilder(self)
+        self.LQLWIZARD.load()
 
         # Have the project auto-save on regular intervals by default.
         self.saveTimer = QtCore.QTimer(self)
@@ -2054,6 +2113,10 @@ class MainWindow(QtWidgets.QMainWindow):
         # Connect resolution results to macro execution function
         self.runningMacroResolutionFinishedSignalListener.connect(self.resolutionFinishedMacrosListener)
 
+        # Keep the views of the database up to date.
+        self.LENTDB.eventBus.changesPublished.connect(self.handleDatabaseChanges)
+        self.LENTDB.eventBus.changesPublished.connect(self.LQLWIZARD.updateMaterializedViews)
+
         self.initializeLayout()
 
 
@@ -2684,6 +2747,11 @@ class ProjectEditDialog(QtWidgets.QDialog):
                 self.settingsSingleChoice.append(settingSingleChoice)
                 self.resolutionCategoryLayout.addRow(keyName, settingSingleChoice)
 
+            elif keyName == 'Database Backend':
+                settingSingleChoice = SettingsEditSingleChoice(['Msgpack', 'SQLite'], settingValue, setting)
+                self.settingsSingleChoice.append(settingSingleChoice)
+                self.resolutionCategoryLayout.addRow(keyName, settingSingleChoice)
+
     def accept(self) -> None:
         for settingTextbox in self.settingsTextboxes:
             key = settingTextbox.settingsKey
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+"""
+Headless micro-benchmarks for the entities database (Core/EntityDB.py).
+
+Runs each benchmarked operation on synthetic databases of the given sizes, and prints
+the results as JSON: operations per second for each operation, and the peak memory
+used while benchmarking each size.
+
+Every size is benchmarked in its own process, so that peak memory is measured per size.
+
+Usage:
+    python benchmarks/EntitiesDBBenchmark.py [--sizes 10000 100000 1000000] [--backend Msgpack|SQLite]
+                                             [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+PROGRAM_BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROGRAM_BASE_DIR))
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+ENTITY_TYPE = 'Computer'
+PRIMARY_FIELD = 'Hostname'
+
+
+class BenchmarkSettings(dict):
+    """
+    Stands in for SettingsObject, which would write to the user's global settings.
+    """
+
+    def value(self, key, alt=None):
+        return self.get(key, alt)
+
+    def setValue(self, key, value) -> None:
+        self[key] = value
+
+
+class BenchmarkMessageHandler:
+    """
+    Stands in for MessageHandler, which would log to the user's log file.
+    """
+
+    def debug(self, message, exc_info=True):
+        return message
+
+    def info(self, message, popUp=False, exc_info=False):
+        return message
+
+    def warning(self, message, popUp=False, exc_info=False):
+        return message
+
+    def error(self, message, popUp=True, exc_info=False):
+        print(message, file=sys.stderr)
+        return message
+
+    def critical(self, message, popUp=True, exc_info=True):
+        print(message, file=sys.stderr)
+        return message
+
+
+class BenchmarkCommunicationsHandler:
+
+    def isConnected(self) -> bool:
+        return False
+
+
+class BenchmarkMainWindow:
+    """
+    The parts of the main window that EntitiesDB uses, without any of the GUI.
+    """
+
+    def __init__(self, projectFilesDir: Path, backend: str) -> None:
+        from Core.ResourceHandler import ResourceHandler
+
+        self.SETTINGS = BenchmarkSettings()
+        self.SETTINGS.setValue("Program/BaseDir", str(PROGRAM_BASE_DIR))
+        self.SETTINGS.setValue("Project/FilesDir", str(projectFilesDir))
+        self.SETTINGS.setValue("Project/Database Backend", backend)
+        self.MESSAGEHANDLER = BenchmarkMessageHandler()
+        self.FCOM = BenchmarkCommunicationsHandler()
+        self.RESOURCEHANDLER = ResourceHandler(self)
+
+    def handleGroupNodeUpdateAfterEntityDeletion(self, entityUID) -> None:
+        pass
+
+
+class Benchmark:
+
+    def __init__(self, size: int, backend: str) -> None:
+        from PySide6 import QtCore
+        from Core.EntityDB import EntitiesDB
+
+        self.application = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+        self.size = size
+        self.projectDirectory = tempfile.TemporaryDirectory(prefix='LinkScopeBenchmark_')
+        self.mainWindow = BenchmarkMainWindow(Path(self.projectDirectory.name), backend)
+        self.entityDB = EntitiesDB(self.mainWindow)
+        self.random = random.Random(size)
+        self.results = {}
+
+    def measure(self, operationName: str, operationCount: int, operation) -> None:
+        startTime = time.perf_counter()
+        operation()
+        # Publish the change events as well, since they are part of the cost of each change.
+        self.application.processEvents()
+        elapsedSeconds = time.perf_counter() - startTime
+        self.results[operationName] = {
+            'operations': operationCount,
+            'seconds': elapsedSeconds,
+            'opsPerSecond': operationCount / elapsedSeconds if elapsedSeconds else None}
+
+    def addEntities(self) -> None:
+        for entityNumber in range(self.size):
+            self.entityDB.addEntity({'Entity Type': ENTITY_TYPE, PRIMARY_FIELD: f'host-{entityNumber}'})
+
+    def addLinks(self, uids: list) -> None:
+        for linkNumber in range(len(uids) - 1):
+            self.entityDB.addLink({'uid': (uids[linkNumber], uids[linkNumber + 1]), 'Resolution': 'Benchmark'})
+
+    def getEntitiesOfType(self) -> None:
+        for _ in range(self.size):
+            self.entityDB.getEntityOfType(f'host-{self.random.randrange(self.size)}', ENTITY_TYPE)
+
+    def getAllEntities(self, repetitions: int) -> None:
+        for _ in range(repetitions):
+            self.entityDB.getAllEntities()
+
+    def mergeDatabases(self, uids: list, mergeCount: int) -> None:
+        newNodes = {}
+        # Half of the merged entities are updates of existing ones, the other half are new.
+        for uid in self.random.sample(uids, mergeCount // 2):
+            updatedEntity = dict(self.entityDB.getEntity(uid))
+            updatedEntity['Date Last Edited'] = '9999-01-01T00:00:00+00:00'
+            newNodes[uid] = updatedEntity
+        for entityNumber in range(mergeCount - len(newNodes)):
+            newEntity = self.mainWindow.RESOURCEHANDLER.getEntityJson(
+                ENTITY_TYPE, {PRIMARY_FIELD: f'merged-host-{entityNumber}'})
+            newNodes[newEntity['uid']] = newEntity
+        self.entityDB.mergeDatabases(newNodes, {}, fromServer=True)
+
+    def removeEntities(self, uids: list) -> None:
+        for uid in uids:
+            self.entityDB.removeEntity(uid)
+
+    def run(self) -> dict:
+        self.measure('addEntity', self.size, self.addEntities)
+        uids = [entity['uid'] for entity in self.entityDB.getAllEntities()]
+        self.measure('addLink', len(uids) - 1, lambda: self.addLinks(uids))
+        self.measure('getEntityOfType', self.size, self.getEntitiesOfType)
+        self.measure('getAllEntities', 10, lambda: self.getAllEntities(10))
+        mergeCount = max(self.size // 10, 1)
+        self.measure('mergeDatabases', mergeCount, lambda: self.mergeDatabases(uids, mergeCount))
+        self.measure('save', self.size, lambda: self.entityDB.save(compact=True))
+        self.measure('loadDatabase', self.size, self.entityDB.loadDatabase)
+
+        removedUIDs = self.random.sample(uids, max(self.size // 10, 1))
+        self.measure('removeEntity', len(removedUIDs), lambda: self.removeEntities(removedUIDs))
+        # Saving only what changed since the last save.
+        self.measure('saveIncremental', len(removedUIDs), self.entityDB.save)
+        self.entityDB.waitForCompaction()
+
+        self.projectDirectory.cleanup()
+        # ru_maxrss is in kilobytes on Linux.
+        return {'entities': self.size,
+                'operations': self.results,
+                'peakMemoryBytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def runSize(size: int, backend: str) -> dict:
+    """
+    Benchmark one size in a separate process, so that its peak memory is not affected by the other sizes.
+    """
+    completedProcess = subprocess.run([sys.executable, __file__, '--single', str(size), '--backend', backend],
+                                      capture_output=True, text=True, check=False)
+    if completedProcess.returncode != 0:
+        return {'entities': size, 'error': completedProcess.stderr.strip()}
+    return json.loads(completedProcess.stdout)
+
+
+def main() -> None:
+    argumentParser = argparse.ArgumentParser(description='Benchmark the LinkScope entities database.')
+    argumentParser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                                help='Number of entities in each synthetic database.')
+    argumentParser.add_argument('--backend', default='Msgpack', choices=('Msgpack', 'SQLite'),
+                                help='The database storage backend to benchmark.')
+    argumentParser.add_argument('--output', type=Path, default=None,
+                                help='Write the results to this file instead of printing them.')
+    argumentParser.add_argument('--single', type=int, default=None, help=argparse.SUPPRESS)
+    arguments = argumentParser.parse_args()
+
+    if arguments.single is not None:
+        print(json.dumps(Benchmark(arguments.single, arguments.backend).run()))
+        return
+
+    results = {'python': platform.python_version(),
+               'platform': platform.platform(),
+               'backend': arguments.backend,
+               'results': [runSize(size, arguments.backend) for size in arguments.sizes]}
+    resultsJSON = json.dumps(results, indent=4)
+    if arguments.output is None:
+        print(resultsJSON)
+    else:
+        arguments.output.write_text(resultsJSON)
+
+
+if __name__ == '__main__':
+    main()